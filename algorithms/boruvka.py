@@ -0,0 +1,289 @@
+'''
+
+    Borůvka's minimum spanning tree algorithm, in parallel.
+
+    Borůvka's algorithm works in rounds. In each round every component of the
+    forest found so far picks its cheapest edge out to another component, and
+    all of those edges are added at once. Every component is joined to at
+    least one other, so the number of components at least halves each round
+    and there are at most lg(n) rounds of O(m) work, O(mlgn) in total.
+
+    The point of it here is that the work in a round, looking at every edge to
+    find each component's cheapest one, can be split up any way we like, and
+    so can the rest of the round apart from the joining up. The edges are
+    split into a few slices per process of a multiprocessing pool, and each
+    round is three passes over the pool:
+
+    * each worker finds the cheapest edge out of each component among a slice
+      of the edges, and writes these into shared arrays sorted by component,
+    * each worker takes a range of the components and picks the cheapest of
+      the edges found for them in all of the slices (bisecting into each
+      slice's sorted run), and
+    * once the main process has joined the components up with a Disjoint Set
+      and copied its parent array across, each worker relabels a range of the
+      vertices with their new components by following the parents.
+
+    So the main process only does one union per edge added to the tree, and
+    the arrays, which live in shared memory from the start, are never sent to
+    the workers or back.
+
+    Ties between edges of the same weight are broken by their position in the
+    edge arrays, which makes the order of the edges total, as it must be to
+    stop a round adding a cycle.
+
+    See also Introduction to Algorithms, Cormen et al. Problem 23-2.
+
+'''
+
+from array import array
+from bisect import bisect_left
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from numbers import Integral
+import os
+
+from datastrucutres.disjointset import DisjointSet
+
+# The shared arrays, as (SharedMemory, memoryview) pairs, in each worker, in
+# the order sources, targets, weights, positions, component, parent, the
+# component and edge of each candidate, and the chosen edges.
+_shared = None
+
+def _share(values, typecode):
+    '''Copy values into a new block of shared memory as an array with the
+    given typecode, returning the SharedMemory. An array of that typecode is
+    copied straight across.
+    '''
+    if not (isinstance(values, array) and values.typecode == typecode):
+        values = array(typecode, values)
+    size = len(values) * values.itemsize
+    memory = SharedMemory(create = True, size = max(1, size))
+    memory.buf[:size] = memoryview(values).cast('B')
+    return memory
+
+def _attach(names, lengths, typecodes):
+    '''Pool initializer: attach to the shared arrays made by `boruvka`.
+    '''
+    global _shared
+    _shared = list()
+    for name, length, typecode in zip(names, lengths, typecodes):
+        memory = SharedMemory(name = name)
+        _shared.append((memory, memory.buf.cast(typecode)[:length]))
+
+def _cheapest(bounds):
+    '''Run `cheapest` on the edges from bounds[0] up to bounds[1] of the
+    shared arrays, and write what it finds, sorted by component, into the
+    candidate arrays from 2 * bounds[0] on (each edge kept gives at most two
+    candidates, so the slices' runs can't overlap).
+
+    Returns a pair (end, count): the kept edges are now from bounds[0] up to
+    end, and there are count candidates.
+    '''
+    lo, hi = bounds
+    views = [view for memory, view in _shared]
+    best, end = cheapest(*(views[:5] + [lo, hi]))
+    components = sorted(best)
+    start = 2 * lo
+    views[6][start:start + len(components)] = array('q', components)
+    views[7][start:start + len(components)] = array('q', map(best.__getitem__, components))
+    return end, len(components)
+
+def _reduce(task):
+    '''Given a range (lo, hi) of components and the (start, count) of each
+    slice's run of candidates, pick the cheapest candidate for each of those
+    components and write them into the chosen edges array from lo on.
+
+    Returns the number chosen, which is at most hi - lo.
+    '''
+    lo, hi, runs = task
+    views = [view for memory, view in _shared]
+    weights, positions = views[2:4]
+    components, candidates, chosen = views[6:]
+    best = dict()
+    for start, count in runs:
+        first = bisect_left(components, lo, start, start + count)
+        stop = bisect_left(components, hi, first, start + count)
+        for i in range(first, stop):
+            c = components[i]
+            e = candidates[i]
+            f = best.get(c)
+            if (f is None or weights[e] < weights[f]
+                    or (weights[e] == weights[f] and positions[e] < positions[f])):
+                best[c] = e
+    chosen[lo:lo + len(best)] = array('q', best.values())
+    return len(best)
+
+def _relabel(bounds):
+    '''Run `relabel` on the vertices from bounds[0] up to bounds[1] of the
+    shared arrays.
+    '''
+    lo, hi = bounds
+    return relabel(_shared[4][1], _shared[5][1], lo, hi)
+
+def cheapest(sources, targets, weights, positions, component, lo, hi):
+    '''Find the cheapest edge out of each component among the edges from lo up
+    to hi, where edge e joins sources[e] and targets[e] with weight weights[e],
+    positions[e] is where it was in the graph's arrays and component[v] is the
+    component of v.
+
+    An edge inside a component can never be picked again, so only the others
+    are kept, moved down to the start of the slice on the way. This shrinks
+    the edges looked at in each round as the components grow. The same goes
+    for an edge going from a higher numbered vertex to a lower one, as the
+    graph has the other direction of it too.
+
+    Returns a pair (best, end), where best is a dict from each component to
+    the index of its cheapest edge, and the edges kept are now from lo up to
+    end.
+    '''
+    best = dict()
+    j = lo
+    for e in range(lo, hi):
+        u = sources[e]
+        v = targets[e]
+        if u > v:
+            continue
+        cu = component[u]
+        cv = component[v]
+        if cu == cv:
+            continue
+        w = weights[e]
+        p = positions[e]
+        if j != e:
+            sources[j] = u
+            targets[j] = v
+            weights[j] = w
+            positions[j] = p
+        # Either end's component may use the edge.
+        f = best.get(cu)
+        if f is None or w < weights[f] or (w == weights[f] and p < positions[f]):
+            best[cu] = j
+        f = best.get(cv)
+        if f is None or w < weights[f] or (w == weights[f] and p < positions[f]):
+            best[cv] = j
+        j += 1
+    return best, j
+
+def relabel(component, parent, lo, hi):
+    '''Bring component[v] up to date for the vertices from lo up to hi, given
+    the parent array of the Disjoint Set joining the components. Each old
+    component is just followed up to its root, as it was a root itself last
+    round.
+    '''
+    for v in range(lo, hi):
+        c = component[v]
+        p = parent[c]
+        if p != c:
+            while p != c:
+                c = p
+                p = parent[c]
+            component[v] = c
+
+def boruvka(graph, processes = None):
+    '''Find a minimum spanning forest of `graph`, a CSRGraph which should be
+    undirected (have every edge in both directions), with `processes` worker
+    processes (default: one per CPU). With processes = 1 everything is done in
+    this process, without shared memory.
+
+    Only one direction of each edge, from the lower numbered vertex to the
+    higher, is looked at.
+
+    Returns an array('q') of the edges in the forest, as positions in the
+    graph's `neighbours` and `weights` arrays (see
+    algorithms.kruskal.tree_edges).
+    '''
+    n = graph.n
+    m = graph.m
+    if processes is None:
+        processes = os.cpu_count() or 1
+    sets = DisjointSet(n)
+    tree = array('q')
+
+    if isinstance(graph.weights, array):
+        weight_type = graph.weights.typecode
+    elif all(isinstance(w, Integral) for w in graph.weights):
+        weight_type = 'q'
+    else:
+        weight_type = 'd'
+    # The edges, as parallel arrays which `cheapest` can reorder.
+    edges = [graph.sources(), graph.neighbours, graph.weights, range(m)]
+
+    if processes == 1 or m == 0:
+        edges = [array(typecode, values) for values, typecode
+                 in zip(edges, ('q', 'q', weight_type, 'q'))]
+        component = array('q', range(n))
+        end = m
+        while True:
+            best, end = cheapest(*(edges + [component, 0, end]))
+            if not _join(best.values(), edges, sets, tree):
+                return tree
+            relabel(component, sets.parent, 0, n)
+
+    # Put everything into shared memory for the workers.
+    typecodes = ('q', 'q', weight_type, 'q', 'q', 'q', 'q', 'q', 'q')
+    lengths = (m, m, m, m, n, n, 2 * m, 2 * m, n)
+    memories = [_share(values, 'q') for values in edges[:2]]
+    memories.append(_share(edges[2], weight_type))
+    memories.extend(_share(values, 'q') for values in (range(m), range(n), range(n)))
+    memories.extend(SharedMemory(create = True, size = 8 * length) for length in lengths[6:])
+    del edges
+    views = [memory.buf.cast(typecode)[:length]
+             for memory, typecode, length in zip(memories, typecodes, lengths)]
+    # Split the edges, components and vertices into a few slices per process,
+    # to even out the work.
+    slices = _split(m, 4 * processes)
+    ranges = _split(n, 4 * processes)
+    try:
+        with Pool(processes, _attach,
+                  ([memory.name for memory in memories], lengths, typecodes)) as pool:
+            while True:
+                found = pool.map(_cheapest, slices)
+                runs = [(2 * lo, count) for (lo, hi), (end, count) in zip(slices, found)]
+                slices = [(lo, end) for (lo, hi), (end, count) in zip(slices, found)
+                          if end > lo]
+                counts = pool.map(_reduce, [(lo, hi, runs) for lo, hi in ranges])
+                if not _join((e for (lo, hi), count in zip(ranges, counts)
+                              for e in views[8][lo:lo + count]),
+                             views, sets, tree):
+                    return tree
+                views[5][:] = sets.parent
+                pool.map(_relabel, ranges)
+    finally:
+        for view in views:
+            view.release()
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+def _split(n, k):
+    '''Return a list of up to k (lo, hi) pairs splitting range(n) evenly.
+    '''
+    step = max(1, -(-n // k))
+    return [(lo, min(lo + step, n)) for lo in range(0, n, step)]
+
+def _join(chosen, edges, sets, tree):
+    '''Add the chosen edges (indexes into the edge arrays) to the tree,
+    joining up their components, and return whether there were any.
+    '''
+    sources, targets, weights, positions = edges[:4]
+    joined = False
+    for e in chosen:
+        joined = True
+        if sets.union(sources[e], targets[e]):
+            tree.append(positions[e])
+    return joined
+
+if __name__ == '__main__':
+    '''Some basic usage examples (run with python -m algorithms.boruvka):
+    '''
+    from algorithms.graph import CSRGraph
+    from algorithms.kruskal import tree_edges
+    # The example graph from CLRS figure 23.1, with a to i as 0 to 8.
+    g = CSRGraph.from_edges(9, [
+        (0, 1, 4), (0, 7, 8), (1, 2, 8), (1, 7, 11), (2, 3, 7), (2, 5, 4),
+        (2, 8, 2), (3, 4, 9), (3, 5, 14), (4, 5, 10), (5, 6, 2), (6, 7, 1),
+        (6, 8, 6), (7, 8, 7)], directed = False)
+    for processes in (1, 2):
+        tree = boruvka(g, processes)
+        print(sorted(tree_edges(g, tree)))
+        print(sum(g.weights[e] for e in tree))
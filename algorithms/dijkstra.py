@@ -0,0 +1,128 @@
+'''
+
+    Dijkstra's single source shortest paths algorithm.
+
+    Dijkstra's algorithm grows a set of "settled" vertices whose shortest
+    distance from the source is known, always settling next the unsettled
+    vertex which is closest, found using a priority queue. Whenever a vertex
+    is settled the distances to its neighbours are relaxed (lowered, if going
+    via this vertex is shorter), which for a vertex already in the queue is a
+    `decrease_key`.
+
+    With a Fibonacci Heap decrease_key has O(1) amortized cost and extract_min
+    O(lgn), so the whole thing runs in O(m + nlgn), which was the motivation
+    for the Fibonacci Heap in the first place. Other priority queues can be
+    used instead though (see datastrucutres.priorityqueue), and often run
+    faster in practice. Edge weights must not be negative.
+
+    For a detailed discussion see Introduction to Algorithms, Cormen et al.
+    Chapter 24.
+
+'''
+
+from array import array
+
+from datastrucutres.priorityqueue import make_queue
+
+def dijkstra(graph, source, targets = None, queue = 'fibheap', span = None):
+    '''Find the shortest paths from `source` in `graph`, a CSRGraph, using the
+    priority queue called `queue` (e.g. 'fibheap', 'pairing', 'binary', or
+    'radix' or 'veb' if all the weights are integers).
+
+    Returns a pair of arrays (distance, predecessor), where distance[v] is the
+    length of the shortest path from `source` to v and predecessor[v] is the
+    vertex before v on that path (see `path`). Vertices which can't be
+    reached have distance inf and predecessor -1.
+
+    If `targets` (an iterable of vertices) is given the search stops as soon
+    as they have all been settled. The entries of any other vertices which
+    hadn't been settled by then are only upper bounds.
+
+    Only one queue item is made per vertex reached, and only when it is first
+    reached, the edges are read straight out of the graph's arrays.
+
+    With 'veb' the queue is a bucket queue with one bucket per distance (see
+    datastrucutres.bucketqueue), whose `span` is by default the graph's
+    max_weight plus 1, as no distance in the queue is more than that above
+    the last one settled. That suits small integer weights best, e.g.
+    lengths in whole metres. The graph only finds max_weight once, but
+    `span` can also be given, e.g. for a graph whose weights have changed.
+    '''
+    n = graph.n
+    offsets = graph.offsets
+    neighbours = graph.neighbours
+    weights = graph.weights
+
+    distance = array('d', [float('inf')]) * n
+    predecessor = array('q', [-1]) * n
+    settled = bytearray(n)
+    nodes = [None] * n # The heap item for each vertex in the queue.
+
+    distance[source] = 0
+    remaining = None
+    if targets is not None:
+        remaining = set(targets)
+        if not remaining:
+            return distance, predecessor
+
+    options = dict()
+    if queue == 'veb':
+        options['span'] = graph.max_weight + 1 if span is None else span
+    heap = make_queue(queue, **options)
+    Node = heap.item_class
+    nodes[source] = Node(0, source)
+    heap.insert(nodes[source])
+    while heap.n:
+        item = heap.extract_min()
+        v = item.payload
+        d = item.key
+        settled[v] = 1
+        nodes[v] = None
+        if remaining is not None:
+            remaining.discard(v)
+            if not remaining:
+                break
+        # Relax each of the edges out of v.
+        for e in range(offsets[v], offsets[v + 1]):
+            w = neighbours[e]
+            if settled[w]:
+                continue
+            new_d = d + weights[e]
+            node = nodes[w]
+            if node is None:
+                # First time w has been reached.
+                node = nodes[w] = Node(new_d, w)
+                heap.insert(node)
+            elif new_d < node.key:
+                heap.decrease_key(node, new_d)
+            else:
+                continue
+            distance[w] = new_d
+            predecessor[w] = v
+
+    return distance, predecessor
+
+def path(predecessor, target):
+    '''Return the list of vertices on the shortest path to `target`, using the
+    predecessor array from `dijkstra`, starting with the source. If `target`
+    wasn't reached the path is just [target].
+    '''
+    result = [target]
+    v = predecessor[target]
+    while v != -1:
+        result.append(v)
+        v = predecessor[v]
+    result.reverse()
+    return result
+
+if __name__ == '__main__':
+    '''Some basic usage examples (run with python -m algorithms.dijkstra):
+    '''
+    from algorithms.graph import CSRGraph
+    # The example graph from CLRS figure 24.6, with s, t, x, y, z as 0 to 4.
+    g = CSRGraph.from_edges(5, [
+        (0, 1, 10), (0, 3, 5), (1, 2, 1), (1, 3, 2), (2, 4, 4),
+        (3, 1, 3), (3, 2, 9), (3, 4, 2), (4, 0, 7), (4, 2, 6)])
+    distance, predecessor = dijkstra(g, 0)
+    print(list(distance))
+    print(path(predecessor, 2))
@@ -0,0 +1,127 @@
+'''
+
+    A compact representation of weighted graphs for the graph algorithms.
+
+    Graphs are stored in compressed sparse row (CSR) form, which is three flat
+    arrays rather than any per-vertex or per-edge objects:
+
+    * `offsets` has n + 1 entries, and the edges out of vertex v are the
+      entries offsets[v] to offsets[v + 1] - 1 of the other two arrays.
+    * `neighbours` holds the vertex at the other end of each edge.
+    * `weights` holds the weight of each edge.
+
+    Vertices are the integers 0 to n - 1. The arrays can be anything which
+    can be indexed with integers, e.g. lists, array.array's or NumPy arrays,
+    and are used as they are without being copied. When the graph is built
+    from a list of edges the weights are kept as integers if they all are.
+
+'''
+
+from array import array
+from numbers import Integral
+
+class CSRGraph(object):
+    '''A directed, weighted graph in compressed sparse row form.
+
+    An undirected graph is represented by having each edge in both
+    directions.
+    '''
+    def __init__(self, offsets, neighbours, weights, max_weight = None):
+        '''Create a graph straight from the three CSR arrays (see above),
+        and optionally the largest of the weights, if it is already known.
+        '''
+        assert len(neighbours) == len(weights) == offsets[-1]
+        self.offsets = offsets
+        self.neighbours = neighbours
+        self.weights = weights
+        self.n = len(offsets) - 1
+        self._max_weight = max_weight
+
+    @classmethod
+    def from_edges(cls, n, edges, directed = True):
+        '''Build a graph with n vertices from an iterable of (u, v, weight)
+        edges, adding each edge in both directions if `directed` is False.
+
+        This is a counting sort of the edges by their first vertex, so it takes
+        O(n + m) time.
+        '''
+        sources = array('q')
+        targets = array('q')
+        weights = list()
+        for u, v, w in edges:
+            sources.append(u)
+            targets.append(v)
+            weights.append(w)
+            if not directed:
+                sources.append(v)
+                targets.append(u)
+                weights.append(w)
+        return cls.from_arrays(n, sources, targets, weights)
+
+    @classmethod
+    def from_arrays(cls, n, sources, targets, weights):
+        '''Build a graph with n vertices from parallel arrays of edges, where
+        edge i goes from sources[i] to targets[i] with weight weights[i].
+        '''
+        m = len(sources)
+        if all(isinstance(w, Integral) for w in weights):
+            weight_type, zero = 'q', 0
+        else:
+            weight_type, zero = 'd', 0.0
+        max_weight = max(weights, default = zero)
+        # Count the edges out of each vertex..
+        offsets = array('q', [0]) * (n + 1)
+        for u in sources:
+            offsets[u + 1] += 1
+        # ..add them up so offsets[v] is where v's edges start..
+        for v in range(n):
+            offsets[v + 1] += offsets[v]
+        # ..and then drop each edge into the next free place for its vertex.
+        fill = array('q', offsets)
+        neighbours = array('q', [0]) * m
+        edge_weights = array(weight_type, [zero]) * m
+        for i in range(m):
+            u = sources[i]
+            j = fill[u]
+            neighbours[j] = targets[i]
+            edge_weights[j] = weights[i]
+            fill[u] = j + 1
+        return cls(offsets, neighbours, edge_weights, max_weight)
+
+    @property
+    def m(self):
+        '''The number of (directed) edges in the graph.
+        '''
+        return len(self.neighbours)
+
+    @property
+    def max_weight(self):
+        '''The largest edge weight (0 if there are no edges). Unless it was
+        given when the graph was made it is found the first time it is asked
+        for and then kept, so changing the weights afterwards isn't noticed.
+        '''
+        if self._max_weight is None:
+            self._max_weight = max(self.weights, default = 0)
+        return self._max_weight
+
+    def degree(self, v):
+        '''Return the number of edges out of vertex v.
+        '''
+        return self.offsets[v + 1] - self.offsets[v]
+
+    def sources(self):
+        '''Return an array('q') giving the vertex each edge comes out of, to go
+        alongside `neighbours` (i.e. the graph as parallel arrays of edges).
+        '''
+        offsets = self.offsets
+        result = array('q', [0]) * self.m
+        for v in range(self.n):
+            start, stop = offsets[v], offsets[v + 1]
+            result[start:stop] = array('q', [v]) * (stop - start)
+        return result
+
+    def edges(self, v):
+        '''Generate (neighbour, weight) pairs for the edges out of vertex v.
+        '''
+        for e in range(self.offsets[v], self.offsets[v + 1]):
+            yield self.neighbours[e], self.weights[e]
@@ -0,0 +1,79 @@
+'''
+
+    Kruskal's minimum spanning tree algorithm.
+
+    Kruskal's algorithm looks at the edges in order of increasing weight and
+    keeps each one which joins two different components of the forest made by
+    the edges kept so far. The components are kept in a Disjoint Set, so the
+    whole thing runs in O(mlgm), mostly sorting the edges. If the graph isn't
+    connected the result is a minimum spanning forest, with a tree for each
+    component.
+
+    The edges are never made into tuples: they are sorted by an argsort of
+    the weight array (with NumPy if it is installed) and handed to the
+    Disjoint Set's union_many as two arrays of endpoints.
+
+    For a detailed discussion see Introduction to Algorithms, Cormen et al.
+    Chapter 23.
+
+'''
+
+from array import array
+from bisect import bisect_right
+
+try:
+    import numpy
+except ImportError:
+    # Only used to sort the edges faster.
+    numpy = None
+
+from datastrucutres.disjointset import DisjointSet
+
+def kruskal(graph):
+    '''Find a minimum spanning forest of `graph`, a CSRGraph, treating every
+    edge as undirected.
+
+    Returns an array('q') of the edges in the forest, as positions in the
+    graph's `neighbours` and `weights` arrays (see `tree_edges`). An
+    undirected graph has each edge in both directions, but only one of them
+    will be picked.
+    '''
+    m = graph.m
+    sources = graph.sources()
+    if numpy is not None:
+        order = numpy.argsort(numpy.asarray(graph.weights), kind = 'stable')
+        xs = numpy.asarray(sources)[order]
+        ys = numpy.asarray(graph.neighbours)[order]
+    else:
+        order = sorted(range(m), key = graph.weights.__getitem__)
+        xs = array('q', [sources[e] for e in order])
+        ys = array('q', [graph.neighbours[e] for e in order])
+
+    merged = DisjointSet(graph.n).union_many(xs, ys)
+
+    if numpy is not None:
+        return array('q', order[numpy.frombuffer(merged, dtype = numpy.bool_)].tolist())
+    else:
+        return array('q', [order[i] for i in range(m) if merged[i]])
+
+def tree_edges(graph, tree):
+    '''Generate (u, v, weight) for each of the edges in `tree`, as returned by
+    `kruskal`.
+    '''
+    for e in tree:
+        # The edge comes out of the last vertex u with offsets[u] <= e.
+        u = bisect_right(graph.offsets, e) - 1
+        yield u, graph.neighbours[e], graph.weights[e]
+
+if __name__ == '__main__':
+    '''Some basic usage examples (run with python -m algorithms.kruskal):
+    '''
+    from algorithms.graph import CSRGraph
+    # The example graph from CLRS figure 23.1, with a to i as 0 to 8.
+    g = CSRGraph.from_edges(9, [
+        (0, 1, 4), (0, 7, 8), (1, 2, 8), (1, 7, 11), (2, 3, 7), (2, 5, 4),
+        (2, 8, 2), (3, 4, 9), (3, 5, 14), (4, 5, 10), (5, 6, 2), (6, 7, 1),
+        (6, 8, 6), (7, 8, 7)], directed = False)
+    tree = kruskal(g)
+    print(list(tree_edges(g, tree)))
+    print(sum(g.weights[e] for e in tree))
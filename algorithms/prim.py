@@ -0,0 +1,93 @@
+'''
+
+    Prim's minimum spanning tree algorithm.
+
+    Prim's algorithm grows a single tree out from a root vertex, always
+    adding next the cheapest edge from the tree to a vertex outside it. The
+    vertices outside the tree are kept in a priority queue keyed by the
+    weight of the cheapest edge found so far from the tree to them, so that
+    adding a vertex means extract_min, and finding a cheaper edge to one of
+    its neighbours means a decrease_key. It is very like Dijkstra's algorithm
+    (see algorithms/dijkstra.py), only with the edge weight as the key rather
+    than the distance.
+
+    With a Fibonacci Heap that is O(m + nlgn) in total. If the graph isn't
+    connected a tree is grown from each vertex not yet reached, giving a
+    minimum spanning forest.
+
+    For a detailed discussion see Introduction to Algorithms, Cormen et al.
+    Chapter 23.
+
+'''
+
+from array import array
+
+from datastrucutres.priorityqueue import make_queue
+
+def prim(graph, root = 0, queue = 'fibheap'):
+    '''Find a minimum spanning forest of `graph`, a CSRGraph which should be
+    undirected (have every edge in both directions), using the priority queue
+    called `queue`. The first tree is grown from `root`.
+
+    Returns an array('q') of the edges in the forest, as positions in the
+    graph's `neighbours` and `weights` arrays, in the order they were added
+    (see algorithms.kruskal.tree_edges).
+    '''
+    n = graph.n
+    offsets = graph.offsets
+    neighbours = graph.neighbours
+    weights = graph.weights
+
+    tree = array('q')
+    if n == 0:
+        return tree
+    in_tree = bytearray(n)
+    via = array('q', [-1]) * n # The cheapest edge found into each vertex.
+    nodes = [None] * n # The heap item for each vertex in the queue.
+
+    heap = make_queue(queue)
+    Node = heap.item_class
+    start = root
+    while True:
+        nodes[start] = Node(0, start)
+        heap.insert(nodes[start])
+        while heap.n:
+            v = heap.extract_min().payload
+            in_tree[v] = 1
+            nodes[v] = None
+            if via[v] != -1:
+                tree.append(via[v])
+            # Look for cheaper ways into the tree along the edges out of v.
+            for e in range(offsets[v], offsets[v + 1]):
+                w = neighbours[e]
+                if in_tree[w]:
+                    continue
+                node = nodes[w]
+                if node is None:
+                    node = nodes[w] = Node(weights[e], w)
+                    heap.insert(node)
+                elif weights[e] < node.key:
+                    heap.decrease_key(node, weights[e])
+                else:
+                    continue
+                via[w] = e
+        # Start the next tree from the next vertex not reached yet, if any.
+        start = in_tree.find(0, start)
+        if start == -1:
+            start = in_tree.find(0)
+        if start == -1:
+            return tree
+
+if __name__ == '__main__':
+    '''Some basic usage examples (run with python -m algorithms.prim):
+    '''
+    from algorithms.graph import CSRGraph
+    from algorithms.kruskal import tree_edges
+    # The example graph from CLRS figure 23.1, with a to i as 0 to 8.
+    g = CSRGraph.from_edges(9, [
+        (0, 1, 4), (0, 7, 8), (1, 2, 8), (1, 7, 11), (2, 3, 7), (2, 5, 4),
+        (2, 8, 2), (3, 4, 9), (3, 5, 14), (4, 5, 10), (5, 6, 2), (6, 7, 1),
+        (6, 8, 6), (7, 8, 7)], directed = False)
+    tree = prim(g)
+    print(list(tree_edges(g, tree)))
+    print(sum(g.weights[e] for e in tree))
@@ -0,0 +1,101 @@
+'''
+
+    Tests for Dijkstra's algorithm, against Bellman-Ford on random graphs.
+
+    Run from the top of the repository with python -m pytest.
+
+'''
+
+import random
+import unittest
+
+from algorithms.dijkstra import dijkstra, path
+from algorithms.graph import CSRGraph
+
+# The queues which can be used for integer weights.
+QUEUES = ['fibheap', 'pairing', 'binary', 'radix', 'veb']
+
+def random_graph(rnd, integers = True, directed = True):
+    '''Return a random CSRGraph, which may be disconnected and have loops,
+    parallel edges and ties between weights.
+    '''
+    n = rnd.randrange(1, 100)
+    m = rnd.randrange(0, 4 * n)
+    weight = (lambda: rnd.randrange(20)) if integers else rnd.random
+    edges = [(rnd.randrange(n), rnd.randrange(n), weight()) for _ in range(m)]
+    return CSRGraph.from_edges(n, edges, directed)
+
+def bellman_ford(graph, source):
+    '''Return the list of shortest distances from source, the slow way.
+    '''
+    distance = [float('inf')] * graph.n
+    distance[source] = 0
+    for _ in range(graph.n):
+        changed = False
+        for v in range(graph.n):
+            for w, weight in graph.edges(v):
+                if distance[v] + weight < distance[w]:
+                    distance[w] = distance[v] + weight
+                    changed = True
+        if not changed:
+            break
+    return distance
+
+class TestDijkstra(unittest.TestCase):
+
+    def check_paths(self, graph, source, distance, predecessor):
+        '''Check every reachable vertex's path is made of edges of the graph
+        and adds up to its distance.
+        '''
+        for v in range(graph.n):
+            if distance[v] == float('inf'):
+                self.assertEqual(predecessor[v], -1)
+                continue
+            vertices = path(predecessor, v)
+            self.assertEqual(vertices[0], source)
+            total = 0
+            for a, b in zip(vertices, vertices[1:]):
+                total += min(w for x, w in graph.edges(a) if x == b)
+            self.assertAlmostEqual(total, distance[v])
+
+    def test_against_bellman_ford(self):
+        rnd = random.Random(1)
+        for trial in range(40):
+            graph = random_graph(rnd, integers = trial % 2 == 0, directed = trial % 3 != 0)
+            source = rnd.randrange(graph.n)
+            distance, predecessor = dijkstra(graph, source)
+            expected = bellman_ford(graph, source)
+            for d, e in zip(distance, expected):
+                self.assertAlmostEqual(d, e)
+            self.check_paths(graph, source, distance, predecessor)
+
+    def test_queues(self):
+        # Every queue gives the same distances on integer weights, and paths
+        # which add up to them.
+        rnd = random.Random(3)
+        for trial in range(30):
+            graph = random_graph(rnd, directed = trial % 3 != 0)
+            source = rnd.randrange(graph.n)
+            expected = bellman_ford(graph, source)
+            for queue in QUEUES:
+                distance, predecessor = dijkstra(graph, source, queue = queue)
+                self.assertEqual(list(distance), expected, queue)
+                self.check_paths(graph, source, distance, predecessor)
+
+    def test_targets(self):
+        rnd = random.Random(2)
+        for trial in range(30):
+            graph = random_graph(rnd)
+            source = rnd.randrange(graph.n)
+            expected = bellman_ford(graph, source)
+            targets = rnd.sample(range(graph.n), rnd.randrange(1, min(5, graph.n) + 1))
+            for queue in ('fibheap', 'veb'):
+                distance = dijkstra(graph, source, targets, queue = queue)[0]
+                for v in targets:
+                    self.assertEqual(distance[v], expected[v])
+        # No targets at all settles nothing past the source.
+        graph = CSRGraph.from_edges(2, [(0, 1, 1)])
+        self.assertEqual(list(dijkstra(graph, 0, [])[0]), [0, float('inf')])
+
+if __name__ == '__main__':
+    unittest.main()
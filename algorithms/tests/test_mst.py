@@ -0,0 +1,87 @@
+'''
+
+    Tests for the minimum spanning tree algorithms, against a plain Python
+    Kruskal on random graphs.
+
+    Run from the top of the repository with python -m pytest.
+
+'''
+
+import random
+import unittest
+
+from algorithms.boruvka import boruvka
+from algorithms.graph import CSRGraph
+from algorithms.kruskal import kruskal, tree_edges
+from algorithms.prim import prim
+
+def random_graph(rnd, integers = True):
+    '''Return a random undirected CSRGraph, which may be disconnected and
+    have loops, parallel edges and ties between weights.
+    '''
+    n = rnd.randrange(1, 120)
+    m = rnd.randrange(0, 4 * n)
+    weight = (lambda: rnd.randrange(20)) if integers else rnd.random
+    edges = [(rnd.randrange(n), rnd.randrange(n), weight()) for _ in range(m)]
+    return CSRGraph.from_edges(n, edges, directed = False)
+
+def find(label, x):
+    while label[x] != x:
+        x = label[x]
+    return x
+
+def reference(graph):
+    '''Return the weight of a minimum spanning forest and its number of
+    edges, by sorting (u, v, weight) tuples.
+    '''
+    label = list(range(graph.n))
+    total = count = 0
+    edges = sorted(((w, u, v) for u in range(graph.n) for v, w in graph.edges(u)))
+    for w, u, v in edges:
+        ru, rv = find(label, u), find(label, v)
+        if ru != rv:
+            label[ru] = rv
+            total += w
+            count += 1
+    return total, count
+
+class TestSpanningTrees(unittest.TestCase):
+
+    def check_forest(self, graph, tree):
+        '''Check tree is a forest of distinct edges of graph and return its
+        weight and number of edges.
+        '''
+        self.assertEqual(len(set(tree)), len(tree))
+        label = list(range(graph.n))
+        total = 0
+        for u, v, w in tree_edges(graph, tree):
+            ru, rv = find(label, u), find(label, v)
+            self.assertNotEqual(ru, rv, 'the tree has a cycle')
+            label[ru] = rv
+            total += w
+        return total, len(tree)
+
+    def check(self, algorithm, seed, trials = 40):
+        rnd = random.Random(seed)
+        for trial in range(trials):
+            graph = random_graph(rnd, integers = trial % 2 == 0)
+            total, count = self.check_forest(graph, algorithm(graph))
+            expected = reference(graph)
+            self.assertEqual(count, expected[1])
+            self.assertAlmostEqual(total, expected[0])
+
+    def test_kruskal(self):
+        self.check(kruskal, 1)
+
+    def test_prim(self):
+        self.check(prim, 2)
+        self.check(lambda graph: prim(graph, queue = 'pairing'), 3)
+        # Any root gives the same forest weight.
+        self.check(lambda graph: prim(graph, root = graph.n - 1), 4)
+
+    def test_boruvka(self):
+        self.check(lambda graph: boruvka(graph, 1), 5)
+        self.check(lambda graph: boruvka(graph, 3), 6, trials = 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+'''
+
+    Throughput benchmark of the concurrent priority queues.
+
+    Each thread does the same mix of pushes and pops of random keys against
+    one shared queue, and the total operations per second are reported for
+    each number of threads. The queues compared are a single FibHeap behind
+    one lock, and ShardedPriorityQueue with exact and with relaxed pops. For
+    the relaxed pops the average rank error is also reported: how many items
+    in the queue were smaller than the one popped, found by replaying the
+    pops afterwards.
+
+    Run from the top of the repository, e.g.
+
+        python -m benchmarks.concurrent --threads 1 --threads 4 --threads 16
+
+    Under CPython's global interpreter lock the threads never really run at
+    once, so this mostly measures the cost of the locking, but the numbers
+    show what to expect from free-threaded builds too.
+
+'''
+
+import argparse
+import bisect
+import json
+import platform
+import random
+import sys
+import threading
+import time
+
+from datastrucutres.fibheap import FibHeap, FibHeapItem
+from datastrucutres.shardedqueue import ShardedPriorityQueue
+
+class LockedFibHeap(object):
+    '''The baseline: one FibHeap and one lock, with the same push and pop as
+    ShardedPriorityQueue.
+    '''
+    def __init__(self):
+        self.heap = FibHeap()
+        self.lock = threading.Lock()
+
+    def push(self, payload, key):
+        item = FibHeapItem(key, payload)
+        with self.lock:
+            self.heap.insert(item)
+
+    def pop(self):
+        with self.lock:
+            item = self.heap.extract_min()
+        if item is None:
+            raise IndexError('pop from an empty LockedFibHeap')
+        return item.payload, item.key
+
+def targets(shards):
+    '''Return a list of (name, function making an empty queue).
+    '''
+    return [
+        ('locked', LockedFibHeap),
+        ('sharded-exact', lambda: ShardedPriorityQueue(shards, relaxed = False)),
+        ('sharded-relaxed', lambda: ShardedPriorityQueue(shards, relaxed = True,
+                                                         rebalance_every = 20000)),
+    ]
+
+def worker(queue, ops, seed, log):
+    '''Do `ops` operations against queue, pushing twice as often as popping,
+    and append (time, 'push' or 'pop', key) to log for each.
+    '''
+    rnd = random.Random(seed)
+    for _ in range(ops):
+        if rnd.random() < 2 / 3:
+            key = rnd.random()
+            queue.push(None, key)
+            log.append((time.perf_counter(), 'push', key))
+        else:
+            try:
+                key = queue.pop()[1]
+            except IndexError:
+                continue
+            log.append((time.perf_counter(), 'pop', key))
+
+def rank_error(logs):
+    '''Replay the merged logs in time order, returning the average number of
+    keys in the queue smaller than each one popped. Only approximate, as the
+    times are taken after each operation and not during it.
+    '''
+    events = sorted(e for log in logs for e in log)
+    keys = list()
+    total = pops = 0
+    for _, op, key in events:
+        if op == 'push':
+            bisect.insort(keys, key)
+        else:
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                total += i
+                pops += 1
+                del keys[i]
+    return total / pops if pops else 0.0
+
+def run(threads, ops, shards, prefill):
+    results = list()
+    for name, make in targets(shards):
+        queue = make()
+        rnd = random.Random(-1)
+        for _ in range(prefill):
+            queue.push(None, rnd.random())
+        logs = [list() for _ in range(threads)]
+        workers = [threading.Thread(target = worker, args = (queue, ops, t, logs[t]))
+                   for t in range(threads)]
+        start = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        seconds = time.perf_counter() - start
+        result = {
+            'target': name,
+            'threads': threads,
+            'ops_per_sec': threads * ops / seconds,
+        }
+        if name == 'sharded-relaxed':
+            result['rank_error'] = rank_error(logs)
+        results.append(result)
+        print('{:>3} threads {:>16} {:>12,.0f} ops/s'.format(
+            threads, name, result['ops_per_sec']) +
+            ('   rank error {:.1f}'.format(result['rank_error'])
+             if 'rank_error' in result else ''))
+        sys.stdout.flush()
+    return results
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.split('\n\n')[1].strip(),
+                                     formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', action = 'append', type = int,
+                        help = 'number of threads (default: 1, 2, 4 and 8)')
+    parser.add_argument('--ops', type = int, default = 20000,
+                        help = 'operations per thread')
+    parser.add_argument('--shards', type = int, default = 8,
+                        help = 'shards in the ShardedPriorityQueues')
+    parser.add_argument('--prefill', type = int, default = 10000,
+                        help = 'items put in the queue before starting')
+    parser.add_argument('--output', help = 'write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    results = list()
+    for threads in args.threads or [1, 2, 4, 8]:
+        results.extend(run(threads, args.ops, args.shards, args.prefill))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'ops': args.ops,
+                'shards': args.shards,
+                'results': results,
+            }, f, indent = 2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+'''
+
+    Benchmark of the minimum spanning tree algorithms on the same graphs.
+
+    Prim's algorithm (on a Fibonacci Heap, and on any other queues asked for)
+    is compared with Borůvka's, both in one process and spread over a pool of
+    processes, and with Kruskal's. Each is run on the same random connected
+    graph and the total weight of every tree found is checked against the
+    others.
+
+    Run from the top of the repository, e.g.
+
+        python -m benchmarks.mst --size 200000 --processes 1 --processes 8
+
+'''
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from algorithms.boruvka import boruvka
+from algorithms.graph import CSRGraph
+from algorithms.kruskal import kruskal
+from algorithms.prim import prim
+
+def random_graph(size, degree, seed = 0):
+    '''A random connected undirected graph with `size` vertices and about
+    `size` * `degree` / 2 edges with integer weights. A random spanning tree
+    is put in first so that it is connected.
+    '''
+    rnd = random.Random(seed)
+    edges = list()
+    for v in range(1, size):
+        edges.append((rnd.randrange(v), v, rnd.randrange(1, 1000)))
+    for _ in range(size * degree // 2 - (size - 1)):
+        edges.append((rnd.randrange(size), rnd.randrange(size), rnd.randrange(1, 1000)))
+    return CSRGraph.from_edges(size, edges, directed = False)
+
+def targets(queues, processes):
+    '''Return a list of (name, function from graph to tree) to benchmark.
+    '''
+    result = list()
+    for queue in queues:
+        result.append(('prim-' + queue, lambda g, queue = queue: prim(g, queue = queue)))
+    for p in processes:
+        result.append(('boruvka-{:d}'.format(p), lambda g, p = p: boruvka(g, p)))
+    result.append(('kruskal', kruskal))
+    return result
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.split('\n\n')[1].strip(),
+                                     formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type = int, default = 50000,
+                        help = 'number of vertices')
+    parser.add_argument('--degree', type = int, default = 8,
+                        help = 'average degree of the vertices')
+    parser.add_argument('--queue', action = 'append',
+                        help = 'priority queue for Prim (default: fibheap)')
+    parser.add_argument('--processes', action = 'append', type = int,
+                        help = 'processes for Borůvka (default: 1 and one per CPU)')
+    parser.add_argument('--repeat', type = int, default = 3,
+                        help = 'time the best of this many runs')
+    parser.add_argument('--output', help = 'write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    graph = random_graph(args.size, args.degree)
+    processes = args.processes or sorted(set([1, os.cpu_count() or 1]))
+    results = list()
+    weight = None
+    for name, mst in targets(args.queue or ['fibheap'], processes):
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            tree = mst(graph)
+            best = min(best, time.perf_counter() - start)
+        total = sum(graph.weights[e] for e in tree)
+        if weight is None:
+            weight = total
+        elif total != weight:
+            print('MISMATCH: {!s} found weight {!s}, not {!s}'.format(name, total, weight))
+            return 1
+        results.append({'target': name, 'seconds': best, 'weight': total})
+        print('{:>14} {:>10.3f} s'.format(name, best))
+        sys.stdout.flush()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'size': args.size,
+                'degree': args.degree,
+                'results': results,
+            }, f, indent = 2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,279 @@
+'''
+
+    Benchmarks for the priority queues and the vEB tree.
+
+    Each workload (see benchmarks/traces.py) is replayed against every target
+    of the same kind, including baselines from the standard library (heapq,
+    bisect) and sortedcontainers if it is installed, and for each one the
+    operations per second, the peak memory used (from tracemalloc) and the
+    number of memory blocks still allocated for the finished datastructure are
+    reported.
+
+    Run from the top of the repository, e.g.
+
+        python -m benchmarks.run --size 20000 --output results.json
+        python -m benchmarks.run --save-baseline baseline.json
+        python -m benchmarks.run --baseline baseline.json --threshold 0.2
+
+    With --baseline the exit status is 1 if anything got more than
+    --threshold (as a fraction) slower than in the stored baseline, so this
+    can be used to catch performance regressions. Timings only mean anything
+    on the machine the baseline was made on.
+
+'''
+
+import argparse
+import bisect
+import gc
+import heapq
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.traces import Trace, WORKLOADS
+from datastrucutres.priorityqueue import make_queue
+from datastrucutres.vebtree import VEBTree
+
+try:
+    from sortedcontainers import SortedList
+except ImportError:
+    SortedList = None
+
+def queue_replay(name, options = None):
+    '''Make a replay function for heap traces against the priority queue
+    called `name`. If given, `options` is a function from the trace to a dict
+    of arguments for the queue's constructor.
+    '''
+    def replay(trace):
+        heap = make_queue(name, **(options(trace) if options else {}))
+        Node = heap.item_class
+        items = dict()
+        for op in trace.ops:
+            code = op[0]
+            if code == 'i':
+                item = items[op[1]] = Node(op[2], op[1])
+                heap.insert(item)
+            elif code == 'd':
+                heap.decrease_key(items[op[1]], op[2])
+            elif code == 'x':
+                item = heap.extract_min()
+                del items[item.payload]
+            else:
+                heap.delete(items.pop(op[1]))
+        return heap
+    return replay
+
+def key_span(trace):
+    '''The span the 'veb' bucket queue needs for a heap trace, which starting
+    from 0 is one more than the largest key.
+    '''
+    return {'span': max(op[2] for op in trace.ops if len(op) == 3) + 1}
+
+def heapq_replay(trace):
+    '''Replay a heap trace using heapq, with decrease_key and delete done by
+    pushing new entries and skipping stale ones when popping.
+    '''
+    heap = list()
+    current = dict()
+    for op in trace.ops:
+        code = op[0]
+        if code == 'i' or code == 'd':
+            current[op[1]] = op[2]
+            heapq.heappush(heap, (op[2], op[1]))
+        elif code == 'x':
+            while heap:
+                key, i = heapq.heappop(heap)
+                if current.get(i) == key:
+                    del current[i]
+                    break
+        else:
+            del current[op[1]]
+    return heap
+
+def veb_replay(trace):
+    '''Replay a set trace against a sparse VEBTree.
+    '''
+    tree = VEBTree(trace.u, True)
+    for code, key in trace.ops:
+        if code == 'i':
+            tree.insert(key)
+        elif code == 's':
+            tree.successor(key)
+        elif code == 'm':
+            tree.member(key)
+        else:
+            tree.delete(key)
+    return tree
+
+def bisect_replay(trace):
+    '''Replay a set trace against a sorted list, using bisect.
+    '''
+    keys = list()
+    for code, key in trace.ops:
+        i = bisect.bisect_left(keys, key)
+        if code == 'i':
+            if i == len(keys) or keys[i] != key:
+                keys.insert(i, key)
+        elif code == 's':
+            i = bisect.bisect_right(keys, key)
+            keys[i] if i < len(keys) else None
+        elif code == 'm':
+            i < len(keys) and keys[i] == key
+        elif i < len(keys) and keys[i] == key:
+            del keys[i]
+    return keys
+
+def sortedlist_replay(trace):
+    '''Replay a set trace against a sortedcontainers SortedList.
+    '''
+    keys = SortedList()
+    for code, key in trace.ops:
+        if code == 'i':
+            if key not in keys:
+                keys.add(key)
+        elif code == 's':
+            i = keys.bisect_right(key)
+            keys[i] if i < len(keys) else None
+        elif code == 'm':
+            key in keys
+        else:
+            keys.discard(key)
+    return keys
+
+# The targets for each kind of trace, by name.
+TARGETS = {
+    'heap': {
+        'fibheap': queue_replay('fibheap'),
+        'pairing': queue_replay('pairing'),
+        'binary': queue_replay('binary'),
+        'radix': queue_replay('radix'),
+        'veb': queue_replay('veb', key_span),
+        'heapq': heapq_replay,
+    },
+    'set': {
+        'vebtree': veb_replay,
+        'bisect': bisect_replay,
+    },
+}
+if SortedList is not None:
+    TARGETS['set']['sortedlist'] = sortedlist_replay
+
+def measure(replay, trace, repeat):
+    '''Replay `trace` with `replay` and return a dict of measurements: the
+    best time of `repeat` runs, and then the peak memory and the blocks left
+    allocated by the result from one more run under tracemalloc.
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        replay(trace)
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = replay(trace)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    gc.collect()
+    retained = sys.getallocatedblocks() - blocks
+    del result
+
+    return {
+        'ops': len(trace),
+        'seconds': best,
+        'ops_per_sec': len(trace) / best if best > 0 else float('inf'),
+        'peak_bytes': peak,
+        'retained_blocks': retained,
+    }
+
+def run(traces, targets, repeat):
+    '''Run every trace against every target of its kind (or just those named
+    in `targets`), returning a list of result dicts.
+    '''
+    results = list()
+    for trace in traces:
+        for name, replay in sorted(TARGETS[trace.kind].items()):
+            if targets and name not in targets:
+                continue
+            result = {'workload': trace.name, 'target': name}
+            result.update(measure(replay, trace, repeat))
+            results.append(result)
+            print('{workload:>16} {target:>12} {ops_per_sec:>14,.0f} ops/s '
+                  '{peak_bytes:>14,} B peak {retained_blocks:>10,} blocks'
+                  .format(**result))
+    return results
+
+def regressions(results, baseline, threshold):
+    '''Return a list of messages, one for each result more than `threshold`
+    slower than the matching result in `baseline`.
+    '''
+    before = dict()
+    for r in baseline['results']:
+        before[(r['workload'], r['target'])] = r['ops_per_sec']
+    messages = list()
+    for r in results:
+        old = before.get((r['workload'], r['target']))
+        if old and r['ops_per_sec'] < old * (1 - threshold):
+            messages.append('{!s} on {!s}: {:,.0f} ops/s, was {:,.0f}'.format(
+                r['target'], r['workload'], r['ops_per_sec'], old))
+    return messages
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.split('\n\n')[1].strip(),
+                                     formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workload', action = 'append', choices = sorted(WORKLOADS),
+                        help = 'synthetic workload to run (default: all)')
+    parser.add_argument('--trace', action = 'append', default = [],
+                        help = 'recorded trace file to run as well')
+    parser.add_argument('--target', action = 'append',
+                        help = 'only run against this target')
+    parser.add_argument('--size', type = int, default = 10000,
+                        help = 'size of the synthetic workloads')
+    parser.add_argument('--repeat', type = int, default = 3,
+                        help = 'time the best of this many runs')
+    parser.add_argument('--record', metavar = 'DIR',
+                        help = 'save the synthetic traces in DIR and stop')
+    parser.add_argument('--output', help = 'write the results to this JSON file')
+    parser.add_argument('--baseline', help = 'compare against this results file')
+    parser.add_argument('--save-baseline', metavar = 'PATH',
+                        help = 'write the results to PATH for use with --baseline')
+    parser.add_argument('--threshold', type = float, default = 0.2,
+                        help = 'allowed slowdown against the baseline (default 0.2)')
+    args = parser.parse_args(argv)
+
+    workloads = args.workload
+    if workloads is None:
+        workloads = [] if args.trace else sorted(WORKLOADS)
+    traces = [WORKLOADS[w](args.size) for w in workloads]
+    if args.record:
+        for trace in traces:
+            trace.save('{!s}/{!s}.trace'.format(args.record, trace.name))
+        return 0
+    traces.extend(Trace.load(path) for path in args.trace)
+
+    results = run(traces, args.target, args.repeat)
+    report = {
+        'python': platform.python_version(),
+        'size': args.size,
+        'results': results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent = 2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        slower = regressions(results, baseline, args.threshold)
+        for message in slower:
+            print('REGRESSION: ' + message)
+        if slower:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+'''
+
+    Benchmark of the TimerWheel against a heapq timer queue under cancels.
+
+    Both get the same workload, as from a server with a timeout on every
+    request: each tick `--rate` timers are set for a random number of ticks
+    up to `--timeout` ahead, most of them (`--cancel`) are cancelled again
+    some time before they are due, and the time is moved on a tick, firing
+    the rest. The heapq queue cancels lazily, the way asyncio's event loop
+    does: a cancelled timer is only marked, and the heap is rebuilt without
+    them once they are over half of it. The time taken and the most entries
+    each held at once are reported.
+
+    Run from the top of the repository, e.g.
+
+        python -m benchmarks.timers --rate 2000 --timeout 5000 --cancel 0.99
+
+'''
+
+import argparse
+import heapq
+import json
+import platform
+import random
+import sys
+import time
+
+from datastrucutres.timerwheel import TimerWheel
+
+class HeapTimers(object):
+    '''The baseline: a heapq list of [tick, count, callback, args] entries,
+    with the same insert, cancel and advance_to as TimerWheel.
+    '''
+    def __init__(self, now = 0):
+        self.now = now
+        self.heap = list()
+        self.count = 0
+        self.cancelled = 0
+
+    def __len__(self):
+        return len(self.heap) - self.cancelled
+
+    def insert(self, tick, callback, *args):
+        entry = [tick, self.count, callback, args]
+        self.count += 1
+        heapq.heappush(self.heap, entry)
+        return entry
+
+    def cancel(self, entry):
+        if entry[2] is None:
+            return False
+        entry[2] = None
+        self.cancelled += 1
+        if self.cancelled > 100 and self.cancelled * 2 > len(self.heap):
+            self.heap = [e for e in self.heap if e[2] is not None]
+            heapq.heapify(self.heap)
+            self.cancelled = 0
+        return True
+
+    def advance_to(self, now):
+        fired = 0
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            callback = entry[2]
+            if callback is None:
+                self.cancelled -= 1
+                continue
+            entry[2] = None
+            self.now = entry[0]
+            fired += 1
+            callback(*entry[3])
+        self.now = now
+        return fired
+
+    def entries(self):
+        return len(self.heap)
+
+def targets(u):
+    '''Return a list of (name, function making an empty timer queue, function
+    returning how many entries it holds).
+    '''
+    return [
+        ('heapq', HeapTimers, HeapTimers.entries),
+        ('timerwheel', lambda: TimerWheel(u), lambda w: len(w) + len(w.overflow)),
+    ]
+
+def workload(ticks, rate, timeout, cancel, seed = 0):
+    '''Return a list with, for each tick, a list of (delay, when cancelled or
+    None) for the timers set in it.
+    '''
+    rnd = random.Random(seed)
+    result = list()
+    for _ in range(ticks):
+        timers = list()
+        for _ in range(rate):
+            delay = rnd.randrange(1, timeout + 1)
+            timers.append((delay, rnd.randrange(delay) if rnd.random() < cancel else None))
+        result.append(timers)
+    return result
+
+def run(queue, entries, work, timeout):
+    '''Play work against queue, returning (seconds, most entries at once,
+    timers fired).
+    '''
+    def noop():
+        pass
+    cancels = [list() for _ in range(len(work) + timeout)]
+    fired = most = 0
+    start = time.perf_counter()
+    for now, timers in enumerate(work):
+        for delay, cancel_in in timers:
+            timer = queue.insert(now + delay, noop)
+            if cancel_in is not None:
+                cancels[now + cancel_in].append(timer)
+        for timer in cancels[now]:
+            queue.cancel(timer)
+        cancels[now] = None
+        fired += queue.advance_to(now)
+        if now % 64 == 0:
+            most = max(most, entries(queue))
+    seconds = time.perf_counter() - start
+    return seconds, most, fired
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.split('\n\n')[1].strip(),
+                                     formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ticks', type = int, default = 2000,
+                        help = 'number of ticks to run for')
+    parser.add_argument('--rate', type = int, default = 500,
+                        help = 'timers set each tick')
+    parser.add_argument('--timeout', type = int, default = 2000,
+                        help = 'longest delay of a timer, in ticks')
+    parser.add_argument('--cancel', type = float, default = 0.95,
+                        help = 'fraction of the timers cancelled before they fire')
+    parser.add_argument('--universe', type = int, default = 2 ** 16,
+                        help = 'window of the TimerWheel, in ticks (a power of 2)')
+    parser.add_argument('--output', help = 'write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    work = workload(args.ticks, args.rate, args.timeout, args.cancel)
+    results = list()
+    expected = None
+    for name, make, entries in targets(args.universe):
+        seconds, most, fired = run(make(), entries, work, args.timeout)
+        if expected is None:
+            expected = fired
+        elif fired != expected:
+            print('MISMATCH: {!s} fired {!s} timers, not {!s}'.format(name, fired, expected))
+            return 1
+        ops = args.ticks * args.rate / seconds
+        results.append({'target': name, 'seconds': seconds, 'timers_per_sec': ops,
+                        'most_entries': most, 'fired': fired})
+        print('{:>12} {:>10.3f} s {:>12,.0f} timers/s {:>10,d} entries at most'.format(
+            name, seconds, ops, most))
+        sys.stdout.flush()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'ticks': args.ticks,
+                'rate': args.rate,
+                'timeout': args.timeout,
+                'cancel': args.cancel,
+                'universe': args.universe,
+                'results': results,
+            }, f, indent = 2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+'''
+
+    Operation traces for the benchmarks.
+
+    A trace is a list of operations to replay against a datastructure, each
+    a tuple starting with a one letter code. There are two kinds of trace:
+
+    'heap' traces, for priority queues, where items are referred to by an id:
+
+    * ('i', id, key) - insert a new item.
+    * ('d', id, key) - decrease the key of an item.
+    * ('r', id) - delete an item.
+    * ('x',) - extract the minimum.
+
+    'set' traces, for ordered sets of integers in range(u):
+
+    * ('i', key) - insert.
+    * ('e', key) - delete (erase).
+    * ('m', key) - member.
+    * ('s', key) - successor.
+
+    Keys are always integers, so every trace can be replayed against every
+    datastructure of its kind, including the Radix Heap. Traces can be saved
+    to and loaded from a simple text format (one operation per line after a
+    header line giving the kind), so that traces recorded from real runs can
+    be benchmarked as well as the synthetic ones made here.
+
+'''
+
+import heapq
+import random
+
+class Trace(object):
+    '''A named list of operations of one kind ('heap' or 'set'). For set
+    traces `u` is the size of the universe of keys.
+    '''
+    def __init__(self, name, kind, ops, u = None):
+        self.name = name
+        self.kind = kind
+        self.ops = ops
+        self.u = u
+
+    def __len__(self):
+        return len(self.ops)
+
+    def save(self, path):
+        '''Write the trace to the file at `path`.
+        '''
+        with open(path, 'w') as f:
+            f.write('# {!s} {!s} {!s}\n'.format(self.kind, self.name, self.u or 0))
+            for op in self.ops:
+                f.write(' '.join(str(x) for x in op))
+                f.write('\n')
+
+    @classmethod
+    def load(cls, path):
+        '''Read a trace written by `save` (or recorded by anything else using
+        the same format).
+        '''
+        with open(path) as f:
+            _, kind, name, u = f.readline().split()
+            ops = list()
+            for line in f:
+                parts = line.split()
+                if parts:
+                    ops.append((parts[0],) + tuple(int(x) for x in parts[1:]))
+        return cls(name, kind, ops, int(u) or None)
+
+def dijkstra_trace(size, seed = 0):
+    '''The insert/decrease_key/extract_min mix made by running Dijkstra's
+    algorithm on a random graph with `size` vertices and 5 * `size` edges
+    with integer weights.
+    '''
+    rnd = random.Random(seed)
+    adjacency = [list() for _ in range(size)]
+    for _ in range(5 * size):
+        u, v = rnd.randrange(size), rnd.randrange(size)
+        w = rnd.randrange(1, 1000)
+        adjacency[u].append((v, w))
+        adjacency[v].append((u, w))
+
+    # Dijkstra with heapq and lazy deletion, writing down the operations a
+    # decrease_key queue would have been asked to do.
+    ops = list()
+    distance = dict()
+    settled = set()
+    queue = [(0, 0)]
+    distance[0] = 0
+    ops.append(('i', 0, 0))
+    while queue:
+        d, v = heapq.heappop(queue)
+        if v in settled or d > distance[v]:
+            continue
+        settled.add(v)
+        ops.append(('x',))
+        for w, weight in adjacency[v]:
+            if w in settled:
+                continue
+            new_d = d + weight
+            if w not in distance:
+                ops.append(('i', w, new_d))
+            elif new_d < distance[w]:
+                ops.append(('d', w, new_d))
+            else:
+                continue
+            distance[w] = new_d
+            heapq.heappush(queue, (new_d, w))
+    return Trace('dijkstra', 'heap', ops)
+
+def bulk_trace(size, seed = 0):
+    '''Insert `size` random keys and then extract them all.
+    '''
+    rnd = random.Random(seed)
+    ops = [('i', i, rnd.randrange(10 * size)) for i in range(size)]
+    ops.extend([('x',)] * size)
+    return Trace('bulk', 'heap', ops)
+
+def successor_scan_trace(size, seed = 0, u = 2 ** 24):
+    '''Insert `size` random keys in range(u), then do scans of 100 keys
+    each, successor by successor, from random places, with some member
+    queries and deletes mixed in.
+    '''
+    rnd = random.Random(seed)
+    keys = sorted(set(rnd.randrange(u) for _ in range(size)))
+    ops = [('i', k) for k in rnd.sample(keys, len(keys))]
+    for _ in range(max(1, size // 100)):
+        start = rnd.randrange(len(keys))
+        for k in keys[start:start + 100]:
+            ops.append(('s', k))
+        ops.append(('m', rnd.randrange(u)))
+    for k in rnd.sample(keys, len(keys) // 10):
+        ops.append(('e', k))
+    return Trace('successor-scan', 'set', ops, u)
+
+# The synthetic workloads, by name.
+WORKLOADS = {
+    'dijkstra': dijkstra_trace,
+    'bulk': bulk_trace,
+    'successor-scan': successor_scan_trace,
+}
@@ -0,0 +1,270 @@
+'''
+
+    A priority queue for asyncio, and a deadline scheduler built on it.
+
+    asyncio.PriorityQueue is a heapq list underneath, so an entry can't have
+    its priority changed or be taken out without rebuilding the list. The
+    AsyncPriorityQueue here is a PriorityMap (see fibheap.py) instead, so
+    entries can be looked up by payload or handle, and decrease_key is O(1)
+    amortized.
+
+    As with asyncio.Queue, `await get()` waits until there is something to
+    get, and whatever changes the queue wakes the waiters. There is also
+    `await changed()`, which waits until the first entry changes (e.g. a put
+    or decrease_key put something in front of it). That is what the
+    DeadlineScheduler uses to sleep until the earliest deadline while still
+    noticing when an earlier one turns up.
+
+'''
+
+import asyncio
+from collections import deque
+
+try:
+    from .fibheap import PriorityMap
+except ImportError:
+    # Being run as a script from this directory, e.g. for the examples below.
+    from fibheap import PriorityMap
+
+class AsyncPriorityQueue(object):
+    '''An unbounded priority queue of payloads with keys, for coroutines
+    running in one event loop.
+
+    Payloads must be hashable and can be in the queue at most once, as for a
+    PriorityMap, and handles returned by put can be used instead of them.
+    '''
+    def __init__(self):
+        self.map = PriorityMap()
+        self.getters = deque() # Futures of the coroutines waiting in get.
+        self.watchers = list() # Futures of those waiting in changed.
+
+    def __len__(self):
+        return len(self.map)
+
+    def __contains__(self, payload):
+        return payload in self.map
+
+    def empty(self):
+        return len(self.map) == 0
+
+    def first(self):
+        '''Return the (payload, key) pair with the smallest key without
+        removing it, or None if the queue is empty.
+        '''
+        return self.map.first()
+
+    def _wake_getter(self):
+        while self.getters:
+            getter = self.getters.popleft()
+            if not getter.done():
+                getter.set_result(None)
+                break
+
+    def _changing(self):
+        '''Call before anything which may change the first entry, and pass
+        what it returns to _changed afterwards.
+        '''
+        node = self.map.heap.min
+        return node, node.key if node is not None else None
+
+    def _changed(self, before):
+        '''Wake the watchers if the first entry isn't what it was `before`.
+        '''
+        node = self.map.heap.min
+        if (node, node.key if node is not None else None) != before:
+            for watcher in self.watchers:
+                if not watcher.done():
+                    watcher.set_result(None)
+            self.watchers.clear()
+
+    def put(self, payload, key):
+        '''Add `payload` to the queue with the given `key`, waking a waiting
+        get, and return its handle.
+
+        A ValueError is raised if `payload` is already in the queue.
+        '''
+        before = self._changing()
+        handle = self.map.push(payload, key)
+        self._wake_getter()
+        self._changed(before)
+        return handle
+
+    def get_nowait(self):
+        '''Remove and return the (payload, key) pair with the smallest key.
+
+        An asyncio.QueueEmpty is raised if the queue is empty.
+        '''
+        if not self.map:
+            raise asyncio.QueueEmpty()
+        before = self._changing()
+        result = self.map.pop()
+        self._changed(before)
+        return result
+
+    async def get(self):
+        '''Remove and return the (payload, key) pair with the smallest key,
+        first waiting until there is one.
+        '''
+        while not self.map:
+            getter = asyncio.get_running_loop().create_future()
+            self.getters.append(getter)
+            try:
+                await getter
+            except:
+                getter.cancel()
+                try:
+                    self.getters.remove(getter)
+                except ValueError:
+                    pass
+                # If this one was woken, pass that on to the next.
+                if self.map and not getter.cancelled():
+                    self._wake_getter()
+                raise
+        return self.get_nowait()
+
+    async def changed(self, timeout = None):
+        '''Wait until the first entry changes (something is put in front of
+        it, it is taken out, or its key is changed), or until `timeout`
+        seconds have gone by. Returns True if it changed, False on a timeout.
+        '''
+        watcher = asyncio.get_running_loop().create_future()
+        self.watchers.append(watcher)
+        try:
+            await asyncio.wait_for(watcher, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            if watcher in self.watchers:
+                self.watchers.remove(watcher)
+
+    def decrease_key(self, ref, new_key):
+        '''Lower the key of `ref` (a payload or handle) to `new_key`.
+
+        A ValueError is raised if `new_key` is greater than the current key.
+        '''
+        before = self._changing()
+        self.map.decrease_key(ref, new_key)
+        self._changed(before)
+
+    def update(self, ref, key):
+        '''Set the key of `ref` (a payload or handle) to `key`, putting it in
+        the queue if it is a payload which isn't there, and return its handle.
+        Lowering a key is O(1) amortized, raising it O(lgn).
+        '''
+        before = self._changing()
+        n = len(self.map)
+        handle = self.map.update(ref, key)
+        if len(self.map) > n:
+            self._wake_getter()
+        self._changed(before)
+        return handle
+
+    def remove(self, ref):
+        '''Remove `ref` (a payload or handle) from the queue, returning its
+        key.
+        '''
+        before = self._changing()
+        key = self.map.remove(ref)
+        self._changed(before)
+        return key
+
+class DeadlineScheduler(object):
+    '''Runs coroutines at given times, by the clock of the event loop
+    (loop.time()), each as a task of its own.
+
+    The coroutines waiting for their time are kept in an AsyncPriorityQueue
+    keyed by it, so moving one earlier is a decrease_key. Start `run` as a
+    task for anything to happen.
+    '''
+    def __init__(self):
+        self.queue = AsyncPriorityQueue()
+        self.tasks = set() # The tasks started, until they finish.
+
+    def __len__(self):
+        '''Return the number of coroutines still waiting for their time.
+        '''
+        return len(self.queue)
+
+    def schedule(self, coroutine, when):
+        '''Run `coroutine` at time `when`, and return a handle for it.
+        '''
+        return self.queue.put(coroutine, when)
+
+    def schedule_in(self, coroutine, delay):
+        '''Run `coroutine` in `delay` seconds, and return a handle for it.
+        '''
+        return self.schedule(coroutine, asyncio.get_running_loop().time() + delay)
+
+    def reschedule(self, handle, when):
+        '''Move the coroutine of `handle` to time `when` (earlier is O(1)
+        amortized). The handle stays the same.
+
+        A KeyError is raised if the coroutine has already been started or
+        cancelled.
+        '''
+        return self.queue.update(handle, when)
+
+    def cancel(self, handle):
+        '''Drop the coroutine of `handle` without running it.
+
+        A KeyError is raised if the coroutine has already been started or
+        cancelled.
+        '''
+        coroutine = self.queue.map.node(handle).payload
+        self.queue.remove(handle)
+        coroutine.close()
+
+    async def run(self):
+        '''Start each coroutine when its time comes, forever (or until this is
+        cancelled). Coroutines whose time has already passed are started
+        straight away, earliest first.
+        '''
+        loop = asyncio.get_running_loop()
+        while True:
+            first = self.queue.first()
+            if first is None:
+                await self.queue.changed()
+                continue
+            coroutine, when = first
+            delay = when - loop.time()
+            if delay > 0:
+                # Sleep until then, unless something comes in before it.
+                await self.queue.changed(delay)
+                continue
+            self.queue.get_nowait()
+            task = loop.create_task(coroutine)
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+if __name__ == '__main__':
+    '''Some basic usage examples:
+    '''
+    async def job(name, log):
+        log.append(name)
+
+    async def main():
+        queue = AsyncPriorityQueue()
+        getter = asyncio.ensure_future(queue.get())
+        await asyncio.sleep(0)
+        queue.put('b', 2)
+        print(await getter)
+        queue.put('c', 3)
+        queue.put('d', 4)
+        queue.decrease_key('d', 1)
+        print(await queue.get(), await queue.get())
+
+        log = list()
+        scheduler = DeadlineScheduler()
+        runner = asyncio.ensure_future(scheduler.run())
+        scheduler.schedule_in(job('late', log), 0.03)
+        early = scheduler.schedule_in(job('moved', log), 0.05)
+        dropped = scheduler.schedule_in(job('cancelled', log), 0.01)
+        scheduler.schedule_in(job('soon', log), 0.02)
+        scheduler.reschedule(early, asyncio.get_running_loop().time() + 0.005)
+        scheduler.cancel(dropped)
+        await asyncio.sleep(0.06)
+        runner.cancel()
+        print(log)
+
+    asyncio.run(main())
@@ -0,0 +1,176 @@
+'''
+
+    An implementation of an indexed Binary Heap.
+
+    This is the usual binary min-heap stored in an array, where the children
+    of the item at position i are at 2i + 1 and 2i + 2. Each item also
+    remembers its own position in the array (`index`), which is kept up to
+    date as items move, so that decrease_key and delete can find an item
+    straight away rather than having to search for it.
+
+    insert, extract_min, decrease_key and delete are all O(lgn), merge is
+    O(n) as the two arrays are joined and then re-heapified. The constant
+    factors are small though, which often makes this the quickest choice.
+
+    For more details see Introduction to Algorithms, Cormen et al. Chapter 6.
+
+'''
+
+try:
+    from .item import Item
+    from .priorityqueue import PriorityQueue
+except ImportError:
+    # Being run as a script from this directory, e.g. for the examples below.
+    from item import Item
+    from priorityqueue import PriorityQueue
+
+class BinaryHeapItem(Item):
+    '''A subclass of the Item base class for Items to go in IndexedBinaryHeaps.
+    '''
+    __slots__ = ('index',)
+
+    def __init__(self, *args, **kwargs):
+        Item.__init__(self, *args, **kwargs)
+        self.index = None
+
+    def __str__(self):
+        t = '<BinaryHeapItem: key={!s}, payload={!r}, index={!s}>'
+        return t.format(self.key, self.payload, self.index)
+
+class IndexedBinaryHeap(PriorityQueue):
+    '''An indexed Binary Heap which implements the interface of a priority
+    queue.
+    '''
+    item_class = BinaryHeapItem
+
+    def __init__(self):
+        self.heap = list()
+
+    @property
+    def n(self):
+        return len(self.heap)
+
+    def __str__(self):
+        if not self.heap:
+            return '<IndexedBinaryHeap: Empty>'
+        t = '<IndexedBinaryHeap: n={!s}, min={!s}>'
+        return t.format(len(self.heap), self.heap[0])
+
+    def sift_up(self, i):
+        '''Move the item at position i up until its parent's key isn't bigger.
+        '''
+        heap = self.heap
+        item = heap[i]
+        key = item.key
+        while i > 0:
+            parent = (i - 1) >> 1
+            above = heap[parent]
+            if above.key <= key:
+                break
+            # Move the parent down into the hole.
+            heap[i] = above
+            above.index = i
+            i = parent
+        heap[i] = item
+        item.index = i
+
+    def sift_down(self, i):
+        '''Move the item at position i down until neither child has a smaller
+        key.
+        '''
+        heap = self.heap
+        size = len(heap)
+        item = heap[i]
+        key = item.key
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            # Pick the smaller child.
+            if child + 1 < size and heap[child + 1].key < heap[child].key:
+                child += 1
+            below = heap[child]
+            if key <= below.key:
+                break
+            # Move the child up into the hole.
+            heap[i] = below
+            below.index = i
+            i = child
+        heap[i] = item
+        item.index = i
+
+    def insert(self, item):
+        '''Insert an item into this heap.
+        '''
+        self.heap.append(item)
+        self.sift_up(len(self.heap) - 1)
+
+    def merge(self, another):
+        '''Merge another IndexedBinaryHeap into this one.
+        '''
+        heap = self.heap
+        for item in another.heap:
+            item.index = len(heap)
+            heap.append(item)
+        # Re-heapify from the bottom up.
+        for i in range(len(heap) // 2 - 1, -1, -1):
+            self.sift_down(i)
+
+    def first(self):
+        '''Return the item with the minimum key without removing it.
+        '''
+        if self.heap:
+            return self.heap[0]
+        return None
+
+    def extract_min(self):
+        '''Remove and return the item with the minimum key.
+        '''
+        heap = self.heap
+        if not heap:
+            return None
+        top = heap[0]
+        last = heap.pop()
+        if heap:
+            heap[0] = last
+            self.sift_down(0)
+        top.index = None
+        return top
+
+    def decrease_key(self, item, new_key):
+        '''Decrease the `key` of `item` to `new_key`.
+        '''
+        assert(new_key <= item.key)
+        item.key = new_key
+        self.sift_up(item.index)
+
+    def delete(self, item):
+        '''Delete an item from its IndexedBinaryHeap.
+
+        Warning: The behaviour if `item` isn't in this heap is undefined.
+        '''
+        heap = self.heap
+        i = item.index
+        last = heap.pop()
+        if last is not item:
+            # Fill the hole with the last item and move that into place.
+            heap[i] = last
+            last.index = i
+            if i > 0 and heap[(i - 1) >> 1].key > last.key:
+                self.sift_up(i)
+            else:
+                self.sift_down(i)
+        item.index = None
+
+if __name__ == '__main__':
+    '''Some basic usage examples:
+    '''
+    heap = IndexedBinaryHeap()
+    items = [BinaryHeapItem(k, 'item ' + str(k)) for k in [5, 3, 8, 1, 9, 2]]
+    for i in items:
+        heap.insert(i)
+    print(heap)
+    heap.decrease_key(items[2], 0)
+    heap.delete(items[0])
+    while heap.n:
+        print(heap.extract_min())
@@ -0,0 +1,200 @@
+'''
+
+    A monotone bucket queue, with a vEB tree to find the next bucket.
+
+    Like the Radix Heap this only works for integer keys which are "monotone"
+    (no key inserted or decreased to is smaller than that of the last item
+    extracted, `last`), and it also needs to know the span C of the keys: how
+    far above `last` any key can be. In Dijkstra's algorithm, for example,
+    every key in the queue is at most `last` plus the largest edge weight.
+
+    Every key then lies in [last, last + u), where u is C rounded up to a
+    power of 2, so key mod u picks out a bucket of a circular array (Dial's
+    algorithm) with only one key in each. Rather than stepping along the
+    array to the next non-empty bucket, as Dial does, the occupied buckets
+    are kept in a VEBTree which finds the next one, going round from last
+    mod u, with a successor query in O(lglgC). So insert, decrease_key and
+    delete are O(lglgC) (and O(1) if the bucket is already occupied) and so
+    is extract_min.
+
+    See Dial, "Algorithm 360: Shortest-Path Forest with Topological Ordering",
+    CACM 1969, and vebtree.py for the vEB tree.
+
+'''
+
+try:
+    from .item import Item
+    from .priorityqueue import PriorityQueue
+    from .vebtree import VEBTree
+except ImportError:
+    # Being run as a script from this directory, e.g. for the examples below.
+    from item import Item
+    from priorityqueue import PriorityQueue
+    from vebtree import VEBTree
+
+class BucketQueueItem(Item):
+    '''A subclass of the Item base class for Items to go in VEBBucketQueues.
+    Each item knows where it is in its bucket.
+    '''
+    __slots__ = ('index',)
+
+    def __init__(self, *args, **kwargs):
+        Item.__init__(self, *args, **kwargs)
+        self.index = None
+
+    def __str__(self):
+        t = '<BucketQueueItem: key={!s}, payload={!r}>'
+        return t.format(self.key, self.payload)
+
+class VEBBucketQueue(PriorityQueue):
+    '''A monotone bucket queue which implements the interface of a priority
+    queue, for integer keys in [last, last + span).
+
+    The VEBTree of occupied buckets is sparse unless told otherwise, so
+    making a queue costs next to nothing however big the span.
+    '''
+    item_class = BucketQueueItem
+
+    def __init__(self, span = 2 ** 16, last = 0, sparse = True):
+        '''Initialise the queue, with no keys allowed below `last` or at or
+        above `last` + `span` (rounded up to a power of 2).
+        '''
+        u = 2
+        while u < span:
+            u <<= 1
+        self.u = u
+        self.mask = u - 1
+        self.last = last
+        self.tree = VEBTree(u, sparse)
+        self.buckets = dict() # Bucket number (key mod u) to list of items.
+        self.n = 0
+
+    def __str__(self):
+        if self.n == 0:
+            return '<VEBBucketQueue: Empty>'
+        t = '<VEBBucketQueue: n={!s}, last={!s}, min={!s}>'
+        return t.format(self.n, self.last, self.first())
+
+    def check(self, key):
+        if not self.last <= key < self.last + self.u:
+            raise ValueError('key {!r} is outside [{!r}, {!r})'.format(
+                key, self.last, self.last + self.u))
+
+    def add(self, item):
+        '''Put `item` into the bucket for its key.
+        '''
+        b = item.key & self.mask
+        bucket = self.buckets.get(b)
+        if bucket is None:
+            bucket = self.buckets[b] = list()
+            self.tree.insert(b)
+        item.index = len(bucket)
+        bucket.append(item)
+
+    def remove(self, item):
+        '''Take `item` out of its bucket, filling the gap with the last item in
+        that bucket.
+        '''
+        b = item.key & self.mask
+        bucket = self.buckets[b]
+        last = bucket.pop()
+        if last is not item:
+            bucket[item.index] = last
+            last.index = item.index
+        elif not bucket:
+            del self.buckets[b]
+            self.tree.delete(b)
+        item.index = None
+
+    def insert(self, item):
+        '''Insert an item into this queue.
+
+        A ValueError is raised if its key is outside [last, last + span).
+        '''
+        self.check(item.key)
+        self.add(item)
+        self.n += 1
+
+    def merge(self, another):
+        '''Merge another VEBBucketQueue into this one, which costs O(lglgC)
+        per item moved across. All of its keys must be in range for this one.
+        '''
+        for bucket in another.buckets.values():
+            for item in bucket:
+                self.check(item.key)
+        for bucket in another.buckets.values():
+            for item in bucket:
+                self.add(item)
+        another.buckets.clear()
+        another.tree = VEBTree(another.u, another.tree.sparse)
+        self.n += another.n
+        another.n = 0
+
+    def first_bucket(self):
+        '''Return the next occupied bucket going round from `last`, or None.
+        '''
+        tree = self.tree
+        start = self.last & self.mask
+        if tree.member(start):
+            return start
+        b = tree.successor(start)
+        if b is None:
+            b = tree.minimum()
+        return b
+
+    def first(self):
+        '''Return the item with the minimum key without removing it.
+        '''
+        b = self.first_bucket()
+        if b is None:
+            return None
+        return self.buckets[b][-1]
+
+    def extract_min(self):
+        '''Remove and return the item with the minimum key.
+        '''
+        b = self.first_bucket()
+        if b is None:
+            return None
+        bucket = self.buckets[b]
+        item = bucket.pop()
+        if not bucket:
+            del self.buckets[b]
+            self.tree.delete(b)
+        item.index = None
+        self.last = item.key
+        self.n -= 1
+        return item
+
+    def decrease_key(self, item, new_key):
+        '''Decrease the `key` of `item` to `new_key`, which mustn't be smaller
+        than `last`.
+        '''
+        assert(new_key <= item.key)
+        self.check(new_key)
+        self.remove(item)
+        item.key = new_key
+        self.add(item)
+
+    def delete(self, item):
+        '''Delete an item from its VEBBucketQueue.
+
+        Warning: The behaviour if `item` isn't in this queue is undefined.
+        '''
+        self.remove(item)
+        self.n -= 1
+
+if __name__ == '__main__':
+    '''Some basic usage examples:
+    '''
+    queue = VEBBucketQueue(span = 10)
+    items = [BucketQueueItem(k, 'item ' + str(k)) for k in [5, 3, 8, 1, 9, 3]]
+    for i in items:
+        queue.insert(i)
+    print(queue)
+    queue.decrease_key(items[2], 4)
+    queue.delete(items[0])
+    print(queue.extract_min())
+    queue.insert(BucketQueueItem(16, 'item 16'))
+    while queue.n:
+        print(queue.extract_min())
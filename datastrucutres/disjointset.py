@@ -0,0 +1,188 @@
+'''
+
+    An implementation of the Disjoint Set (union-find) datastructure.
+
+    A disjoint set forest keeps a partition of the integers 0 to n - 1 into
+    sets, each stored as a tree whose root is the "representative" of the
+    set. find(x) follows parent pointers up from x to its root and union(x, y)
+    makes the root of one set a child of the root of the other. With both of
+    the usual heuristics, union by rank (the shallower tree goes under the
+    deeper one) and path compression (everything passed on the way up in a
+    find is pointed straight at the root), a sequence of m operations takes
+    O(m alpha(n)) time, where alpha is the very slowly growing inverse of
+    Ackermann's function.
+
+    Rather than a node object per element, the parents are kept in one flat
+    array('q') and the ranks in a bytearray (a rank can't be more than lg(n)
+    so a byte is plenty). If NumPy is installed the batch operations
+    find_many and union_many work on the whole batch at once, through a NumPy
+    view of the same parent array.
+
+    For a detailed discussion see Introduction to Algorithms, Cormen et al.
+    Chapter 21.
+
+'''
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    # Only used to speed up find_many and union_many.
+    numpy = None
+
+# The number of pairs union_many looks at in one go, see union_many.
+CHUNK = 1 << 14
+
+class DisjointSet(object):
+    '''A disjoint set forest over the integers 0 to n - 1, starting with each
+    in a set of its own.
+
+    parent[x] is the parent of x, or x itself if x is a root. rank[x] is an
+    upper bound on the height of x's tree, only kept up to date for roots.
+    count is the number of sets.
+    '''
+    def __init__(self, n):
+        self.n = n
+        self.count = n
+        self.parent = array('q', range(n))
+        self.rank = bytearray(n)
+
+    def __len__(self):
+        '''Return the number of elements (not sets).
+        '''
+        return self.n
+
+    def find(self, x):
+        '''Return the representative of the set containing x.
+
+        This is done in two passes rather than recursively as in CLRS: one up
+        to the root, then another pointing everything on the way at it.
+        '''
+        parent = self.parent
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def same(self, x, y):
+        '''Return True if x and y are in the same set.
+        '''
+        return self.find(x) == self.find(y)
+
+    def union(self, x, y):
+        '''Merge the sets containing x and y.
+
+        True is returned if they were merged, or False if they were already
+        the same set.
+        '''
+        x = self.find(x)
+        y = self.find(y)
+        if x == y:
+            return False
+        self.link(x, y)
+        return True
+
+    def link(self, x, y):
+        '''Merge the sets whose roots are x and y (which must be different),
+        by rank.
+        '''
+        rank = self.rank
+        if rank[x] < rank[y]:
+            self.parent[x] = y
+        else:
+            self.parent[y] = x
+            if rank[x] == rank[y]:
+                rank[x] += 1
+        self.count -= 1
+
+    def find_many(self, xs):
+        '''Return the representatives of the sets containing each of xs, a
+        sequence of elements, as an array('q') (whether or not NumPy is
+        installed).
+
+        With NumPy all the xs move up their trees together, one level per
+        step, and each of them is then pointed straight at its root, though
+        unlike find the elements passed on the way aren't. Without NumPy it is
+        just find for each.
+        '''
+        if numpy is None:
+            return array('q', [self.find(x) for x in xs])
+        result = array('q')
+        result.frombytes(self._roots(xs).tobytes())
+        return result
+
+    def _roots(self, xs):
+        '''find_many with NumPy, returning a NumPy array of the roots.
+        '''
+        parent = numpy.frombuffer(self.parent, dtype = numpy.int64)
+        xs = numpy.asarray(xs, dtype = numpy.int64)
+        roots = parent[xs]
+        while True:
+            up = parent[roots]
+            if numpy.array_equal(up, roots):
+                break
+            roots = up
+        parent[xs] = roots
+        return roots
+
+    def union_many(self, xs, ys):
+        '''Union xs[i] with ys[i] for each i in turn, returning a bytearray
+        which has a 1 at i if that union merged two sets (and 0 if they were
+        already the same set), e.g. which edges Kruskal's algorithm keeps.
+
+        The unions have to be done in order, as whether one merges anything
+        depends on the ones before. But sets are only ever merged, never
+        split, so any pair already in the same set at some point will never
+        be merged after it. With NumPy the pairs are taken CHUNK at a time,
+        and find_many throws out those already in the same set at the start
+        of the chunk before the rest are done one by one. Once everything is
+        in one set the rest of the pairs are skipped altogether.
+        '''
+        m = len(xs)
+        merged = bytearray(m)
+        if numpy is None or m < CHUNK:
+            for i in range(m):
+                if self.count == 1:
+                    break
+                if self.union(xs[i], ys[i]):
+                    merged[i] = 1
+            return merged
+
+        xs = numpy.asarray(xs, dtype = numpy.int64)
+        ys = numpy.asarray(ys, dtype = numpy.int64)
+        for start in range(0, m, CHUNK):
+            if self.count == 1:
+                break
+            stop = min(start + CHUNK, m)
+            todo = numpy.flatnonzero(
+                self._roots(xs[start:stop]) != self._roots(ys[start:stop]))
+            todo += start
+            for i, x, y in zip(todo.tolist(), xs[todo].tolist(), ys[todo].tolist()):
+                if self.union(x, y):
+                    merged[i] = 1
+        return merged
+
+    def sets(self):
+        '''Return a dict from each representative to the list of elements in
+        its set.
+        '''
+        result = dict()
+        for x in range(self.n):
+            result.setdefault(self.find(x), list()).append(x)
+        return result
+
+if __name__ == '__main__':
+    '''Some basic usage examples:
+    '''
+    ds = DisjointSet(10)
+    for x, y in [(0, 1), (2, 3), (1, 3), (5, 6), (7, 8), (8, 9)]:
+        ds.union(x, y)
+    print(ds.count)
+    print(ds.same(0, 2), ds.same(0, 5))
+    print(sorted(ds.sets().values()))
+    print(ds.find_many([0, 1, 2, 3, 4]).tolist())
+    print(list(ds.union_many([4, 0, 6], [5, 3, 9])))
+    print(sorted(ds.sets().values()))
@@ -16,7 +16,29 @@
     
 '''
 
-from item import Item
+from heapq import heapify, heappop, heappush
+import io
+from operator import attrgetter
+
+try:
+    from .item import Item
+    from .priorityqueue import PriorityQueue
+except ImportError:
+    # Being run as a script from this directory, e.g. for the examples below.
+    from item import Item
+    from priorityqueue import PriorityQueue
+
+def write_DOT_nodes(fp, items, max_nodes = None):
+    '''Write the DOT node for each of items (FibHeapItems, parents before
+    children) to the file object fp, stopping after max_nodes of them.
+    '''
+    written = 0
+    for item in items:
+        if max_nodes is not None and written >= max_nodes:
+            fp.write('  // Stopped after {!s} nodes.\n'.format(written))
+            break
+        fp.write(item._DOT_node())
+        written += 1
 
 class CircularDLL(object):
     '''A circular doubly-linked list. Its elements must implement the base Item
@@ -97,19 +119,27 @@ class CircularDLL(object):
         which their `start` pointers point to and splicing the relevent
         pointers together at this point. 
         '''
+        self.splice(another.start)
+
+    def splice(self, start2):
+        '''Merge the ring of Items which `start2` is part of into this circular
+        doubly-linked list, as in `merge`.
+
+        This lets a ring of Items which isn't wrapped in a CircularDLL object
+        (e.g. the children of a FibHeapItem) be merged in.
+        '''
         if self.start == None: # This list is empty.
             # Merging with the other list is equivalent to just becoming that
             # list, so we make this list's `start` point to the `start` item in
             # the other list.
-            self.start = another.start
-        elif another.start == None:
+            self.start = start2
+        elif start2 == None:
             pass
         else: # General case, proceed in a similar manner as with 'insert'.
             # Get the items which need joining
             start1 = self.start
             end1 = self.start.left
-            start2 = another.start
-            end2 = another.start.left
+            end2 = start2.left
             # Link 'em up!
             start1.left = end2
             end1.right = start2
@@ -143,12 +173,19 @@ class CircularDLL(object):
 class FibHeapItem(Item):
     '''A subclass of the Item base class specifically for Items to go in
     FibHeaps, which have some extra member variables and methods.
+
+    The children of an item are kept in a ring linked together through their
+    own `left` and `right` pointers (just like the items in a CircularDLL),
+    and `child` points to any one of them, or is None if there aren't any.
+    This way no extra objects are needed to hold the children.
     '''
+    __slots__ = ('parent', 'child', 'marked', 'degree')
+
     def __init__(self, *args, **kwargs):
         # Pass arguments straight to the superclass constructor.
         Item.__init__(self, *args, **kwargs)
         self.parent = None
-        self.children = None # Will optionally get pointed to a CircularDLL.
+        self.child = None
         self.marked = False
         self.degree = 0
         
@@ -158,13 +195,47 @@ class FibHeapItem(Item):
         Linking means to make the `other` item a child of this one, unmarking
         it and incrementing this item's `degree` accordingly.
         '''
-        if self.children:
-            self.children.insert(other)
+        first = self.child
+        if first is None:
+            other.left = other.right = other
+            self.child = other
         else:
-            self.children = CircularDLL([other])
+            # Put it into the ring just before the `child` item.
+            last = first.left
+            last.right = other
+            other.left = last
+            other.right = first
+            first.left = other
         other.marked = False
         other.parent = self
         self.degree += 1
+
+    def remove_child(self, other):
+        '''Remove `other` from the children of this item, decrementing its
+        `degree`. The `parent` of `other` is left for the caller to deal with.
+        '''
+        if other.right is other: # Only child.
+            self.child = None
+        else:
+            other.left.right = other.right
+            other.right.left = other.left
+            if self.child is other:
+                self.child = other.right
+        self.degree -= 1
+
+    def children(self):
+        '''Returns a list of the children of this item.
+        '''
+        result = list()
+        first = self.child
+        if first is not None:
+            current = first
+            while True:
+                result.append(current)
+                current = current.right
+                if current is first:
+                    break
+        return result
         
     def __str__(self):
         '''Print this FibHeapItem as a string which is in some way useful...
@@ -173,6 +244,35 @@ class FibHeapItem(Item):
         return t.format(self.key, self.payload, self.marked, self.degree)
 
     def to_DOT(self):
+        '''Output the DOT nodes and edges for this item and everything below
+        it.
+        '''
+        result = io.StringIO()
+        self.write_DOT(result)
+        return result.getvalue()
+
+    def write_DOT(self, fp, max_nodes = None, max_depth = None):
+        '''Write the DOT nodes and edges for this item and everything below it
+        to the file object fp, an item at a time, stopping after max_nodes
+        items and leaving out those more than max_depth levels down.
+        '''
+        write_DOT_nodes(fp, self.DOT_items(max_depth), max_nodes)
+
+    def DOT_items(self, max_depth = None):
+        '''Generate this item and those below it, at most max_depth levels
+        down, in the order they are written out as DOT. The items are walked
+        with a stack rather than by recursion.
+        '''
+        stack = [(self, 0)]
+        while stack:
+            item, depth = stack.pop()
+            yield item
+            if max_depth is None or depth < max_depth:
+                stack.extend((c, depth + 1) for c in reversed(item.children()))
+
+    def _DOT_node(self):
+        '''Output the DOT node for just this item, and the edge to its parent.
+        '''
         label = '{!s} : {!s} ({!s})\\n({!s})'.format(
             self.key, 
             id(self.payload), 
@@ -189,16 +289,16 @@ class FibHeapItem(Item):
 
         if self.parent:
             result += '  {!s} -- {!s};\n'.format(id(self.parent), id(self))
-        
-        if self.children:
-            for c in self.children.items():
-                result += c.to_DOT()
 
         return result
 
-class FibHeap(object):
+class FibHeap(PriorityQueue):
     '''A Fibonnacci Heap which implements the interface of a priority queue.
     '''
+    item_class = FibHeapItem
+    # Set to a stats.OpStats to count the work done inside the heap.
+    stats = None
+
     def __init__(self, init_item = None):
         '''Inititalise the FibHeap, optionally with a starting item.
         '''
@@ -210,6 +310,18 @@ class FibHeap(object):
             self.n = 0
 
         self.min = init_item # Either None or the single item.
+        # Slot d is used by `consolidate` to hold the root of degree d, and is
+        # kept between calls so that it doesn't have to be made every time.
+        self.degrees = list()
+
+    @classmethod
+    def from_iterable(cls, items):
+        '''Make a new FibHeap holding all of items, an iterable of new items
+        (see `insert_many`).
+        '''
+        heap = cls()
+        heap.insert_many(items)
+        return heap
             
     def __str__(self):
         '''A sensible string representation of the FibHeap.
@@ -221,13 +333,20 @@ class FibHeap(object):
             return t.format(self.n, self.min, self.roots)
     
     def to_DOT(self, label = None):
-        t = 'graph G {{\n  labelloc="{!s}"\n  label="{!s}";\n'
-        result = t.format('top', label)
+        result = io.StringIO()
+        self.write_DOT(result, label = label)
+        return result.getvalue()
 
-        for i in self.roots.items():
-            result += i.to_DOT()
-        result += '}'
-        return result
+    def write_DOT(self, fp, max_nodes = None, max_depth = None, label = None):
+        '''Write the heap in the DOT language to the file object fp, an item
+        at a time, stopping after max_nodes items and leaving out those more
+        than max_depth levels below the roots.
+        '''
+        t = 'graph G {{\n  labelloc="{!s}"\n  label="{!s}";\n'
+        fp.write(t.format('top', label))
+        items = (i for root in self.roots.items() for i in root.DOT_items(max_depth))
+        write_DOT_nodes(fp, items, max_nodes)
+        fp.write('}')
             
     def insert(self, item):
         '''Insert an item into this heap.
@@ -239,6 +358,34 @@ class FibHeap(object):
                 self.min = item
         else:
             self.min = item
+
+    def insert_many(self, items):
+        '''Insert all of items, an iterable of new items, into this heap.
+
+        Rather than inserting them one at a time the items are first linked
+        into a ring of their own, looking for the smallest on the way, and
+        then the whole ring is spliced into the roots in one go.
+        '''
+        first = last = None
+        smallest = self.min
+        count = 0
+        for item in items:
+            if first is None:
+                first = item
+            else:
+                last.right = item
+                item.left = last
+            last = item
+            if smallest is None or item.key < smallest.key:
+                smallest = item
+            count += 1
+        if first is None:
+            return
+        first.left = last
+        last.right = first
+        self.roots.splice(first)
+        self.n += count
+        self.min = smallest
             
     def merge(self, another):
         '''Merge this FibHeap with another one.
@@ -246,8 +393,7 @@ class FibHeap(object):
         self.roots.merge(another.roots)
         self.n += another.n
 
-        if (self.min and self.min.key > another.min.key) \
-        or (another.min and not self.min):
+        if another.min and ((not self.min) or self.min.key > another.min.key):
                 self.min = another.min
         # Otherwise either both empty or another is.
         # Keep current `min` either way.
@@ -265,10 +411,17 @@ class FibHeap(object):
         cm = self.min
         if cm != None:
             # Reset the parent pointers and add all children to the roots
-            if cm.children:
-                for c in cm.children.items():
+            first = cm.child
+            if first is not None:
+                c = first
+                while True:
                     c.parent = None
-                self.roots.merge(cm.children)
+                    c = c.right
+                    if c is first:
+                        break
+                self.roots.splice(first)
+                cm.child = None
+                cm.degree = 0
             # Remove min item from roots.
             self.roots.delete(cm)
             self.n -= 1
@@ -280,43 +433,150 @@ class FibHeap(object):
         
         # Return (now no longer) current min
         return cm
+
+    def extract_many(self, k):
+        '''Remove the k items with the smallest keys (or all of them, if
+        there are fewer than k) from the heap and return them in a list, in
+        order.
+
+        Rather than k calls to extract_min, each consolidating the heap, the
+        k items are found by a best-first search down from the roots (using
+        heapq), which can only ever reach the items on top of the heap. The
+        items left over, the roots not taken and the children of the items
+        taken, become the roots and the heap is consolidated just once.
+        '''
+        if k >= self.n:
+            return self.drain()
+        if k <= 0:
+            return list()
+        frontier = [(item.key, i, item) for i, item in enumerate(self.roots.items())]
+        heapify(frontier)
+        count = len(frontier) # Breaks ties, so items are never compared.
+        taken = list()
+        while len(taken) < k:
+            item = heappop(frontier)[2]
+            taken.append(item)
+            first = item.child
+            if first is not None:
+                c = first
+                while True:
+                    heappush(frontier, (c.key, count, c))
+                    count += 1
+                    c = c.right
+                    if c is first:
+                        break
+            item.parent = item.child = None
+            item.marked = False
+            item.degree = 0
+        roots = [entry[2] for entry in frontier]
+        for item in roots:
+            item.parent = None
+            item.marked = False
+        self.roots = CircularDLL(roots)
+        self.n -= k
+        self.consolidate()
+        return taken
+
+    def drain(self):
+        '''Empty the heap, returning a list of all its items in order.
+
+        Nothing is consolidated at all, all the items are collected by
+        walking over the trees and then sorted by key in one go.
+        '''
+        items = list()
+        if self.roots.start is not None:
+            rings = [self.roots.start]
+            while rings:
+                first = item = rings.pop()
+                while True:
+                    items.append(item)
+                    if item.child is not None:
+                        rings.append(item.child)
+                    item = item.right
+                    if item is first:
+                        break
+        self.roots = CircularDLL()
+        self.n = 0
+        self.min = None
+        for item in items:
+            item.parent = item.child = None
+            item.marked = False
+            item.degree = 0
+        items.sort(key = attrgetter('key'))
+        return items
         
     def consolidate(self):
         '''Consolidate the FibHeap.
         
         This is a tidying up process which makes the heap thinner and taller
         and sets the new `min` pointer after an `extract_min` occurs.
+
+        Nothing is allocated along the way. The roots are relinked in place
+        while walking around the ring, using the reusable `degrees` table
+        rather than a new dict each time.
         '''
-        # Bunching pass:
-        new_roots = dict()
-        # For each item in the roots
-        for item in self.roots.items():
+        # A root can't have a degree higher than log_phi(n) < 1.5 * lg(n), so
+        # this only grows the table when n has grown.
+        table = self.degrees
+        needed = (self.n.bit_length() * 3) // 2 + 2
+        if len(table) < needed:
+            table.extend([None] * (needed - len(table)))
+
+        # Bunching pass: take the whole ring of roots off the heap, and walk
+        # around it. The pointers of the items which haven't been reached yet
+        # are untouched, so saving each item's `right` before dealing with it
+        # is enough to keep going and to know when we've got back to the
+        # start.
+        stats = self.stats
+        if stats is not None:
+            links = stats.links
+        start = self.roots.start
+        self.roots.start = None
+        top = 0 # One more than the highest degree used in the table.
+        item = start
+        while True:
+            following = item.right
             # Keep executing this loop until it does not have the same degree as
             # any other already processed root item.
-            while item.degree in new_roots:
-                other = new_roots.pop(item.degree)
+            d = item.degree
+            other = table[d]
+            while other is not None:
+                table[d] = None
                 # Swap the other item and this item
                 if other.key < item.key:
-                    temp = other
-                    other = item
-                    item = temp
+                    item, other = other, item
                 # Make whichever is now other, and therefore has a higher key,
                 # the child of item.
                 item.link(other)
+                if stats is not None:
+                    stats.links += 1
+                d += 1
+                other = table[d]
             # When we exit the while loop, put the item into its slot.
-            new_roots[item.degree] = item
-            
-        # Reforming/new-minimum-finding pass
+            table[d] = item
+            if d >= top:
+                top = d + 1
+            if following is start:
+                break
+            item = following
+
+        # Reforming/new-minimum-finding pass, emptying the table as we go.
         self.min = None
-        for item in new_roots.values():
-            if self.min == None:
-                self.roots = CircularDLL([item])
-                self.min = item
-            else:
-                self.insert(item)
-                self.n -= 1 # As each `insert` of this will be adding 1 to n
-                            # when really they are existing items that are just
-                            # being re-inserted.
+        d = 0
+        while d < top:
+            item = table[d]
+            if item is not None:
+                table[d] = None
+                self.roots.insert(item)
+                if self.min is None or item.key < self.min.key:
+                    self.min = item
+                if stats is not None:
+                    # Every root scanned was either linked below another or
+                    # is one of the roots left now.
+                    links -= 1
+            d += 1
+        if stats is not None:
+            stats.consolidated(stats.links - links, top - 1)
         
     def delete(self, item):
         '''Delete an item from its FibHeap.
@@ -327,8 +587,21 @@ class FibHeap(object):
 
         To do: Fix the above issue by having it do something nice, but without
         significantly increasing the cost of the function.
+
+        Rather than decreasing the key to minus infinity, the item is cut into
+        the roots (as decrease_key would) and made the `min`, so extract_min
+        takes it out. Its key is never compared with anything or changed, so
+        keys don't have to be numbers, e.g. (priority, sequence) tuples.
         '''
-        self.decrease_key(item, float('-inf'))
+        if item.parent is not None:
+            stats = self.stats
+            if stats is None:
+                self.cut(item)
+            else:
+                cuts = stats.cuts
+                self.cut(item)
+                stats.event('cut', stats.cuts - cuts)
+        self.min = item
         self.extract_min()
         
     def decrease_key(self, item, new_key):
@@ -337,52 +610,167 @@ class FibHeap(object):
         assert(new_key <= item.key)
         item.key = new_key
         if(item.parent and item.key < item.parent.key):
-            self.cut(item)
+            stats = self.stats
+            if stats is None:
+                self.cut(item)
+            else:
+                cuts = stats.cuts
+                self.cut(item)
+                stats.event('cut', stats.cuts - cuts)
         if item.key < self.min.key:
             self.min = item
     
-    def cut2(self, x, y):
-        # Unused?
-        '''Exact implementation of cut from CLRS, pg519.
-        '''
-        y.children.delete(x)
-        y.degree -= 1
-        self.roots.insert(x)
-        x.parent = None
-        x.marked = False
-        
-    def cascading_cut(self, y):
-        # Unused?
-        '''CLRS, pg519.
-        '''
-        z = y.parent
-        if z != None:
-            if y.marked == False:
-                y.marked == True
-            else:
-                self.cut2(y, z)
-                self.cascading_cut(z) 
-        
     def cut(self, item):
         '''Cut item from its `parent` and move it into the `roots` of the
         FibHeap.
 
-        Note: This may cause a cascade of cuts if the parent is marked.
+        Note: This may cause a cascade of cuts if the parent is marked. The
+        cascade is done in the same loop, so the chain of marked parents is
+        only walked up once, and however long it is there's no recursion.
         '''
+        stats = self.stats
         p = item.parent
-        if p != None:
+        while p != None:
             # `item` is not a root node.
-            p.children.delete(item)
-            p.degree -= 1
+            if stats is not None:
+                stats.cuts += 1
+            p.remove_child(item)
             item.parent = None
             item.marked = False
             self.roots.insert(item)
-            if p.parent:
-                # If `parent` is not a root node.
-                if p.marked:
-                    self.cut(p)
-                else:
-                    p.marked = True
+            if p.parent == None:
+                # `p` is a root node, so it stays where it is.
+                break
+            if not p.marked:
+                p.marked = True
+                break
+            # `p` has now lost two children, so it's cut as well.
+            if stats is not None:
+                stats.cascading_cuts += 1
+            item = p
+            p = item.parent
+
+class PriorityMap(object):
+    '''An addressable priority queue, mapping payloads to keys, built on top of
+    a FibHeap.
+
+    Each payload (which must be hashable) can be in the queue at most once,
+    and an index from payloads to their FibHeapItems means the caller never
+    has to hold on to the items themselves, e.g. for Dijkstra's algorithm a
+    vertex's distance can be lowered with `decrease_key(vertex, distance)`.
+
+    `push` does return the FibHeapItem though, as a handle, and anywhere a
+    payload is expected a handle can be given instead. Handles are checked
+    against the index, so using one which has since been popped or removed,
+    or which belongs to another queue, raises a KeyError rather than
+    corrupting the heap. (So payloads shouldn't be FibHeapItems themselves.)
+    '''
+    def __init__(self):
+        self.heap = FibHeap()
+        self.index = dict()
+
+    def __len__(self):
+        return self.heap.n
+
+    def __contains__(self, payload):
+        return payload in self.index
+
+    def __getitem__(self, payload):
+        '''Return the key of `payload`.
+        '''
+        return self.node(payload).key
+
+    def __delitem__(self, payload):
+        self.remove(payload)
+
+    def node(self, ref):
+        '''Return the FibHeapItem for `ref`, which is either a payload or a
+        handle, raising a KeyError if it isn't in the queue.
+        '''
+        if isinstance(ref, FibHeapItem):
+            if self.index.get(ref.payload) is not ref:
+                raise KeyError('stale or foreign handle: ' + str(ref))
+            return ref
+        node = self.index.get(ref)
+        if node is None:
+            raise KeyError(ref)
+        return node
+
+    def push(self, payload, key):
+        '''Add `payload` to the queue with the given `key` and return its
+        handle.
+
+        A ValueError is raised if `payload` is already in the queue, see
+        `update` for adding or changing the key in one go.
+        '''
+        if payload in self.index:
+            raise ValueError('already in the queue: ' + repr(payload))
+        node = FibHeapItem(key, payload)
+        self.heap.insert(node)
+        self.index[payload] = node
+        return node
+
+    def first(self):
+        '''Return the (payload, key) pair with the smallest key without
+        removing it, or None if the queue is empty.
+        '''
+        node = self.heap.first()
+        if node is None:
+            return None
+        return node.payload, node.key
+
+    def pop(self):
+        '''Remove and return the (payload, key) pair with the smallest key.
+
+        An IndexError is raised if the queue is empty.
+        '''
+        node = self.heap.extract_min()
+        if node is None:
+            raise IndexError('pop from an empty PriorityMap')
+        del self.index[node.payload]
+        return node.payload, node.key
+
+    def decrease_key(self, ref, new_key):
+        '''Lower the key of `ref` (a payload or handle) to `new_key`.
+
+        A ValueError is raised if `new_key` is greater than the current key.
+        '''
+        node = self.node(ref)
+        if new_key > node.key:
+            raise ValueError('new key is greater than the current key')
+        self.heap.decrease_key(node, new_key)
+
+    def update(self, ref, key):
+        '''Set the key of `ref` (a payload or handle) to `key`, pushing it if
+        it is a payload which isn't in the queue already, and return its
+        handle. A handle which isn't in the queue raises a KeyError.
+
+        Lowering the key is a `decrease_key`. Raising it means taking the item
+        out of the heap and putting it back in with the new key.
+        '''
+        if isinstance(ref, FibHeapItem):
+            node = self.node(ref)
+        else:
+            node = self.index.get(ref)
+            if node is None:
+                return self.push(ref, key)
+        if key <= node.key:
+            self.heap.decrease_key(node, key)
+        else:
+            self.heap.delete(node)
+            node.marked = False
+            node.key = key
+            self.heap.insert(node)
+        return node
+
+    def remove(self, ref):
+        '''Remove `ref` (a payload or handle) from the queue, returning its
+        key.
+        '''
+        node = self.node(ref)
+        self.heap.delete(node)
+        del self.index[node.payload]
+        return node.key
 
 if __name__ == '__main__':
     '''Some basic usage examples:
@@ -421,5 +809,9 @@ if __name__ == '__main__':
     print(my_fibheap.to_DOT('After extract_min()'))
     my_fibheap.delete(some_item)
     print(my_fibheap.to_DOT('After deleting an item'))
+    # Bulk loading and draining.
+    bulk = FibHeap.from_iterable(FibHeapItem(k) for k in [5, 3, 9, 1, 7, 2])
+    print([item.key for item in bulk.extract_many(2)])
+    print([item.key for item in bulk.drain()])
     
     
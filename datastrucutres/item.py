@@ -12,7 +12,14 @@ class Item(object):
 
     Note: The modules of the different datastructures may define subclasses of
     this class.
+
+    Items use __slots__ rather than a __dict__ as there can be a great many of
+    them. `left` and `right` are for the linked lists which Items get put in,
+    they are only set once the Item is in one. Subclasses adding attributes of
+    their own should declare them in __slots__ too.
     '''
+    __slots__ = ('key', 'payload', 'left', 'right')
+
     def __init__(self, key = 0, payload = None):
         self.key = key
         self.payload = payload
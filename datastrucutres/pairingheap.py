@@ -0,0 +1,194 @@
+'''
+
+    An implementation of the Pairing Heap datastructure.
+
+    A Pairing Heap is a single heap-ordered tree of any shape. Inserting,
+    merging and decreasing a key all just "meld" two trees, making whichever
+    root has the larger key the first child of the other, so they are O(1).
+    All the tidying up is left to extract_min, which pairs up the children of
+    the old root left to right and then melds the pairs together right to
+    left, for O(lgn) amortized cost. (decrease_key is only known to be
+    o(lgn) amortized, rather than the Fibonacci Heap's O(1), but in practice
+    Pairing Heaps are simpler and usually faster.)
+
+    The children of an item are a singly linked list from its `child` through
+    their `sibling` pointers, and each item's `prev` points back to its left
+    sibling, or to its parent if it is the first child, so that an item can be
+    cut out in O(1).
+
+    See Fredman, Sedgewick, Sleator and Tarjan, "The Pairing Heap: A New Form
+    of Self-Adjusting Heap", Algorithmica 1986.
+
+'''
+
+try:
+    from .item import Item
+    from .priorityqueue import PriorityQueue
+except ImportError:
+    # Being run as a script from this directory, e.g. for the examples below.
+    from item import Item
+    from priorityqueue import PriorityQueue
+
+class PairingHeapItem(Item):
+    '''A subclass of the Item base class for Items to go in PairingHeaps.
+    '''
+    __slots__ = ('child', 'sibling', 'prev')
+
+    def __init__(self, *args, **kwargs):
+        Item.__init__(self, *args, **kwargs)
+        self.child = self.sibling = self.prev = None
+
+    def __str__(self):
+        t = '<PairingHeapItem: key={!s}, payload={!r}>'
+        return t.format(self.key, self.payload)
+
+def meld(a, b):
+    '''Meld the trees with roots `a` and `b` (neither of which have siblings)
+    and return the root of the result.
+    '''
+    if b.key < a.key:
+        a, b = b, a
+    # b becomes the first child of a.
+    first = a.child
+    b.sibling = first
+    if first is not None:
+        first.prev = b
+    b.prev = a
+    a.child = b
+    return a
+
+def combine(first):
+    '''Meld together the list of trees starting at `first` (linked through
+    their `sibling` pointers) with the two pass pairing method, and return
+    the root of the result.
+    '''
+    if first is None:
+        return None
+    # First pass: meld pairs left to right. The results are kept in a stack
+    # made by linking them together through their `sibling` pointers.
+    stack = None
+    a = first
+    while a is not None:
+        b = a.sibling
+        if b is None:
+            following = None
+            pair = a
+        else:
+            following = b.sibling
+            a.sibling = b.sibling = None
+            pair = meld(a, b)
+        pair.sibling = stack
+        stack = pair
+        a = following
+    # Second pass: meld the pairs together right to left (i.e. off the top of
+    # the stack).
+    root = stack
+    stack = root.sibling
+    root.sibling = None
+    while stack is not None:
+        following = stack.sibling
+        stack.sibling = None
+        root = meld(root, stack)
+        stack = following
+    root.prev = None
+    return root
+
+class PairingHeap(PriorityQueue):
+    '''A Pairing Heap which implements the interface of a priority queue.
+    '''
+    item_class = PairingHeapItem
+
+    def __init__(self):
+        self.root = None
+        self.n = 0
+
+    def __str__(self):
+        if self.n == 0:
+            return '<PairingHeap: Empty>'
+        return '<PairingHeap: n={!s}, min={!s}>'.format(self.n, self.root)
+
+    def insert(self, item):
+        '''Insert an item into this heap.
+        '''
+        item.child = item.sibling = item.prev = None
+        if self.root is None:
+            self.root = item
+        else:
+            self.root = meld(self.root, item)
+        self.n += 1
+
+    def merge(self, another):
+        '''Merge another PairingHeap into this one.
+        '''
+        if another.root is not None:
+            if self.root is None:
+                self.root = another.root
+            else:
+                self.root = meld(self.root, another.root)
+        self.n += another.n
+
+    def first(self):
+        '''Return the item with the minimum key without removing it.
+        '''
+        return self.root
+
+    def extract_min(self):
+        '''Remove and return the item with the minimum key.
+        '''
+        root = self.root
+        if root is not None:
+            self.root = combine(root.child)
+            root.child = None
+            self.n -= 1
+        return root
+
+    def cut(self, item):
+        '''Cut the subtree rooted at `item`, which must not be the root, out
+        of the tree.
+        '''
+        prev = item.prev
+        if prev.child is item:
+            prev.child = item.sibling
+        else:
+            prev.sibling = item.sibling
+        if item.sibling is not None:
+            item.sibling.prev = prev
+        item.sibling = item.prev = None
+
+    def decrease_key(self, item, new_key):
+        '''Decrease the `key` of `item` to `new_key`.
+        '''
+        assert(new_key <= item.key)
+        item.key = new_key
+        if item is not self.root:
+            self.cut(item)
+            self.root = meld(self.root, item)
+
+    def delete(self, item):
+        '''Delete an item from its PairingHeap.
+
+        Warning: As with FibHeap, the behaviour if `item` isn't in this heap is
+        undefined.
+        '''
+        if item is self.root:
+            self.extract_min()
+        else:
+            self.cut(item)
+            children = combine(item.child)
+            item.child = None
+            if children is not None:
+                self.root = meld(self.root, children)
+            self.n -= 1
+
+if __name__ == '__main__':
+    '''Some basic usage examples:
+    '''
+    heap = PairingHeap()
+    items = [PairingHeapItem(k, 'item ' + str(k)) for k in [5, 3, 8, 1, 9, 2]]
+    for i in items:
+        heap.insert(i)
+    print(heap)
+    heap.decrease_key(items[2], 0)
+    heap.delete(items[0])
+    while heap.n:
+        print(heap.extract_min())
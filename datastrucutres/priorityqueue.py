@@ -0,0 +1,95 @@
+'''
+
+    The common interface of the priority queues in this package, and a way of
+    picking one of them by name.
+
+    Every priority queue holds Items (or rather instances of its own subclass
+    of Item, given by its `item_class`, which carry whatever extra pointers
+    that queue needs) and supports:
+
+    * insert(item)
+    * first() - the item with the minimum key, without removing it.
+    * extract_min() - remove and return the first item.
+    * decrease_key(item, new_key)
+    * merge(another) - take all the items of another queue of the same kind.
+    * delete(item)
+
+    first() and extract_min() return None when the queue is empty, and `n`
+    is the number of items in the queue.
+
+    Which one is fastest depends a lot on the workload, so e.g. the graph
+    algorithms take the name of the queue to use (see `make_queue`):
+
+    * 'fibheap' - Fibonacci Heap, O(1) amortized insert and decrease_key.
+    * 'pairing' - Pairing Heap, simpler and usually faster in practice.
+    * 'binary' - Binary Heap in an array, with each item knowing its index.
+    * 'radix' - Radix Heap, only for integer keys where no key inserted is
+      smaller than the last one extracted (e.g. Dijkstra's algorithm).
+    * 'veb' - Bucket queue over a vEB tree, for the same kind of keys as
+      'radix', which also all have to be less than a given `span` above the
+      last one extracted (e.g. the largest weight, in Dijkstra's algorithm).
+
+'''
+
+import importlib
+
+try:
+    from .item import Item
+except ImportError:
+    # Being run as a script from this directory.
+    from item import Item
+
+class PriorityQueue(object):
+    '''The base class/interface for priority queues, see above.
+    '''
+    item_class = Item
+
+    def __len__(self):
+        return self.n
+
+    def insert(self, item):
+        raise NotImplementedError
+
+    def first(self):
+        raise NotImplementedError
+
+    def extract_min(self):
+        raise NotImplementedError
+
+    def decrease_key(self, item, new_key):
+        raise NotImplementedError
+
+    def merge(self, another):
+        raise NotImplementedError
+
+    def delete(self, item):
+        raise NotImplementedError
+
+# The priority queues which can be picked by name, as (module, class) pairs.
+# They are only imported when asked for, since they import this module.
+BACKENDS = {
+    'fibheap': ('fibheap', 'FibHeap'),
+    'pairing': ('pairingheap', 'PairingHeap'),
+    'binary': ('binaryheap', 'IndexedBinaryHeap'),
+    'radix': ('radixheap', 'RadixHeap'),
+    'veb': ('bucketqueue', 'VEBBucketQueue'),
+}
+
+def queue_class(name):
+    '''Return the priority queue class called `name` in BACKENDS.
+    '''
+    if name not in BACKENDS:
+        raise ValueError('unknown priority queue {!r}, choose from {!s}'.format(
+            name, ', '.join(sorted(BACKENDS))))
+    module, cls = BACKENDS[name]
+    if __package__:
+        module = importlib.import_module('.' + module, __package__)
+    else:
+        module = importlib.import_module(module)
+    return getattr(module, cls)
+
+def make_queue(name, *args, **kwargs):
+    '''Make a new, empty priority queue of the kind called `name`, passing
+    any other arguments to its constructor.
+    '''
+    return queue_class(name)(*args, **kwargs)
@@ -0,0 +1,183 @@
+'''
+
+    An implementation of the (monotone) Radix Heap datastructure.
+
+    A Radix Heap only works for integer keys, and only when the keys are
+    "monotone": no key inserted (or decreased to) can be smaller than the key
+    of the last item extracted, `last`. That is exactly the case in
+    Dijkstra's algorithm, for example.
+
+    Items are kept in buckets by the highest bit in which their key differs
+    from `last`, so bucket 0 holds keys equal to `last` and bucket i > 0 holds
+    keys in the range [2^(i-1), 2^i) above it, roughly. When bucket 0 runs out
+    extract_min finds the first non-empty bucket, makes its minimum the new
+    `last` and redistributes its items, which all go into lower buckets. Each
+    item can only move down O(lgC) times, where C is the biggest key, so all
+    the operations are O(1) amortized except extract_min which is O(lgC).
+
+    See Ahuja, Mehlhorn, Orlin and Tarjan, "Faster Algorithms for the
+    Shortest Path Problem", JACM 1990.
+
+'''
+
+try:
+    from .item import Item
+    from .priorityqueue import PriorityQueue
+except ImportError:
+    # Being run as a script from this directory, e.g. for the examples below.
+    from item import Item
+    from priorityqueue import PriorityQueue
+
+class RadixHeapItem(Item):
+    '''A subclass of the Item base class for Items to go in RadixHeaps. Each
+    item knows which bucket it is in, and where in that bucket.
+    '''
+    __slots__ = ('bucket', 'index')
+
+    def __init__(self, *args, **kwargs):
+        Item.__init__(self, *args, **kwargs)
+        self.bucket = self.index = None
+
+    def __str__(self):
+        t = '<RadixHeapItem: key={!s}, payload={!r}, bucket={!s}>'
+        return t.format(self.key, self.payload, self.bucket)
+
+class RadixHeap(PriorityQueue):
+    '''A monotone Radix Heap which implements the interface of a priority
+    queue, for non-negative integer keys.
+    '''
+    item_class = RadixHeapItem
+
+    def __init__(self, last = 0):
+        '''Initialise the RadixHeap, with no keys allowed below `last`.
+        '''
+        self.last = last
+        self.buckets = [list()]
+        self.n = 0
+
+    def __str__(self):
+        if self.n == 0:
+            return '<RadixHeap: Empty>'
+        t = '<RadixHeap: n={!s}, last={!s}, min={!s}>'
+        return t.format(self.n, self.last, self.first())
+
+    def add(self, item):
+        '''Put `item` into the right bucket for its key.
+        '''
+        b = (item.key ^ self.last).bit_length()
+        buckets = self.buckets
+        while len(buckets) <= b:
+            buckets.append(list())
+        bucket = buckets[b]
+        item.bucket = b
+        item.index = len(bucket)
+        bucket.append(item)
+
+    def remove(self, item):
+        '''Take `item` out of its bucket, filling the gap with the last item in
+        that bucket.
+        '''
+        bucket = self.buckets[item.bucket]
+        last = bucket.pop()
+        if last is not item:
+            bucket[item.index] = last
+            last.index = item.index
+        item.bucket = item.index = None
+
+    def check(self, key):
+        if key < self.last:
+            raise ValueError('key {!r} is below the last extracted key {!r}'
+                             .format(key, self.last))
+
+    def insert(self, item):
+        '''Insert an item into this heap.
+
+        A ValueError is raised if its key is smaller than `last`.
+        '''
+        self.check(item.key)
+        self.add(item)
+        self.n += 1
+
+    def merge(self, another):
+        '''Merge another RadixHeap into this one, which costs O(1) per item
+        moved across. All of its keys must be at least this heap's `last`.
+        '''
+        for bucket in another.buckets:
+            for item in bucket:
+                self.check(item.key)
+        for bucket in another.buckets:
+            for item in bucket:
+                self.add(item)
+            del bucket[:]
+        self.n += another.n
+        another.n = 0
+
+    def first_bucket(self):
+        '''Return the index of the first non-empty bucket, or None.
+        '''
+        for i, bucket in enumerate(self.buckets):
+            if bucket:
+                return i
+        return None
+
+    def first(self):
+        '''Return the item with the minimum key without removing it.
+
+        Unless there is an item with key `last` this has to look through the
+        whole of the first non-empty bucket.
+        '''
+        i = self.first_bucket()
+        if i is None:
+            return None
+        return min(self.buckets[i], key = lambda item: item.key)
+
+    def extract_min(self):
+        '''Remove and return the item with the minimum key.
+        '''
+        if self.n == 0:
+            return None
+        buckets = self.buckets
+        if not buckets[0]:
+            # Move `last` up to the minimum of the first non-empty bucket and
+            # redistribute that bucket, at least the minimum lands in bucket 0.
+            i = self.first_bucket()
+            bucket = buckets[i]
+            buckets[i] = list()
+            self.last = min(item.key for item in bucket)
+            for item in bucket:
+                self.add(item)
+        item = buckets[0].pop()
+        item.bucket = item.index = None
+        self.n -= 1
+        return item
+
+    def decrease_key(self, item, new_key):
+        '''Decrease the `key` of `item` to `new_key`, which mustn't be smaller
+        than `last`.
+        '''
+        assert(new_key <= item.key)
+        self.check(new_key)
+        self.remove(item)
+        item.key = new_key
+        self.add(item)
+
+    def delete(self, item):
+        '''Delete an item from its RadixHeap.
+
+        Warning: The behaviour if `item` isn't in this heap is undefined.
+        '''
+        self.remove(item)
+        self.n -= 1
+
+if __name__ == '__main__':
+    '''Some basic usage examples:
+    '''
+    heap = RadixHeap()
+    items = [RadixHeapItem(k, 'item ' + str(k)) for k in [5, 3, 8, 1, 9, 2]]
+    for i in items:
+        heap.insert(i)
+    print(heap)
+    heap.decrease_key(items[2], 4)
+    heap.delete(items[0])
+    while heap.n:
+        print(heap.extract_min())
@@ -0,0 +1,183 @@
+'''
+
+    A priority queue which many threads can push to and pop from at once.
+
+    Rather than one FibHeap behind one lock, which every thread would have to
+    wait for in turn, the items are spread over several FibHeaps ("shards")
+    each with its own lock. A push goes to a random shard, so pushes from
+    different threads mostly don't get in each other's way.
+
+    The catch is pop. Finding the true minimum means looking at every shard,
+    holding all their locks at once. So pop can instead be "relaxed": it picks
+    two shards at random and pops from whichever has the smaller minimum. The
+    item popped is then not always the smallest in the whole queue, but it is
+    very likely to be one of the smallest few (roughly, its rank is O(shards)
+    on average), which is good enough for e.g. a scheduler, and the threads
+    again mostly use different locks.
+
+    That only works while the shards hold similar mixes of keys, so now and
+    again the queue is rebalanced: all the shards are merged into one FibHeap
+    (which is O(1) per shard) and its trees are dealt back out between them.
+
+    See Rihani, Sanders and Dementiev, "MultiQueues: Simpler, Faster, and
+    Better Relaxed Concurrent Priority Queues", 2014.
+
+'''
+
+import random
+import threading
+
+try:
+    from .fibheap import FibHeap, FibHeapItem
+except ImportError:
+    # Being run as a script from this directory, e.g. for the examples below.
+    from fibheap import FibHeap, FibHeapItem
+
+def tree_size(item):
+    '''Returns the number of items in the tree below (and including) item.
+    '''
+    size = 0
+    stack = [item]
+    while stack:
+        item = stack.pop()
+        size += 1
+        if item.child is not None:
+            stack.extend(item.children())
+    return size
+
+class ShardedPriorityQueue(object):
+    '''A thread-safe priority queue of (payload, key) pairs, spread over
+    `shards` FibHeaps which each have their own lock.
+
+    If `relaxed` is True pop uses two random shards rather than all of them
+    (see above), unless told otherwise. If `rebalance_every` is given the
+    queue is rebalanced after about that many pops.
+    '''
+    def __init__(self, shards = 4, relaxed = True, rebalance_every = None):
+        if shards < 1:
+            raise ValueError('there must be at least one shard')
+        self.heaps = [FibHeap() for _ in range(shards)]
+        self.locks = [threading.Lock() for _ in range(shards)]
+        self.relaxed = relaxed
+        self.rebalance_every = rebalance_every
+        # Not kept exactly, as it's changed without holding any lock.
+        self.pops = 0
+
+    def __len__(self):
+        '''Return the number of items in the queue (which may well have
+        changed by the time it's returned).
+        '''
+        return sum(heap.n for heap in self.heaps)
+
+    def push(self, payload, key):
+        '''Add `payload` to the queue with the given `key`.
+        '''
+        i = random.randrange(len(self.heaps))
+        item = FibHeapItem(key, payload)
+        with self.locks[i]:
+            self.heaps[i].insert(item)
+
+    def pop(self, relaxed = None):
+        '''Remove and return a (payload, key) pair with the smallest key, or
+        if relaxed (by default `self.relaxed`) one with a small key.
+
+        An IndexError is raised if the queue is empty.
+        '''
+        if relaxed is None:
+            relaxed = self.relaxed
+        if self.rebalance_every is not None:
+            self.pops += 1
+            if self.pops >= self.rebalance_every:
+                self.pops = 0
+                self.rebalance()
+
+        item = None
+        if relaxed and len(self.heaps) > 1:
+            item = self._pop_two_choice()
+        if item is None:
+            item = self._pop_exact()
+        if item is None:
+            raise IndexError('pop from an empty ShardedPriorityQueue')
+        return item.payload, item.key
+
+    def _pop_two_choice(self):
+        '''Pop from the better of two random shards, or return None if both
+        are empty.
+        '''
+        k = len(self.heaps)
+        i = random.randrange(k)
+        j = (i + 1 + random.randrange(k - 1)) % k
+        # A look at the minimums without their locks is only a guess, so the
+        # choice is checked again once the lock is held.
+        a, b = self.heaps[i].min, self.heaps[j].min
+        if a is None or (b is not None and b.key < a.key):
+            i, j = j, i
+        for c in (i, j):
+            with self.locks[c]:
+                if self.heaps[c].min is not None:
+                    return self.heaps[c].extract_min()
+        return None
+
+    def _pop_exact(self):
+        '''Pop the true minimum, holding every lock, or return None if the
+        queue is empty.
+        '''
+        # Always taking the locks in the same order means threads doing this
+        # at once can't deadlock.
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            best = None
+            for heap in self.heaps:
+                if heap.min is not None and (best is None or heap.min.key < best.min.key):
+                    best = heap
+            return best.extract_min() if best is not None else None
+        finally:
+            for lock in self.locks:
+                lock.release()
+
+    def rebalance(self):
+        '''Even out the shards, by merging them all into one heap and dealing
+        its trees back out, biggest first, each to whichever shard has the
+        fewest items so far.
+
+        The merges are O(1) each, but the trees have to be walked to count
+        their items, so this is O(n) in the worst case.
+        '''
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            heaps = self.heaps
+            everything = heaps[0]
+            for heap in heaps[1:]:
+                everything.merge(heap)
+            trees = [(tree_size(root), root) for root in everything.roots.items()]
+            trees.sort(key = lambda t: t[0], reverse = True)
+            for i in range(len(heaps)):
+                heaps[i] = FibHeap()
+            for size, root in trees:
+                heap = min(heaps, key = lambda h: h.n)
+                heap.roots.insert(root)
+                heap.n += size
+                if heap.min is None or root.key < heap.min.key:
+                    heap.min = root
+        finally:
+            for lock in self.locks:
+                lock.release()
+
+if __name__ == '__main__':
+    '''Some basic usage examples:
+    '''
+    queue = ShardedPriorityQueue(shards = 4)
+    workers = [threading.Thread(target = lambda t = t: [queue.push((t, i), i * 4 + t)
+                                                        for i in range(100)])
+               for t in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    print(len(queue), [len(heap) for heap in queue.heaps])
+    queue.rebalance()
+    print([len(heap) for heap in queue.heaps])
+    print([queue.pop()[1] for _ in range(10)])
+    print([queue.pop(relaxed = False)[1] for _ in range(10)])
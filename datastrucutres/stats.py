@@ -0,0 +1,107 @@
+'''
+
+    Operation counters for looking inside the datastructures.
+
+    Instrumentation is off by default and then costs next to nothing, just a
+    check that `stats` is None in a few places. To turn it on, give a FibHeap
+    an OpStats object with `heap.stats = OpStats()`, or a VEBTree one with
+    `tree.set_stats(OpStats())` (which hands it to every node in the tree).
+
+    The counters can be read off the OpStats object at any time. For feeding
+    a metrics exporter or a sampling profiler as things happen, an OpStats can
+    also be given a `callback`, which is called as callback(event, value) for
+    these events:
+
+    * 'consolidate' - FibHeap.consolidate ran, value is how many roots it
+      scanned.
+    * 'cut' - a decrease_key or delete in a FibHeap cut items, value is how
+      many, including the cascading cuts.
+    * 'query' - a VEBTree member, successor or predecessor query finished,
+      value is how many levels of the tree it went down.
+
+'''
+
+class OpStats(object):
+    '''Counters of the work done inside a FibHeap or VEBTree.
+
+    For FibHeaps: `links` made by consolidate, `cuts` (all of them) of which
+    `cascading_cuts` were because of a marked parent, `consolidates` and the
+    total and maximum `roots_scanned` by them, and the `max_degree` of any
+    root after consolidating.
+
+    For VEBTrees: `queries` and the total and maximum `depth` reached by them.
+    '''
+    def __init__(self, callback = None):
+        self.callback = callback
+        self.active = False # Whether a VEBTree query is in progress.
+        self.reset()
+
+    def reset(self):
+        '''Set all the counters back to zero.
+        '''
+        self.links = 0
+        self.cuts = 0
+        self.cascading_cuts = 0
+        self.consolidates = 0
+        self.roots_scanned = 0
+        self.max_roots_scanned = 0
+        self.max_degree = 0
+        self.queries = 0
+        self.levels = 0 # Levels visited by the current query.
+        self.depth = 0
+        self.max_depth = 0
+
+    def __str__(self):
+        return '<OpStats: ' + ', '.join(
+            '{!s}={!s}'.format(k, v) for k, v in sorted(self.as_dict().items())) + '>'
+
+    def as_dict(self):
+        '''Return the counters as a dict.
+        '''
+        return {
+            'links': self.links,
+            'cuts': self.cuts,
+            'cascading_cuts': self.cascading_cuts,
+            'consolidates': self.consolidates,
+            'roots_scanned': self.roots_scanned,
+            'max_roots_scanned': self.max_roots_scanned,
+            'max_degree': self.max_degree,
+            'queries': self.queries,
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+        }
+
+    def event(self, name, value):
+        '''Pass an event on to the callback, if there is one.
+        '''
+        if self.callback is not None:
+            self.callback(name, value)
+
+    def consolidated(self, scanned, degree):
+        '''Record a consolidate which scanned `scanned` roots and left a root
+        of degree `degree`.
+        '''
+        self.consolidates += 1
+        self.roots_scanned += scanned
+        if scanned > self.max_roots_scanned:
+            self.max_roots_scanned = scanned
+        if degree > self.max_degree:
+            self.max_degree = degree
+        self.event('consolidate', scanned)
+
+    def query(self, method, x):
+        '''Run the VEBTree query `method` (a bound method of the root of the
+        query) on `x`, counting the levels it visits, and return its result.
+        '''
+        self.active = True
+        self.levels = 0
+        try:
+            result = method(x)
+        finally:
+            self.active = False
+        self.queries += 1
+        self.depth += self.levels
+        if self.levels > self.max_depth:
+            self.max_depth = self.levels
+        self.event('query', self.levels)
+        return result
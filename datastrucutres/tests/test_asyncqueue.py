@@ -0,0 +1,159 @@
+'''
+
+    Tests for the AsyncPriorityQueue and the DeadlineScheduler, each run in
+    an event loop of its own with asyncio.run.
+
+    Run from the top of the repository with python -m pytest.
+
+'''
+
+import asyncio
+import random
+import unittest
+
+from datastrucutres.asyncqueue import AsyncPriorityQueue, DeadlineScheduler
+
+class TestAsyncPriorityQueue(unittest.TestCase):
+
+    def test_against_model(self):
+        # Keys are (priority, sequence) tuples, changed in both directions.
+        async def main():
+            rnd = random.Random(1)
+            queue = AsyncPriorityQueue()
+            model = dict()
+            for step in range(2000):
+                op = rnd.random()
+                payload = rnd.randrange(40)
+                key = (rnd.randrange(30), step)
+                if op < 0.3:
+                    if payload in model:
+                        self.assertRaises(ValueError, queue.put, payload, key)
+                    else:
+                        queue.put(payload, key)
+                        model[payload] = key
+                elif op < 0.5:
+                    queue.update(payload, key)
+                    model[payload] = key
+                elif op < 0.6:
+                    if payload in model:
+                        lower = (model[payload][0] - 1, step)
+                        queue.decrease_key(payload, lower)
+                        model[payload] = lower
+                elif op < 0.75:
+                    if payload in model:
+                        self.assertEqual(queue.remove(payload), model.pop(payload))
+                    else:
+                        self.assertRaises(KeyError, queue.remove, payload)
+                elif model:
+                    expected = min(model.items(), key = lambda pk: pk[1])
+                    self.assertEqual(queue.first(), expected)
+                    self.assertEqual(await queue.get(), expected)
+                    del model[expected[0]]
+                else:
+                    self.assertRaises(asyncio.QueueEmpty, queue.get_nowait)
+                self.assertEqual(len(queue), len(model))
+                self.assertEqual(queue.empty(), not model)
+            result = [queue.get_nowait() for _ in range(len(queue))]
+            self.assertEqual(result, sorted(model.items(), key = lambda pk: pk[1]))
+            self.assertIsNone(queue.first())
+
+        asyncio.run(main())
+
+    def test_handles(self):
+        async def main():
+            queue = AsyncPriorityQueue()
+            a = queue.put('a', (2, 'x'))
+            queue.put('b', (3, 'y'))
+            self.assertIs(queue.update(a, (4, 'z')), a)
+            self.assertEqual(queue.first(), ('b', (3, 'y')))
+            queue.decrease_key(a, (1, 'w'))
+            self.assertEqual(queue.remove(a), (1, 'w'))
+            self.assertRaises(KeyError, queue.remove, a)
+            self.assertNotIn('a', queue)
+            self.assertEqual(await queue.get(), ('b', (3, 'y')))
+
+        asyncio.run(main())
+
+    def test_get_waits(self):
+        async def main():
+            queue = AsyncPriorityQueue()
+            getters = [asyncio.ensure_future(queue.get()) for _ in range(3)]
+            await asyncio.sleep(0)
+            self.assertFalse(any(g.done() for g in getters))
+            # A cancelled getter doesn't take a put with it.
+            getters[0].cancel()
+            queue.put('x', 1)
+            queue.update('y', 2)
+            results = await asyncio.gather(*getters[1:])
+            self.assertEqual(sorted(results), [('x', 1), ('y', 2)])
+            self.assertTrue(getters[0].cancelled())
+            self.assertEqual(len(queue), 0)
+            self.assertEqual(queue.getters, type(queue.getters)())
+
+        asyncio.run(main())
+
+    def test_changed(self):
+        async def main():
+            queue = AsyncPriorityQueue()
+            queue.put('b', 5)
+            # Nothing changes in front: a timeout.
+            watcher = asyncio.ensure_future(queue.changed(0.02))
+            await asyncio.sleep(0)
+            queue.put('c', 9)
+            queue.update('c', 7)
+            self.assertFalse(await watcher)
+            # Things which change the first entry.
+            for change in (lambda: queue.put('a', 1), lambda: queue.decrease_key('b', 0),
+                           lambda: queue.update('b', 8), lambda: queue.remove('a'),
+                           queue.get_nowait):
+                watcher = asyncio.ensure_future(queue.changed())
+                await asyncio.sleep(0)
+                change()
+                self.assertTrue(await asyncio.wait_for(watcher, 1))
+            self.assertEqual(queue.watchers, [])
+
+        asyncio.run(main())
+
+class TestDeadlineScheduler(unittest.TestCase):
+
+    def test_order(self):
+        async def job(name, log):
+            log.append(name)
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            log = list()
+            scheduler = DeadlineScheduler()
+            runner = asyncio.ensure_future(scheduler.run())
+            now = loop.time()
+            scheduler.schedule(job('past', log), now - 1)
+            scheduler.schedule_in(job('third', log), 0.03)
+            later = scheduler.schedule_in(job('fourth', log), 0.01)
+            earlier = scheduler.schedule_in(job('first', log), 0.2)
+            dropped = scheduler.schedule_in(job('cancelled', log), 0.02)
+            scheduler.schedule_in(job('second', log), 0.02)
+            self.assertEqual(len(scheduler), 6)
+            # Both ways, keeping the handles.
+            self.assertIs(scheduler.reschedule(later, now + 0.04), later)
+            self.assertIs(scheduler.reschedule(earlier, now + 0.01), earlier)
+            scheduler.cancel(dropped)
+            self.assertRaises(KeyError, scheduler.cancel, dropped)
+            await asyncio.sleep(0.08)
+            self.assertEqual(log, ['past', 'first', 'second', 'third', 'fourth'])
+            self.assertEqual(len(scheduler), 0)
+            # Started already.
+            self.assertRaises(KeyError, scheduler.reschedule, later, now)
+            # Something earlier than what the runner is sleeping until.
+            scheduler.schedule_in(job('slow', log), 10)
+            await asyncio.sleep(0.01)
+            scheduler.schedule_in(job('quick', log), 0.01)
+            await asyncio.sleep(0.05)
+            self.assertEqual(log[-1], 'quick')
+            self.assertEqual(len(scheduler), 1)
+            runner.cancel()
+            scheduler.cancel(scheduler.queue.first()[0])
+
+        asyncio.run(main())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+'''
+
+    Tests for the DisjointSet, against a list of set labels relabelled the
+    slow way on every union.
+
+    Run from the top of the repository with python -m pytest.
+
+'''
+
+from array import array
+import random
+import unittest
+
+from datastrucutres.disjointset import DisjointSet, CHUNK
+
+class TestDisjointSet(unittest.TestCase):
+
+    def test_against_labels(self):
+        rnd = random.Random(1)
+        for n in (1, 2, 10, 300):
+            sets = DisjointSet(n)
+            label = list(range(n))
+            for _ in range(2 * n):
+                x, y = rnd.randrange(n), rnd.randrange(n)
+                self.assertEqual(sets.union(x, y), label[x] != label[y])
+                if label[x] != label[y]:
+                    old = label[y]
+                    label = [label[x] if l == old else l for l in label]
+                self.assertEqual(sets.count, len(set(label)))
+                z = rnd.randrange(n)
+                self.assertEqual(sets.same(x, z), label[x] == label[z])
+            for x in range(n):
+                self.assertEqual(label[sets.find(x)], label[x])
+                # Every rank bounds the height of its tree.
+                self.assertLess(sets.rank[sets.find(x)], n.bit_length() + 1)
+            groups = dict()
+            for x in range(n):
+                groups.setdefault(label[x], list()).append(x)
+            self.assertEqual(sorted(sets.sets().values()), sorted(groups.values()))
+
+    def test_find_many(self):
+        rnd = random.Random(2)
+        sets = DisjointSet(1000)
+        for _ in range(700):
+            sets.union(rnd.randrange(1000), rnd.randrange(1000))
+        xs = [rnd.randrange(1000) for _ in range(500)]
+        roots = sets.find_many(xs)
+        # The same type whether or not NumPy is installed.
+        self.assertIsInstance(roots, array)
+        self.assertEqual(roots.typecode, 'q')
+        self.assertEqual(roots.tolist(), [sets.find(x) for x in xs])
+        self.assertEqual(len(sets.find_many([])), 0)
+
+    def test_union_many(self):
+        # More than CHUNK pairs, so that with NumPy the chunked path is used.
+        rnd = random.Random(3)
+        n = 3 * CHUNK
+        xs = array('q', [rnd.randrange(n) for _ in range(3 * CHUNK)])
+        ys = array('q', [rnd.randrange(n) for _ in range(3 * CHUNK)])
+        one_by_one = DisjointSet(n)
+        expected = bytearray(one_by_one.union(x, y) for x, y in zip(xs, ys))
+        sets = DisjointSet(n)
+        self.assertEqual(sets.union_many(xs, ys), expected)
+        self.assertEqual(sets.count, one_by_one.count)
+        # Once everything is in one set the rest are skipped.
+        sets = DisjointSet(3)
+        self.assertEqual(list(sets.union_many([0, 1, 0, 2], [1, 2, 2, 0])), [1, 1, 0, 0])
+
+if __name__ == '__main__':
+    unittest.main()
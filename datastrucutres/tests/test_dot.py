@@ -0,0 +1,121 @@
+'''
+
+    Tests for the streaming DOT output of the FibHeap and the vEB trees.
+
+    Each limited output is checked to be a prefix of the full walk, with
+    every edge pointing between nodes which were written.
+
+    Run from the top of the repository with python -m pytest.
+
+'''
+
+import io
+import random
+import re
+import unittest
+
+from datastrucutres.fibheap import FibHeap, FibHeapItem
+from datastrucutres.vebtree import VEBTree, ProtoVEBTree
+
+def written(write, **limits):
+    fp = io.StringIO()
+    write(fp, **limits)
+    return fp.getvalue()
+
+class TestFibHeapDOT(unittest.TestCase):
+
+    def nodes_and_edges(self, dot):
+        nodes = re.findall(r'^  (\d+) \[', dot, re.M)
+        edges = re.findall(r'^  (\d+) -- (\d+);', dot, re.M)
+        self.assertEqual(len(nodes), len(set(nodes)))
+        for a, b in edges:
+            self.assertIn(a, nodes)
+            self.assertIn(b, nodes)
+        return nodes, edges
+
+    def heap(self):
+        rnd = random.Random(1)
+        heap = FibHeap()
+        for k in range(300):
+            heap.insert(FibHeapItem(rnd.randrange(1000)))
+        heap.extract_min()
+        return heap
+
+    def test_heap(self):
+        heap = self.heap()
+        dot = written(heap.write_DOT, label = 'Heap')
+        self.assertEqual(dot, heap.to_DOT('Heap'))
+        self.assertTrue(dot.startswith('graph G {') and dot.endswith('}'))
+        nodes, edges = self.nodes_and_edges(dot)
+        self.assertEqual(len(nodes), heap.n)
+        self.assertEqual(len(edges), heap.n - len(heap.roots.items()))
+        for k in (0, 1, 50, heap.n - 1):
+            limited = written(heap.write_DOT, max_nodes = k)
+            self.assertEqual(self.nodes_and_edges(limited)[0], nodes[:k])
+            self.assertIn('// Stopped after {!s} nodes.'.format(k), limited)
+        self.assertNotIn('Stopped', written(heap.write_DOT, max_nodes = heap.n))
+        # Only the roots.
+        nodes, edges = self.nodes_and_edges(written(heap.write_DOT, max_depth = 0))
+        self.assertEqual(len(nodes), len(heap.roots.items()))
+        self.assertEqual(edges, [])
+        self.assertEqual(FibHeap().to_DOT('Empty').count('['), 0)
+
+    def test_item(self):
+        heap = self.heap()
+        item = max(heap.roots.items(), key = lambda root: root.degree)
+        dot = written(item.write_DOT)
+        self.assertEqual(dot, item.to_DOT())
+        nodes, edges = self.nodes_and_edges(dot)
+        self.assertEqual(nodes[0], str(id(item)))
+        # Below a root the first edge goes up to the item's parent, which
+        # isn't written.
+        child = max(item.children(), key = lambda c: c.degree)
+        dot = written(child.write_DOT, max_depth = 1)
+        self.assertEqual(dot.count('['), 1 + child.degree)
+        self.assertEqual(dot.count(' -- '), 1 + child.degree)
+        self.assertEqual(written(child.write_DOT, max_nodes = 1), child._DOT_node() +
+                         '  // Stopped after 1 nodes.\n')
+
+class TestVEBTreeDOT(unittest.TestCase):
+
+    def nodes_and_edges(self, dot):
+        nodes = re.findall(r'^node(\w+)\[', dot, re.M)
+        edges = re.findall(r'^"node(\w+)":(\w+) -> "node(\w+)";', dot, re.M)
+        self.assertEqual(len(nodes), len(set(nodes)))
+        self.assertEqual(len(edges), max(0, len(nodes) - 1))
+        for a, port, b in edges:
+            self.assertIn(a, nodes)
+            self.assertIn(b, nodes)
+        return nodes, edges
+
+    def test_trees(self):
+        rnd = random.Random(2)
+        for cls, u, sparse in ((VEBTree, 2 ** 10, False), (VEBTree, 2 ** 32, True),
+                               (ProtoVEBTree, 2 ** 8, False), (ProtoVEBTree, 2 ** 16, True)):
+            tree = cls(u, sparse)
+            for x in rnd.sample(range(min(u, 2 ** 20)), 40):
+                tree.insert(x)
+            dot = written(tree.write_DOT, wrap = False)
+            self.assertEqual(dot, tree.to_DOT())
+            wrapped = written(tree.write_DOT, glabel = 'Tree')
+            self.assertTrue(wrapped.startswith('digraph g {') and wrapped.endswith('}'))
+            self.assertIn('label = "Tree"', wrapped)
+            nodes = self.nodes_and_edges(dot)[0]
+            for k in (1, 2, len(nodes) // 2):
+                limited = written(tree.write_DOT, max_nodes = k)
+                self.assertEqual(self.nodes_and_edges(limited)[0], nodes[:k])
+                self.assertIn('// Stopped after ' + str(k) + ' nodes.', limited)
+            self.assertEqual(len(self.nodes_and_edges(
+                written(tree.write_DOT, max_depth = 0))[0]), 1)
+            # The root, its summary and its clusters.
+            shallow = self.nodes_and_edges(written(tree.write_DOT, max_depth = 1))[0]
+            self.assertEqual(len(shallow), 1 + (tree.summary is not None) + len(tree.clusters()))
+            # Leaving out the empty clusters and summaries leaves out only those.
+            skipped = self.nodes_and_edges(written(tree.write_DOT, skip_empty = True))[0]
+            self.assertLessEqual(len(skipped), len(nodes))
+            if not sparse:
+                self.assertLess(len(skipped), len(nodes))
+            self.assertTrue(set(skipped) <= set(nodes))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,323 @@
+'''
+
+    Tests for the FibHeap.
+
+    Each test does a random mix of operations on a heap, checking the items
+    which come out against a plain Python model as it goes and checking the
+    structure of the heap (see `check`) along the way.
+
+    Run from the top of the repository with python -m pytest.
+
+'''
+
+import math
+import random
+import unittest
+
+from datastrucutres.fibheap import FibHeap, FibHeapItem, PriorityMap
+
+def ring(first):
+    '''Return a list of the items in the ring which first is in, checking the
+    left and right pointers agree.
+    '''
+    items = list()
+    if first is not None:
+        item = first
+        while True:
+            items.append(item)
+            assert item.right.left is item
+            item = item.right
+            if item is first:
+                break
+    return items
+
+def check(heap):
+    '''Check the structure of heap, returning a list of all its items:
+
+    * Every child's key is at least its parent's, it points back to its
+      parent, and each item's degree is its number of children.
+    * The roots have no parent and min is a root with the smallest key.
+    * n is the number of items.
+    '''
+    roots = ring(heap.roots.start)
+    items = list()
+    for root in roots:
+        assert root.parent is None
+        stack = [root]
+        while stack:
+            item = stack.pop()
+            items.append(item)
+            children = ring(item.child)
+            assert item.degree == len(children)
+            for child in children:
+                assert child.parent is item
+                assert not child.key < item.key
+            stack.extend(children)
+    assert heap.n == len(items)
+    if roots:
+        assert heap.min in roots
+        assert not any(root.key < heap.min.key for root in roots)
+    else:
+        assert heap.min is None
+    return items
+
+class TestFibHeap(unittest.TestCase):
+
+    def test_against_model(self):
+        rnd = random.Random(1)
+        for trial in range(20):
+            heap = FibHeap()
+            live = list() # The items in the heap, in no particular order.
+            for step in range(1500):
+                op = rnd.random()
+                if op < 0.4 or not live:
+                    item = FibHeapItem(rnd.randrange(1000), step)
+                    heap.insert(item)
+                    live.append(item)
+                elif op < 0.65:
+                    item = heap.extract_min()
+                    self.assertEqual(item.key, min(i.key for i in live))
+                    live.remove(item)
+                elif op < 0.85:
+                    item = rnd.choice(live)
+                    heap.decrease_key(item, item.key - rnd.randrange(200))
+                elif op < 0.95:
+                    item = rnd.choice(live)
+                    heap.delete(item)
+                    live.remove(item)
+                else:
+                    other = FibHeap()
+                    for _ in range(rnd.randrange(5)):
+                        item = FibHeapItem(rnd.randrange(1000))
+                        other.insert(item)
+                        live.append(item)
+                    heap.merge(other)
+                if step % 100 == 0:
+                    self.assertEqual(sorted(map(id, check(heap))), sorted(map(id, live)))
+            keys = list()
+            while heap.n:
+                keys.append(heap.extract_min().key)
+            self.assertEqual(keys, sorted(i.key for i in live))
+            self.assertIsNone(heap.extract_min())
+            check(heap)
+
+    def test_no_per_node_lists(self):
+        # The children are intrusive rings through the items themselves.
+        item = FibHeapItem(1)
+        self.assertFalse(hasattr(item, '__dict__'))
+        heap = FibHeap()
+        for k in range(10):
+            heap.insert(FibHeapItem(k))
+        heap.extract_min()
+        self.assertTrue(all(isinstance(c, FibHeapItem) for c in heap.min.children()))
+
+    def test_consolidate(self):
+        # After an extract_min every root has a different degree, no degree
+        # is more than log_phi(n), and the table of roots by degree is left
+        # empty for the next time rather than being made again.
+        rnd = random.Random(2)
+        phi = (1 + 5 ** 0.5) / 2
+        heap = FibHeap()
+        table = heap.degrees
+        items = [FibHeapItem(rnd.random()) for _ in range(3000)]
+        for item in items:
+            heap.insert(item)
+        while heap.n:
+            heap.extract_min()
+            degrees = [root.degree for root in ring(heap.roots.start)]
+            self.assertEqual(len(degrees), len(set(degrees)))
+            if heap.n:
+                self.assertLessEqual(max(degrees), math.log(heap.n, phi) + 1)
+            self.assertIs(heap.degrees, table)
+            self.assertTrue(all(slot is None for slot in table))
+            if heap.n % 100 == 0:
+                check(heap)
+                roots = ring(heap.roots.start)
+                for item in rnd.sample(roots, min(3, len(roots))):
+                    heap.decrease_key(item, item.key - 1)
+
+    def test_consolidate_ties(self):
+        # Equal keys are linked either way round without breaking anything.
+        heap = FibHeap()
+        for k in [5] * 50 + [3] * 50:
+            heap.insert(FibHeapItem(k))
+        keys = [heap.extract_min().key for _ in range(100)]
+        self.assertEqual(keys, [3] * 50 + [5] * 50)
+
+    def test_insert_many(self):
+        rnd = random.Random(4)
+        heap = FibHeap.from_iterable([])
+        self.assertEqual(heap.n, 0)
+        self.assertIsNone(heap.first())
+        keys = list()
+        for size in (1, 5, 0, 200, 3):
+            batch = [rnd.randrange(1000) for _ in range(size)]
+            heap.insert_many(FibHeapItem(k) for k in batch) # Any iterable.
+            keys.extend(batch)
+            check(heap)
+            self.assertEqual(heap.first().key, min(keys))
+            heap.extract_min()
+            keys.remove(min(keys))
+        heap = FibHeap.from_iterable(FibHeapItem(k) for k in keys)
+        self.assertEqual([heap.extract_min().key for _ in keys], sorted(keys))
+
+    def test_extract_many(self):
+        rnd = random.Random(5)
+        for trial in range(30):
+            keys = [rnd.randrange(100) for _ in range(rnd.randrange(1, 300))]
+            heap = FibHeap.from_iterable(FibHeapItem(k) for k in keys)
+            # Some structure first, so that items are taken from below the
+            # roots too.
+            heap.extract_min()
+            keys.sort()
+            del keys[0]
+            self.assertEqual(heap.extract_many(0), [])
+            self.assertEqual(heap.extract_many(-1), [])
+            while heap.n:
+                k = rnd.randrange(1, 20)
+                taken = heap.extract_many(k)
+                self.assertIsInstance(taken, list)
+                self.assertEqual([item.key for item in taken], keys[:k])
+                del keys[:k]
+                self.assertEqual(sorted(item.key for item in check(heap)), keys)
+                # Taken items are cleared, so they can go back in again.
+                for item in taken:
+                    self.assertIsNone(item.parent)
+                    self.assertIsNone(item.child)
+                    self.assertEqual(item.degree, 0)
+            self.assertEqual(heap.extract_many(5), [])
+
+    def test_drain(self):
+        rnd = random.Random(6)
+        heap = FibHeap()
+        items = [FibHeapItem(rnd.randrange(1000)) for _ in range(500)]
+        for item in items:
+            heap.insert(item)
+        heap.extract_min()
+        for item in rnd.sample(items[1:], 50):
+            heap.decrease_key(item, item.key - 10)
+        expected = sorted(item.key for item in check(heap))
+        drained = heap.drain()
+        self.assertEqual([item.key for item in drained], expected)
+        self.assertEqual(heap.n, 0)
+        self.assertIsNone(heap.first())
+        check(heap)
+        self.assertEqual(heap.drain(), [])
+        # The drained items can be inserted into a heap again.
+        heap.insert_many(drained)
+        taken = heap.extract_many(len(drained) + 1)
+        self.assertEqual([item.key for item in taken], expected)
+
+    def test_deep_chain(self):
+        # A chain of marked items far deeper than the recursion limit: the
+        # DOT export walks all of it, and decreasing the bottom item cuts
+        # every one of them into the roots in one cascade.
+        n = 5000
+        items = [FibHeapItem(k) for k in range(n)]
+        heap = FibHeap(items[0])
+        for parent, item in zip(items, items[1:]):
+            parent.link(item)
+            item.marked = True
+        heap.n = n
+        check(heap)
+        dot = heap.to_DOT('Deep')
+        self.assertEqual(dot.count(' -- '), n - 1)
+        self.assertEqual(items[-1].to_DOT().count('\n'), 2)
+        heap.decrease_key(items[-1], -1)
+        self.assertIs(heap.first(), items[-1])
+        roots = ring(heap.roots.start)
+        self.assertEqual(len(roots), n)
+        self.assertTrue(all(item.degree == 0 and not item.marked for item in roots))
+        check(heap)
+        self.assertEqual([heap.extract_min().key for _ in range(3)], [-1, 0, 1])
+
+class TestPriorityMap(unittest.TestCase):
+
+    def test_against_model(self):
+        # Keys are (priority, sequence) tuples, which can't be compared with
+        # numbers, so nothing may lower them to -infinity.
+        rnd = random.Random(3)
+        for trial in range(20):
+            queue = PriorityMap()
+            model = dict() # Payload to key.
+            handles = dict() # Payload to the handle it was last pushed with.
+            for step in range(1000):
+                op = rnd.random()
+                payload = rnd.randrange(60)
+                key = (rnd.randrange(50), step)
+                ref = handles[payload] if payload in model and rnd.random() < 0.5 else payload
+                if op < 0.25:
+                    if payload in model:
+                        self.assertRaises(ValueError, queue.push, payload, key)
+                    else:
+                        handles[payload] = queue.push(payload, key)
+                        model[payload] = key
+                elif op < 0.5:
+                    # Up or down, or pushing it if it isn't there.
+                    handle = queue.update(ref, key)
+                    if payload in model:
+                        self.assertIs(handle, handles[payload])
+                    handles[payload] = handle
+                    model[payload] = key
+                elif op < 0.65:
+                    if payload in model:
+                        lower = (model[payload][0] - rnd.randrange(1, 10), step)
+                        queue.decrease_key(ref, lower)
+                        model[payload] = lower
+                        self.assertRaises(ValueError, queue.decrease_key, ref,
+                                          (lower[0] + 1, step))
+                    else:
+                        self.assertRaises(KeyError, queue.decrease_key, payload, key)
+                elif op < 0.8:
+                    if payload in model:
+                        self.assertEqual(queue.remove(ref), model.pop(payload))
+                    else:
+                        self.assertRaises(KeyError, queue.remove, payload)
+                elif model:
+                    expected = min(model.items(), key = lambda pk: pk[1])
+                    self.assertEqual(queue.first(), expected)
+                    self.assertEqual(queue.pop(), expected)
+                    del model[expected[0]]
+                self.assertEqual(len(queue), len(model))
+                for payload, key in model.items():
+                    self.assertEqual(queue[payload], key)
+            check(queue.heap)
+            result = list()
+            while queue:
+                result.append(queue.pop())
+            self.assertEqual(result, sorted(model.items(), key = lambda pk: pk[1]))
+            self.assertRaises(IndexError, queue.pop)
+
+    def test_stale_and_foreign_handles(self):
+        queue = PriorityMap()
+        other = PriorityMap()
+        a = queue.push('a', (1, 0))
+        b = queue.push('b', (2, 0))
+        foreign = other.push('a', (0, 0))
+        for op in (lambda h: queue.update(h, (5, 0)), queue.remove, queue.node,
+                   lambda h: queue.decrease_key(h, (0, 0))):
+            self.assertRaises(KeyError, op, foreign)
+        self.assertEqual(queue.pop(), ('a', (1, 0)))
+        # a's handle is stale now, even once 'a' is pushed again.
+        queue.push('a', (3, 0))
+        for op in (lambda h: queue.update(h, (5, 0)), queue.remove, queue.node,
+                   lambda h: queue.decrease_key(h, (0, 0))):
+            self.assertRaises(KeyError, op, a)
+        self.assertEqual(queue.remove(b), (2, 0))
+        self.assertRaises(KeyError, queue.remove, b)
+        self.assertEqual([queue.pop(), len(queue), other.pop()],
+                         [('a', (3, 0)), 0, ('a', (0, 0))])
+
+    def test_raise_key_keeps_handle(self):
+        queue = PriorityMap()
+        handles = [queue.push(i, (i, 'x')) for i in range(50)]
+        queue.pop() # Consolidate, so the items have parents.
+        for i in range(1, 50, 2):
+            self.assertIs(queue.update(handles[i], (100 + i, 'y')), handles[i])
+            self.assertEqual(handles[i].key, (100 + i, 'y'))
+        check(queue.heap)
+        order = [queue.pop()[0] for _ in range(len(queue))]
+        self.assertEqual(order, list(range(2, 50, 2)) + list(range(1, 50, 2)))
+
+if __name__ == '__main__':
+    unittest.main()
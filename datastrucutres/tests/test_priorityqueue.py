@@ -0,0 +1,126 @@
+'''
+
+    Tests for the priority queues, made through make_queue.
+
+    Every queue gets the same random workload, checked against a plain
+    Python model. The keys are monotone (none is below the last one
+    extracted), as the radix heap and vEB bucket queue need, and within SPAN
+    of it, as the bucket queue also needs.
+
+    Run from the top of the repository with python -m pytest.
+
+'''
+
+import random
+import unittest
+
+from datastrucutres.priorityqueue import make_queue, queue_class
+
+# Keys are kept below the last extracted key plus this.
+SPAN = 1000
+
+# The queues and any arguments they need.
+QUEUES = {
+    'fibheap': {},
+    'pairing': {},
+    'binary': {},
+    'radix': {},
+    'veb': {'span': SPAN},
+}
+
+# The queues which take any keys, not just monotone integers.
+GENERAL = ['fibheap', 'pairing', 'binary']
+
+# The queues which are told the last key extracted when they are made.
+MONOTONE = ['radix', 'veb']
+
+class TestQueues(unittest.TestCase):
+
+    def workload(self, name, seed):
+        rnd = random.Random(seed)
+        def make(last):
+            if name in MONOTONE:
+                return make_queue(name, last = last, **QUEUES[name])
+            return make_queue(name, **QUEUES[name])
+        queue = make(0)
+        Item = queue.item_class
+        live = list()
+        last = 0
+        for step in range(3000):
+            op = rnd.random()
+            if op < 0.35 or not live:
+                item = Item(last + rnd.randrange(SPAN), step)
+                queue.insert(item)
+                live.append(item)
+            elif op < 0.6:
+                item = queue.extract_min()
+                self.assertEqual(item.key, min(i.key for i in live))
+                self.assertGreaterEqual(item.key, last)
+                last = item.key
+                live.remove(item)
+            elif op < 0.75:
+                self.assertEqual(queue.first().key, min(i.key for i in live))
+                item = rnd.choice(live)
+                queue.decrease_key(item, rnd.randrange(last, item.key + 1))
+            elif op < 0.9:
+                item = rnd.choice(live)
+                queue.delete(item)
+                live.remove(item)
+            else:
+                other = make(last)
+                for _ in range(rnd.randrange(6)):
+                    item = Item(last + rnd.randrange(SPAN))
+                    other.insert(item)
+                    live.append(item)
+                queue.merge(other)
+            self.assertEqual(queue.n, len(live))
+            self.assertEqual(len(queue), len(live))
+        keys = list()
+        while queue.n:
+            keys.append(queue.extract_min().key)
+        self.assertEqual(keys, sorted(i.key for i in live))
+        self.assertIsNone(queue.first())
+        self.assertIsNone(queue.extract_min())
+
+    def test_queues(self):
+        for name in QUEUES:
+            for seed in range(3):
+                self.workload(name, seed)
+
+    def test_general_keys(self):
+        # Tuples, with decreases and deletes, in the queues which allow any
+        # keys at all.
+        rnd = random.Random(4)
+        for name in GENERAL:
+            queue = make_queue(name)
+            items = [queue.item_class((rnd.randrange(20), i), i) for i in range(300)]
+            for item in items:
+                queue.insert(item)
+            for item in rnd.sample(items, 100):
+                queue.decrease_key(item, (item.key[0] - 5, item.key[1]))
+            for item in rnd.sample(items, 100):
+                queue.delete(item)
+                items.remove(item)
+            keys = [queue.extract_min().key for _ in range(len(items))]
+            self.assertEqual(keys, sorted(i.key for i in items))
+
+    def test_monotone_checks(self):
+        for name in MONOTONE:
+            queue = make_queue(name, **QUEUES[name])
+            queue.insert(queue.item_class(10))
+            queue.extract_min()
+            self.assertRaises(ValueError, queue.insert, queue.item_class(9))
+        # The bucket queue's span is rounded up to a power of 2.
+        queue = make_queue('veb', span = 1000, last = 5)
+        queue.insert(queue.item_class(5 + 1023))
+        self.assertRaises(ValueError, queue.insert, queue.item_class(5 + 1024))
+        other = make_queue('veb', span = 1000, last = 2000)
+        other.insert(other.item_class(2000))
+        self.assertRaises(ValueError, queue.merge, other)
+
+    def test_unknown_name(self):
+        self.assertRaises(ValueError, make_queue, 'no such queue')
+        self.assertIs(queue_class('pairing'), type(make_queue('pairing')))
+
+if __name__ == '__main__':
+    unittest.main()
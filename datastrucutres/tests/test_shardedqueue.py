@@ -0,0 +1,115 @@
+'''
+
+    Tests for the ShardedPriorityQueue: exact and relaxed pops, rebalancing,
+    and many threads pushing and popping at once.
+
+    Run from the top of the repository with python -m pytest.
+
+'''
+
+import random
+import threading
+import unittest
+
+from datastrucutres.fibheap import FibHeapItem
+from datastrucutres.shardedqueue import ShardedPriorityQueue, tree_size
+from datastrucutres.tests.test_fibheap import check
+
+class TestShardedPriorityQueue(unittest.TestCase):
+
+    def setUp(self):
+        # The shards are picked with the random module's own generator.
+        random.seed(1)
+
+    def test_exact(self):
+        for shards in (1, 3, 8):
+            queue = ShardedPriorityQueue(shards, relaxed = False)
+            keys = [random.randrange(1000) for _ in range(500)]
+            for i, k in enumerate(keys):
+                queue.push(i, k)
+            self.assertEqual(len(queue), len(keys))
+            popped = [queue.pop() for _ in keys]
+            self.assertEqual([k for p, k in popped], sorted(keys))
+            self.assertEqual(sorted(p for p, k in popped), list(range(len(keys))))
+            self.assertTrue(all(keys[p] == k for p, k in popped))
+            self.assertRaises(IndexError, queue.pop)
+            self.assertRaises(IndexError, queue.pop, relaxed = True)
+        self.assertRaises(ValueError, ShardedPriorityQueue, 0)
+
+    def test_relaxed(self):
+        # Everything comes out exactly once and each pop is close to the
+        # smallest left: its rank is O(shards) on average.
+        shards = 4
+        queue = ShardedPriorityQueue(shards)
+        n = 2000
+        for k in random.sample(range(n), n):
+            queue.push(k, k)
+        left = list(range(n))
+        ranks = list()
+        while left:
+            payload, key = queue.pop()
+            rank = left.index(key) # left stays sorted.
+            ranks.append(rank)
+            del left[rank]
+        self.assertRaises(IndexError, queue.pop)
+        self.assertLess(sum(ranks) / n, 2 * shards)
+        # Popping with one shard empty falls back to the other one.
+        queue = ShardedPriorityQueue(2)
+        queue.heaps[1].insert(FibHeapItem(5))
+        self.assertEqual(queue.pop(), (None, 5))
+
+    def test_rebalance(self):
+        queue = ShardedPriorityQueue(4, relaxed = False)
+        # Everything in one shard, in trees of several sizes.
+        heap = queue.heaps[0]
+        keys = [random.randrange(1000) for _ in range(1000)]
+        for k in keys:
+            heap.insert(FibHeapItem(k))
+        heap.extract_min()
+        keys.remove(min(keys))
+        largest = max(tree_size(root) for root in heap.roots.items())
+        queue.rebalance()
+        sizes = [len(shard) for shard in queue.heaps]
+        self.assertEqual(sum(sizes), len(keys))
+        self.assertLessEqual(max(sizes) - min(sizes), largest)
+        self.assertEqual(sorted(k for shard in queue.heaps for k in
+                                (item.key for item in check(shard))), sorted(keys))
+        self.assertEqual([queue.pop()[1] for _ in range(len(keys))], sorted(keys))
+        queue.rebalance() # Empty.
+        self.assertEqual(len(queue), 0)
+
+    def test_rebalance_every(self):
+        queue = ShardedPriorityQueue(4, rebalance_every = 10)
+        for k in range(100):
+            queue.heaps[0].insert(FibHeapItem(k))
+        for _ in range(9):
+            queue.pop()
+        self.assertEqual(len(queue.heaps[0]), 91)
+        queue.pop()
+        self.assertLess(len(queue.heaps[0]), 90)
+        self.assertEqual(queue.pops, 0)
+
+    def test_threads(self):
+        queue = ShardedPriorityQueue(4, rebalance_every = 50)
+        per_thread = 2000
+        popped = [list() for _ in range(4)]
+
+        def worker(t):
+            for i in range(per_thread):
+                queue.push((t, i), random.random())
+                if i % 2:
+                    popped[t].append(queue.pop()[0])
+
+        threads = [threading.Thread(target = worker, args = (t,)) for t in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        rest = [queue.pop(relaxed = False)[0] for _ in range(len(queue))]
+        everything = [p for ps in popped for p in ps] + rest
+        self.assertEqual(sorted(everything),
+                         [(t, i) for t in range(4) for i in range(per_thread)])
+        self.assertEqual(len(queue), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+'''
+
+    Tests for the OpStats counters in FibHeap and VEBTree.
+
+    Run from the top of the repository with python -m pytest.
+
+'''
+
+import random
+import unittest
+
+from datastrucutres.fibheap import FibHeap, FibHeapItem
+from datastrucutres.stats import OpStats
+from datastrucutres.vebtree import VEBTree, LEAF_SIZE
+
+class TestFibHeapStats(unittest.TestCase):
+
+    def test_consolidate_counts(self):
+        # n single roots then one extract_min: the other n - 1 roots are all
+        # scanned and linked down to one root per set bit of n - 1.
+        for n in (1, 2, 7, 64, 1000):
+            events = list()
+            heap = FibHeap()
+            heap.stats = OpStats(lambda event, value: events.append((event, value)))
+            for k in range(n):
+                heap.insert(FibHeapItem(k))
+            heap.extract_min()
+            stats = heap.stats
+            roots = bin(n - 1).count('1')
+            self.assertEqual(stats.consolidates, 1 if n > 1 else 0)
+            self.assertEqual(stats.roots_scanned, n - 1)
+            self.assertEqual(stats.max_roots_scanned, n - 1)
+            self.assertEqual(stats.links, n - 1 - roots)
+            self.assertEqual(stats.max_degree, (n - 1).bit_length() - 1 if n > 1 else 0)
+            self.assertEqual(events, [('consolidate', n - 1)] if n > 1 else [])
+
+    def test_cut_counts(self):
+        rnd = random.Random(1)
+        events = list()
+        heap = FibHeap()
+        heap.stats = OpStats(lambda event, value: events.append((event, value)))
+        items = [FibHeapItem(rnd.random()) for _ in range(2000)]
+        for item in items:
+            heap.insert(item)
+        heap.extract_min()
+        del events[:]
+        for item in rnd.sample(items[1:], 500):
+            heap.decrease_key(item, item.key - 1)
+        cuts = [value for event, value in events if event == 'cut']
+        self.assertEqual(heap.stats.cuts, sum(cuts))
+        self.assertGreater(heap.stats.cascading_cuts, 0)
+        self.assertLess(heap.stats.cascading_cuts, heap.stats.cuts)
+        # Every event is one cut plus the cascade above it.
+        self.assertTrue(all(value >= 1 for value in cuts))
+
+    def test_reset(self):
+        stats = OpStats()
+        heap = FibHeap()
+        heap.stats = stats
+        for k in range(10):
+            heap.insert(FibHeapItem(k))
+        heap.extract_min()
+        self.assertNotEqual(stats.as_dict()['links'], 0)
+        stats.reset()
+        self.assertEqual(set(stats.as_dict().values()), {0})
+
+class TestVEBTreeStats(unittest.TestCase):
+
+    def test_query_depth(self):
+        rnd = random.Random(2)
+        for u, sparse in ((2 ** 10, False), (2 ** 32, True)):
+            tree = VEBTree(u, sparse)
+            for x in rnd.sample(range(u), 500):
+                tree.insert(x)
+            events = list()
+            tree.set_stats(OpStats(lambda event, value: events.append((event, value))))
+            # Nodes made after set_stats share the stats too.
+            for x in rnd.sample(range(u), 20):
+                tree.insert(x)
+            stack = [tree]
+            while stack:
+                node = stack.pop()
+                self.assertIs(node.stats, tree.stats)
+                if node.u > LEAF_SIZE:
+                    if node.summary is not None:
+                        stack.append(node.summary)
+                    stack.extend(c for h, c in node.clusters())
+            for _ in range(100):
+                x = rnd.randrange(u)
+                tree.member(x)
+                tree.successor(x)
+                tree.predecessor(x)
+            stats = tree.stats
+            levels = (u.bit_length() - 1).bit_length() + 1 # lglgu + 1
+            self.assertEqual(stats.queries, 300)
+            self.assertEqual(len(events), 300)
+            self.assertTrue(all(event == 'query' and 1 <= value <= levels
+                                for event, value in events))
+            self.assertEqual(stats.depth, sum(value for event, value in events))
+            self.assertEqual(stats.max_depth, max(value for event, value in events))
+            # Turning it off again.
+            tree.set_stats(None)
+            tree.member(0)
+            self.assertEqual(stats.queries, 300)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+'''
+
+    Tests for the TimerWheel, against a plain list of the timers waiting.
+
+    The wheels here are small, so timers often go round the end of the tree
+    and through the overflow heap.
+
+    Run from the top of the repository with python -m pytest.
+
+'''
+
+import random
+import unittest
+
+from datastrucutres.timerwheel import TimerWheel
+
+class TestTimerWheel(unittest.TestCase):
+
+    def test_against_model(self):
+        rnd = random.Random(1)
+        for u, sparse in ((16, True), (64, False), (2 ** 20, True)):
+            wheel = TimerWheel(u, now = rnd.randrange(100), sparse = sparse)
+            now = wheel.now
+            waiting = dict() # Timer to the tick it fires at.
+            fired = list()
+            for step in range(3000):
+                op = rnd.random()
+                if op < 0.5:
+                    # Mostly inside the window, some past and some beyond it.
+                    tick = now + rnd.randrange(-10, 3 * u if u < 1000 else 200)
+                    timer = wheel.insert(tick, lambda t: fired.append((t, wheel.now)), step)
+                    # A tick already passed fires on the next advance_to.
+                    waiting[timer] = max(tick, now)
+                elif op < 0.65:
+                    if waiting and rnd.random() < 0.8:
+                        timer = rnd.choice(list(waiting))
+                        self.assertTrue(wheel.cancel(timer))
+                        del waiting[timer]
+                        self.assertFalse(timer.pending())
+                        self.assertFalse(wheel.cancel(timer))
+                else:
+                    if op < 0.67:
+                        target = now - rnd.randrange(1, 20) # Backwards.
+                    elif op < 0.7:
+                        target = now + rnd.randrange(10 ** 6, 10 ** 12) # Far on.
+                    else:
+                        target = now + rnd.randrange(3 * u if u < 1000 else 100)
+                    due = sorted((tick, timer.args[0]) for timer, tick in waiting.items()
+                                 if tick <= target)
+                    del fired[:]
+                    self.assertEqual(wheel.advance_to(target), len(due))
+                    # Fired in order of tick, each when the wheel was at its
+                    # tick, and just the ones due.
+                    self.assertEqual(sorted(fired), sorted((seq, tick) for tick, seq in due))
+                    ticks = [tick for seq, tick in fired]
+                    self.assertEqual(ticks, sorted(ticks))
+                    waiting = {timer: tick for timer, tick in waiting.items() if tick > target}
+                    now = max(now, target)
+                    self.assertEqual(wheel.now, now)
+                self.assertEqual(len(wheel), len(waiting))
+                self.assertEqual(wheel.next_tick(), min(waiting.values()) if waiting else None)
+                self.assertTrue(all(timer.pending() for timer in waiting))
+
+    def test_empty_jump(self):
+        # Nothing waiting at all: straight there, rather than a window at a
+        # time.
+        wheel = TimerWheel(u = 16)
+        self.assertEqual(wheel.advance_to(10 ** 15), 0)
+        self.assertEqual(wheel.now, 10 ** 15)
+        # Only cancelled timers left in the overflow heap.
+        timer = wheel.insert(wheel.now + 10 ** 6, print)
+        wheel.cancel(timer)
+        self.assertEqual(wheel.advance_to(10 ** 16), 0)
+        self.assertEqual(wheel.now, 10 ** 16)
+        self.assertIsNone(wheel.next_tick())
+
+    def test_callbacks(self):
+        # Callbacks inserting timers which are due in the same advance_to,
+        # and cancelling others.
+        wheel = TimerWheel(u = 16)
+        log = list()
+        later = wheel.insert(100, log.append, 'cancelled')
+
+        def chain(k):
+            log.append(k)
+            if k < 5:
+                wheel.insert(wheel.now + 7, chain, k + 1)
+            else:
+                wheel.cancel(later)
+
+        wheel.insert(3, chain, 0)
+        self.assertEqual(wheel.advance_to(30), 4)
+        self.assertEqual(log, [0, 1, 2, 3])
+        self.assertEqual(wheel.next_tick(), 31)
+        self.assertEqual(wheel.advance_to(40), 2)
+        self.assertEqual(log, [0, 1, 2, 3, 4, 5])
+        self.assertFalse(later.pending())
+        self.assertEqual(len(wheel), 0)
+
+if __name__ == '__main__':
+    unittest.main()
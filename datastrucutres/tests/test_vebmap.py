@@ -0,0 +1,117 @@
+'''
+
+    Tests for the VEBMap, against a plain dict and a sorted list of its keys,
+    including queries from outside the universe.
+
+    Run from the top of the repository with python -m pytest.
+
+'''
+
+from bisect import bisect_left, bisect_right
+import random
+import unittest
+
+from datastrucutres.item import Item
+from datastrucutres.vebmap import VEBMap
+
+class TestVEBMap(unittest.TestCase):
+
+    def check_queries(self, m, model, rnd):
+        u = m.tree.u
+        keys = sorted(model)
+        self.assertEqual(len(m), len(model))
+        self.assertEqual(list(m), keys)
+        self.assertEqual(list(m.items()), [(k, model[k]) for k in keys])
+        self.assertEqual(m.first(), (keys[0], model[keys[0]]) if keys else None)
+        self.assertEqual(m.last(), (keys[-1], model[keys[-1]]) if keys else None)
+        for x in [rnd.randrange(-5, u + 5) for _ in range(30)] + [-1, 0, u - 1, u, 10 * u]:
+            i = bisect_right(keys, x)
+            self.assertEqual(m.floor(x), (keys[i - 1], model[keys[i - 1]]) if i else None)
+            i = bisect_left(keys, x)
+            self.assertEqual(m.ceiling(x), (keys[i], model[keys[i]]) if i < len(keys) else None)
+            self.assertEqual(m.rank(x), i)
+            self.assertEqual(x in m, x in model)
+            self.assertEqual(m.get(x, 'none'), model.get(x, 'none'))
+        for _ in range(5):
+            lo = rnd.randrange(-5, u + 5)
+            hi = rnd.randrange(lo, u + 10)
+            expected = keys[bisect_left(keys, lo):bisect_left(keys, hi)]
+            self.assertEqual(list(m.keys(lo, hi)), expected)
+            self.assertEqual(list(m.items(lo, hi)), [(k, model[k]) for k in expected])
+        lo = rnd.randrange(u)
+        self.assertEqual(list(m.keys(lo)), keys[bisect_left(keys, lo):])
+
+    def test_against_model(self):
+        rnd = random.Random(1)
+        for u, sparse in ((16, False), (1024, False), (2 ** 32, True)):
+            m = VEBMap(u, sparse)
+            model = dict()
+            for step in range(1500):
+                op = rnd.random()
+                if model and rnd.random() < 0.3:
+                    key = rnd.choice(list(model))
+                else:
+                    key = rnd.randrange(u)
+                if op < 0.5:
+                    m[key] = step
+                    model[key] = step
+                elif op < 0.7:
+                    if key in model:
+                        self.assertEqual(m.pop(key), model.pop(key))
+                    else:
+                        self.assertRaises(KeyError, m.pop, key)
+                        self.assertEqual(m.pop(key, 'missing'), 'missing')
+                elif op < 0.8:
+                    if key in model:
+                        del m[key]
+                        del model[key]
+                    else:
+                        self.assertRaises(KeyError, m.__delitem__, key)
+                elif op < 0.82:
+                    self.check_queries(m, model, rnd)
+            self.check_queries(m, model, rnd)
+            for bad in (-1, u):
+                self.assertRaises(ValueError, m.set, bad, 'x')
+            self.assertEqual(len(m), len(model))
+
+    def test_multiset(self):
+        rnd = random.Random(2)
+        counts = VEBMap(64, sparse = True)
+        model = dict()
+        for _ in range(2000):
+            x = rnd.randrange(64)
+            k = rnd.randrange(1, 4)
+            if rnd.random() < 0.55:
+                counts.add(x, k)
+                model[x] = model.get(x, 0) + k
+            else:
+                taken = min(k, model.get(x, 0))
+                self.assertEqual(counts.discard(x, k), taken)
+                if taken:
+                    model[x] -= taken
+                    if not model[x]:
+                        del model[x]
+            self.assertEqual(counts.count(x), model.get(x, 0))
+            self.assertEqual(x in counts, x in model)
+        self.assertEqual(list(counts.items()), sorted(model.items()))
+        self.assertEqual(counts.discard(100), 0)
+
+    def test_from_items(self):
+        rnd = random.Random(3)
+        pairs = [(rnd.randrange(1024), rnd.random()) for _ in range(300)]
+        # Later values for a key replace earlier ones, in every form.
+        model = dict(pairs)
+        for items in (pairs, model, [Item(k, v) for k, v in pairs],
+                      iter(pairs), pairs[:150] + [Item(k, v) for k, v in pairs[150:]]):
+            m = VEBMap.from_items(items, 1024)
+            self.check_queries(m, model, rnd)
+            m[rnd.randrange(1024)] = 'new'
+        self.assertEqual(len(VEBMap.from_items([], 16)), 0)
+        self.assertRaises(ValueError, VEBMap.from_items, [(16, 'x')], 16)
+        self.assertRaises(ValueError, VEBMap.from_items, {-1: 'x'}, 16)
+        m = VEBMap.from_items({2 ** 40: 'x', 3: 'y'}, 2 ** 64, sparse = True)
+        self.assertEqual(m.floor(2 ** 50), (2 ** 40, 'x'))
+        self.assertEqual(m.ceiling(4), (2 ** 40, 'x'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,285 @@
+'''
+
+    Tests for the VEBTree.
+
+    Each test does a random mix of operations on trees of a few sizes, both
+    dense and sparse, checking the tree against a plain Python set as it goes
+    and checking the invariants of every node (see `check`) at the end.
+
+    Run from the top of the repository with python -m pytest.
+
+'''
+
+from array import array
+from bisect import bisect_left
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from datastrucutres.vebtree import VEBTree, MappedVEBTree, LEAF_SIZE, numpy
+
+# Universes from a single leaf up to a few levels, including ones which
+# aren't perfect squares.
+UNIVERSES = [16, LEAF_SIZE, 2 ** 10, 2 ** 13, 2 ** 20]
+
+def check(tree):
+    '''Check the invariants of tree and every node under it, returning its
+    keys in ascending order:
+
+    * n is the number of keys, and min and max are the smallest and largest
+      (or None if it's empty).
+    * The min of a node above the leaves isn't in any cluster, and every
+      other key is in the cluster for its high bits.
+    * The summary holds the clusters which aren't empty.
+    * A sparse tree has no empty clusters, and no summary if they all are.
+    '''
+    if tree.u <= LEAF_SIZE:
+        keys = [i for i in range(tree.u) if (tree.bits >> i) & 1]
+    elif tree.min is None:
+        keys = []
+        if tree.sparse:
+            assert not tree.cluster and tree.summary is None
+        else:
+            assert all(c.min is None for c in tree.cluster)
+            assert check(tree.summary) == []
+    else:
+        keys = [tree.min]
+        highs = []
+        for h, c in tree.clusters():
+            lows = check(c)
+            assert c.u == tree.lower_ru
+            if lows:
+                highs.append(h)
+                keys.extend((h << tree.shift) | low for low in lows)
+            else:
+                assert not tree.sparse, 'sparse tree kept an empty cluster'
+        assert all(tree.min < x for x in keys[1:]), 'min is also in a cluster'
+        if tree.sparse and not highs:
+            assert tree.summary is None, 'sparse tree kept an empty summary'
+        else:
+            assert check(tree.summary) == highs
+    assert tree.n == len(keys)
+    assert tree.min == (keys[0] if keys else None)
+    assert tree.max == (keys[-1] if keys else None)
+    return keys
+
+def random_keys(rnd, u, n):
+    '''Return a sorted list of n distinct random keys in range(u), bunched
+    together some of the time so that whole clusters fill up and empty.
+    '''
+    if rnd.random() < 0.5:
+        lo = rnd.randrange(u)
+        return sorted(rnd.sample(range(lo, min(u, lo + 4 * n + 1)), min(n, u - lo)))
+    return sorted(rnd.sample(range(u), min(n, u)))
+
+class TestDelete(unittest.TestCase):
+
+    def test_delete(self):
+        rnd = random.Random(1)
+        for u in UNIVERSES:
+            for sparse in (False, True):
+                tree = VEBTree(u, sparse)
+                keys = set()
+                for _ in range(3000):
+                    x = rnd.randrange(u) if rnd.random() < 0.3 or not keys \
+                        else rnd.choice([min(keys), max(keys), rnd.choice(list(keys))])
+                    if rnd.random() < 0.55:
+                        self.assertEqual(tree.insert(x), x not in keys)
+                        keys.add(x)
+                    else:
+                        self.assertEqual(tree.delete(x), x in keys)
+                        keys.discard(x)
+                    self.assertEqual(len(tree), len(keys))
+                    self.assertEqual(tree.minimum(), min(keys) if keys else None)
+                self.assertEqual(check(tree), sorted(keys))
+
+    def test_delete_min_promotion(self):
+        # Deleting the min of each node in turn has to pull the next key up
+        # out of the clusters every time.
+        for u in UNIVERSES:
+            for sparse in (False, True):
+                keys = random_keys(random.Random(u), u, 200)
+                tree = VEBTree.from_sorted(keys, u, sparse)
+                for i, x in enumerate(keys):
+                    self.assertTrue(tree.delete(tree.minimum()))
+                    self.assertEqual(tree.minimum(), keys[i + 1] if i + 1 < len(keys) else None)
+                    self.assertEqual(tree.maximum(), keys[-1] if i + 1 < len(keys) else None)
+                self.assertEqual(check(tree), [])
+
+    def test_delete_all_frees_sparse_tree(self):
+        rnd = random.Random(2)
+        for u in UNIVERSES[2:]:
+            keys = random_keys(rnd, u, 300)
+            tree = VEBTree(u, sparse = True)
+            for x in keys:
+                tree.insert(x)
+            rnd.shuffle(keys)
+            for x in keys:
+                tree.delete(x)
+            self.assertEqual(check(tree), [])
+            self.assertEqual(tree.cluster, {})
+            self.assertIsNone(tree.summary)
+
+    def test_delete_many(self):
+        rnd = random.Random(3)
+        for u in UNIVERSES:
+            for sparse in (False, True):
+                for _ in range(20):
+                    keys = random_keys(rnd, u, rnd.randrange(1, 400))
+                    tree = VEBTree.from_sorted(keys, u, sparse)
+                    doomed = random_keys(rnd, u, rnd.randrange(0, 400))
+                    doomed += rnd.sample(keys, rnd.randrange(len(keys) + 1))
+                    if rnd.random() < 0.5:
+                        doomed.sort()
+                    else:
+                        rnd.shuffle(doomed)
+                    left = set(keys).difference(doomed)
+                    self.assertEqual(tree.delete_many(doomed), len(keys) - len(left))
+                    self.assertEqual(check(tree), sorted(left))
+
+    def test_delete_many_everything(self):
+        for u in UNIVERSES:
+            keys = random_keys(random.Random(4), u, 500)
+            tree = VEBTree.from_sorted(keys, u, sparse = True)
+            self.assertEqual(tree.delete_many(keys), len(keys))
+            self.assertEqual(check(tree), [])
+            if u > LEAF_SIZE:
+                self.assertIsNone(tree.summary)
+
+class TestCounts(unittest.TestCase):
+
+    def test_ordered_queries(self):
+        rnd = random.Random(5)
+        for u in UNIVERSES:
+            for sparse in (False, True):
+                keys = set(random_keys(rnd, u, 300))
+                tree = VEBTree.from_sorted(sorted(keys), u, sparse)
+                for _ in range(200):
+                    if rnd.random() < 0.5:
+                        x = rnd.randrange(u)
+                        tree.insert(x)
+                        keys.add(x)
+                    else:
+                        doomed = rnd.sample(sorted(keys), min(len(keys), rnd.randrange(5)))
+                        tree.delete_many(doomed)
+                        keys.difference_update(doomed)
+                    ordered = sorted(keys)
+                    lo = rnd.randrange(-2, u + 2)
+                    hi = rnd.randrange(-2, u + 2)
+                    inside = [x for x in ordered if lo <= x < hi]
+                    self.assertEqual(list(tree.iter_range(lo, hi)), inside)
+                    self.assertEqual(tree.count_range(lo, hi), len(inside))
+                    self.assertEqual(tree.rank(lo), sum(1 for x in ordered if x < lo))
+                    if ordered:
+                        i = rnd.randrange(len(ordered))
+                        self.assertEqual(tree.select(i), ordered[i])
+                self.assertEqual(list(tree), check(tree))
+                self.assertEqual(len(tree), len(keys))
+                self.assertRaises(IndexError, tree.select, len(keys))
+
+    def test_sublinear(self):
+        # rank, select and count_range on a big sparse tree should only look
+        # at a few entries of the Fenwick trees per level, not walk along the
+        # clusters, so count every lookup in them.
+        rnd = random.Random(6)
+        u = 2 ** 32
+        keys = sorted(rnd.sample(range(u), 50000))
+        tree = VEBTree.from_sorted(keys, u, sparse = True)
+        lookups = [0]
+        class Counted(dict):
+            def get(self, *args):
+                lookups[0] += 1
+                return dict.get(self, *args)
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if node.u > LEAF_SIZE:
+                node.counts = Counted(node.counts)
+                if node.summary is not None:
+                    stack.append(node.summary)
+                stack.extend(c for h, c in node.clusters())
+        walk = VEBTree.iter_range
+        VEBTree.iter_range = None
+        try:
+            for _ in range(200):
+                x = rnd.randrange(u)
+                i = rnd.randrange(len(keys))
+                lookups[0] = 0
+                self.assertEqual(tree.rank(x), bisect_left(keys, x))
+                self.assertEqual(tree.select(i), keys[i])
+                self.assertEqual(tree.count_range(x, x + 2 ** 20),
+                                 bisect_left(keys, x + 2 ** 20) - bisect_left(keys, x))
+                # Four walks down, each with at most 2lg(upper_ru) lookups
+                # per level, against thousands of populated clusters.
+                self.assertLess(lookups[0], 4 * 2 * 32)
+        finally:
+            VEBTree.iter_range = walk
+
+class TestFromSorted(unittest.TestCase):
+
+    def test_same_as_inserting(self):
+        rnd = random.Random(6)
+        for u in UNIVERSES:
+            for sparse in (False, True):
+                for n in (0, 1, 2, 50, 1000):
+                    keys = random_keys(rnd, u, n)
+                    tree = VEBTree.from_sorted(keys, u, sparse)
+                    self.assertEqual(check(tree), keys)
+                    for x in keys[:20]:
+                        self.assertFalse(tree.insert(x))
+                    x = rnd.randrange(u)
+                    self.assertEqual(tree.insert(x), x not in keys)
+                    self.assertEqual(check(tree), sorted(set(keys) | {x}))
+
+    def test_duplicates_and_inputs(self):
+        keys = [0, 0, 3, 3, 3, 64, 65, 65, 1000, 1023, 1023]
+        expected = sorted(set(keys))
+        for source in (keys, iter(keys), tuple(keys), array('q', keys), array('Q', keys)):
+            self.assertEqual(check(VEBTree.from_sorted(source, 1024)), expected)
+        if numpy is not None:
+            self.assertEqual(check(VEBTree.from_sorted(numpy.array(keys), 1024)), expected)
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        rnd = random.Random(7)
+        path = os.path.join(self.directory, 'tree.veb')
+        for u in UNIVERSES + [2 ** 32]:
+            for sparse in (False, True):
+                if u > 2 ** 20 and not sparse:
+                    continue
+                for n in (0, 1, 300):
+                    keys = random_keys(rnd, u, n)
+                    tree = VEBTree.from_sorted(keys, u, sparse)
+                    tree.save(path)
+                    loaded = VEBTree.load(path, mmap = False)
+                    self.assertIsInstance(loaded, VEBTree)
+                    self.assertEqual((loaded.u, loaded.sparse), (u, sparse))
+                    self.assertEqual(check(loaded), keys)
+                    with VEBTree.load(path) as mapped:
+                        self.assertIsInstance(mapped, MappedVEBTree)
+                        self.assertEqual(list(mapped), keys)
+                        self.assertEqual(len(mapped), len(keys))
+                        for x in [rnd.randrange(u) for _ in range(100)] + keys[:20] + [0, u - 1]:
+                            self.assertEqual(mapped.member(x), tree.member(x))
+                            self.assertEqual(mapped.successor(x), tree.successor(x))
+                            self.assertEqual(mapped.predecessor(x), tree.predecessor(x))
+                            self.assertEqual(mapped.rank(x), tree.rank(x))
+
+    def test_bad_file(self):
+        path = os.path.join(self.directory, 'bad.veb')
+        with open(path, 'wb') as f:
+            f.write(b'not a snapshot at all, just some bytes')
+        self.assertRaises(ValueError, VEBTree.load, path)
+        self.assertRaises(ValueError, VEBTree.load, path, mmap = False)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+'''
+
+    Tests for the batch queries of the VEBTree and MappedVEBTree
+    (member_many, successor_many and predecessor_many), which need NumPy.
+
+    Each batch answer is checked against the scalar query for the same key,
+    and against bisecting a sorted list for keys outside the universe, which
+    the scalar queries don't take. Batches both smaller and larger than
+    SMALL_BATCH are used, so that the key by key path and the level at a time
+    descent are both run.
+
+    Run from the top of the repository with python -m pytest.
+
+'''
+
+from bisect import bisect_left, bisect_right
+import os
+import random
+
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+from datastrucutres.vebtree import VEBTree, LEAF_SIZE, NONE, SMALL_BATCH
+
+# A tree which is just a leaf, then ones a few levels deep.
+UNIVERSES = [LEAF_SIZE, 2 ** 10, 2 ** 16, 2 ** 33]
+
+def model(keys, x):
+    '''Return the (member, successor, predecessor) answers for x, with NONE
+    for None, from the sorted list keys.
+    '''
+    i = bisect_left(keys, x)
+    j = bisect_right(keys, x)
+    return (i < len(keys) and keys[i] == x,
+            keys[j] if j < len(keys) else NONE,
+            keys[i - 1] if i > 0 else NONE)
+
+def queries(rnd, u, keys, k):
+    '''Return k keys to ask about: mostly random, some in the tree and next
+    to ones in the tree, and a few just outside the universe.
+    '''
+    result = [rnd.randrange(u) for _ in range(k // 2)]
+    for x in rnd.sample(keys, min(len(keys), k // 4)):
+        result.append(min(u - 1, max(0, x + rnd.choice((-1, 0, 1)))))
+    result += [-5, -1, 0, u - 1, u, u + 7]
+    return result
+
+def trees(rnd):
+    '''Generate (sorted keys, tree) pairs for dense, sparse and mapped trees,
+    some of them empty or with a single key.
+    '''
+    for u in UNIVERSES:
+        for n in (0, 1, 40, 3000):
+            if n > u:
+                continue
+            if rnd.random() < 0.5:
+                lo = rnd.randrange(u - n + 1)
+                keys = sorted(rnd.sample(range(lo, min(u, lo + 3 * n + 1)), n))
+            else:
+                keys = sorted(set(rnd.randrange(u) for _ in range(n)))
+            for sparse in ((False, True) if u <= 2 ** 16 else (True,)):
+                tree = VEBTree(u, sparse)
+                for x in keys:
+                    tree.insert(x)
+                # Delete some, so the tree isn't just as from_sorted left it.
+                for x in rnd.sample(keys, len(keys) // 5):
+                    tree.delete(x)
+                yield sorted(tree), tree
+
+def test_batch_queries(tmp_path):
+    rnd = random.Random(1)
+    path = os.path.join(str(tmp_path), 'tree.veb')
+    for keys, tree in trees(rnd):
+        tree.save(path)
+        with VEBTree.load(path) as mapped:
+            for k in (SMALL_BATCH // 2, 4 * SMALL_BATCH, 5000):
+                x = queries(rnd, tree.u, keys, k)
+                batch = numpy.array(x, dtype = numpy.int64)
+                for t in (tree, mapped):
+                    member = t.member_many(batch)
+                    successor = t.successor_many(batch)
+                    predecessor = t.predecessor_many(batch)
+                    assert member.dtype == bool and successor.dtype == numpy.int64
+                    for i, y in enumerate(x):
+                        answers = (bool(member[i]), int(successor[i]), int(predecessor[i]))
+                        assert answers == model(keys, y), (t, y)
+                        if 0 <= y < tree.u:
+                            assert answers[0] == tree.member(y)
+                            assert answers[1] == (NONE if tree.successor(y) is None
+                                                  else tree.successor(y))
+                            assert answers[2] == (NONE if tree.predecessor(y) is None
+                                                  else tree.predecessor(y))
+
+def test_batch_inputs():
+    tree = VEBTree.from_sorted([3, 9, 200], 1024)
+    # Lists and other integer dtypes are taken too, and the shape flattened.
+    assert tree.member_many([3, 4, 200]).tolist() == [True, False, True]
+    assert tree.successor_many(numpy.array([[0, 9], [200, 5]], dtype = numpy.int32)).tolist() \
+        == [3, 200, NONE, 9]
+    assert tree.predecessor_many(numpy.arange(0, 1024, 100)).tolist() \
+        == [NONE, 9, 9, 200, 200, 200, 200, 200, 200, 200, 200]
+    assert tree.member_many([]).tolist() == []
@@ -0,0 +1,213 @@
+'''
+
+    A timer wheel: timers due at integer ticks, on top of a vEB tree.
+
+    Timers due at the same tick share a bucket, and the ticks which have a
+    bucket are kept in a VEBTree, so the next tick with anything due is a
+    successor query, O(lglgu), however many timers are waiting. Cancelling a
+    timer just takes it out of its bucket (and the tick out of the tree if the
+    bucket is now empty), so unlike with a heap nothing cancelled hangs about
+    until it would have been due.
+
+    The tree has a fixed universe of u ticks, which is used as a window
+    sliding along with the current time, `now`: tick t lives in slot t mod u,
+    which is fine as long as every tick in the wheel is in [now, now + u).
+    Looking for the next slot from now mod u and wrapping around to the
+    minimum at the end of the tree then finds the ticks in order. Timers due
+    further in the future than that wait in an overflow heap until the window
+    reaches them.
+
+'''
+
+import heapq
+
+try:
+    from .vebtree import VEBTree
+except ImportError:
+    # Being run as a script from this directory, e.g. for the examples below.
+    from vebtree import VEBTree
+
+class Timer(object):
+    '''A timer, which calls callback(*args) at `tick`.
+
+    `slot` is the slot of the wheel it is in, or None if it is in the
+    overflow heap, and `callback` is set to None once it has fired or been
+    cancelled.
+    '''
+    __slots__ = ('tick', 'callback', 'args', 'slot')
+
+    def __init__(self, tick, callback, args):
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.slot = None
+
+    def __str__(self):
+        return '<Timer: tick={!s}, callback={!r}>'.format(self.tick, self.callback)
+
+    def pending(self):
+        '''Return True if the timer has neither fired nor been cancelled.
+        '''
+        return self.callback is not None
+
+class TimerWheel(object):
+    '''A collection of timers, fired by advance_to, with a window of u ticks
+    (a power of 2) kept in a VEBTree, which is sparse unless told otherwise.
+    '''
+    def __init__(self, u = 2 ** 20, now = 0, sparse = True):
+        self.u = u
+        self.mask = u - 1
+        self.now = now
+        self.ticks = VEBTree(u, sparse) # The slots with a bucket.
+        self.buckets = dict() # Slot to a dict with its timers as keys.
+        self.overflow = list() # Heap of (tick, count, timer) for later.
+        self.count = 0 # Breaks ties in the overflow heap.
+        self.n = 0
+
+    def __len__(self):
+        '''Return the number of timers waiting to fire.
+        '''
+        return self.n
+
+    def insert(self, tick, callback, *args):
+        '''Add a timer calling callback(*args) at `tick`, and return it.
+
+        A tick which has already passed fires on the next advance_to.
+        '''
+        timer = Timer(tick, callback, args)
+        self.n += 1
+        now = self.now
+        if tick < now + self.u:
+            # _add, inlined as this is by far the commonest case.
+            slot = (tick if tick > now else now) & self.mask
+            bucket = self.buckets.get(slot)
+            if bucket is None:
+                bucket = self.buckets[slot] = dict()
+                self.ticks.insert(slot)
+            bucket[timer] = None
+            timer.slot = slot
+        else:
+            heapq.heappush(self.overflow, (tick, self.count, timer))
+            self.count += 1
+        return timer
+
+    def _add(self, timer):
+        '''Put timer into the bucket for its tick (or now, if it's passed).
+        '''
+        now = self.now
+        slot = (timer.tick if timer.tick > now else now) & self.mask
+        bucket = self.buckets.get(slot)
+        if bucket is None:
+            bucket = self.buckets[slot] = dict()
+            self.ticks.insert(slot)
+        bucket[timer] = None
+        timer.slot = slot
+
+    def cancel(self, timer):
+        '''Stop timer from firing. Returns True if it was still waiting to.
+        '''
+        if timer.callback is None:
+            return False
+        timer.callback = None
+        self.n -= 1
+        if timer.slot is not None:
+            bucket = self.buckets[timer.slot]
+            del bucket[timer]
+            if not bucket:
+                del self.buckets[timer.slot]
+                self.ticks.delete(timer.slot)
+            timer.slot = None
+        # Otherwise it's in the overflow heap, and is dropped when it comes to
+        # the top.
+        return True
+
+    def _next_slot(self):
+        '''Return the next slot with a bucket, going round from now, or None.
+        '''
+        start = self.now & self.mask
+        if self.ticks.member(start):
+            return start
+        slot = self.ticks.successor(start)
+        if slot is None:
+            slot = self.ticks.minimum()
+        return slot
+
+    def next_tick(self):
+        '''Return the earliest tick any timer is due at, or None if there
+        aren't any.
+        '''
+        slot = self._next_slot()
+        if slot is not None:
+            return self.now + ((slot - self.now) & self.mask)
+        while self.overflow and self.overflow[0][2].callback is None:
+            heapq.heappop(self.overflow)
+        return self.overflow[0][0] if self.overflow else None
+
+    def advance_to(self, now):
+        '''Move the time on to `now`, firing every timer due at or before it,
+        in order of tick. Returns the number of timers fired.
+
+        Each bucket is fired in one go, and the tree is only asked for the
+        next slot once per bucket. A callback may insert or cancel timers,
+        and any it inserts which are due by `now` fire too. Time never goes
+        backwards, so if `now` has already passed this does nothing.
+        '''
+        if now < self.now:
+            return 0
+        fired = 0
+        while True:
+            # Fire what's in the wheel, up to the end of its window.
+            limit = min(now, self.now + self.u - 1)
+            while True:
+                slot = self._next_slot()
+                if slot is None:
+                    break
+                tick = self.now + ((slot - self.now) & self.mask)
+                if tick > limit:
+                    break
+                self.now = tick
+                bucket = self.buckets.pop(slot)
+                self.ticks.delete(slot)
+                for timer in bucket:
+                    callback = timer.callback
+                    timer.callback = None
+                    timer.slot = None
+                    self.n -= 1
+                    fired += 1
+                    callback(*timer.args)
+            if not self.buckets and not self.overflow:
+                # Nothing left anywhere, so there's no window to slide.
+                self.now = now
+                return fired
+            # Slide the window on, skipping straight to the next overflow
+            # timer if the wheel is empty, and bring in what is now inside it.
+            self.now = limit
+            if limit < now and not self.buckets and self.overflow:
+                self.now = max(limit, min(now, self.overflow[0][0]))
+            self._refill()
+            if limit >= now:
+                return fired
+
+    def _refill(self):
+        '''Move the timers in the overflow heap which are now inside the
+        window into the wheel.
+        '''
+        end = self.now + self.u
+        overflow = self.overflow
+        while overflow and overflow[0][0] < end:
+            timer = heapq.heappop(overflow)[2]
+            if timer.callback is not None:
+                self._add(timer)
+
+if __name__ == '__main__':
+    '''Some basic usage examples:
+    '''
+    wheel = TimerWheel(u = 16)
+    fired = list()
+    for tick in [3, 1, 7, 3, 40, 12]:
+        wheel.insert(tick, fired.append, tick)
+    dropped = wheel.insert(5, fired.append, 'cancelled')
+    wheel.cancel(dropped)
+    print(wheel.next_tick(), len(wheel))
+    print(wheel.advance_to(5), fired)
+    print(wheel.advance_to(100), fired)
@@ -0,0 +1,210 @@
+'''
+
+    An ordered map from integer keys to values, on top of a vEB tree.
+
+    A VEBTree only holds bare keys, each at most once. A VEBMap pairs one
+    with a plain dict from each key to its value: the tree answers the
+    ordered questions (floor, ceiling, iterating in order, rank) in O(lglgu),
+    and the dict does the lookups by key in O(1). Unlike with a sorted list
+    plus a dict, inserting and deleting keys doesn't shift anything along.
+
+    Nothing is made per key beyond the dict entry and the bit in the tree, so
+    there are no Item objects: lookups hand back (key, value) pairs, and Items
+    (see item.py) are only read, as (key, payload), when building a map with
+    from_items.
+
+    A VEBMap can also be a multiset, by using the values as counts: add and
+    discard change the count of a key, dropping it when that reaches 0.
+
+'''
+
+try:
+    from .item import Item
+    from .vebtree import VEBTree
+except ImportError:
+    # Being run as a script from this directory, e.g. for the examples below.
+    from item import Item
+    from vebtree import VEBTree
+
+class VEBMap(object):
+    '''A map from the integers 0 <= key < u (a power of 2) to values, kept
+    in key order. The vEB tree is sparse if `sparse` is True, see vebtree.py.
+
+    NB: Setting a key outside of the universe raises a ValueError.
+    '''
+    def __init__(self, u, sparse = False):
+        self.tree = VEBTree(u, sparse)
+        self.values = dict()
+
+    @classmethod
+    def from_items(cls, items, u, sparse = False):
+        '''Build a map from `items`, which can be a mapping, or an iterable of
+        (key, value) pairs or of Items (each giving key and payload). Later
+        values for the same key replace earlier ones.
+
+        The tree is built in one go with VEBTree.from_sorted, which is much
+        quicker than setting the keys one at a time.
+        '''
+        if hasattr(items, 'items'):
+            items = items.items()
+        values = dict()
+        for item in items:
+            if isinstance(item, Item):
+                values[item.key] = item.payload
+            else:
+                key, value = item
+                values[key] = value
+        keys = sorted(values)
+        if keys and not (0 <= keys[0] and keys[-1] < u):
+            raise ValueError("keys must be in range(" + repr(u) + ")")
+        result = cls(u, sparse)
+        result.tree = VEBTree.from_sorted(keys, u, sparse)
+        result.values = values
+        return result
+
+    def __str__(self):
+        return '<VEBMap: u={!s}, n={!s}>'.format(self.tree.u, len(self.values))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def __iter__(self):
+        '''Iterate over the keys in ascending order.
+        '''
+        return iter(self.tree)
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        del self.values[key]
+        self.tree.delete(key)
+
+    def get(self, key, default = None):
+        '''Return the value of key, or default if it isn't in the map.
+        '''
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        '''Set the value of key, adding it to the map if it isn't there.
+        '''
+        values = self.values
+        if key not in values:
+            if not 0 <= key < self.tree.u:
+                raise ValueError("key out of range: " + repr(key))
+            self.tree.insert(key)
+        values[key] = value
+
+    def pop(self, key, *default):
+        '''Remove key and return its value. If it isn't in the map return
+        default if given, otherwise raise a KeyError, as for dict.pop.
+        '''
+        if key not in self.values:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        self.tree.delete(key)
+        return self.values.pop(key)
+
+    def floor(self, x):
+        '''Return the (key, value) pair with the largest key <= x, or None if
+        there isn't one.
+        '''
+        if x in self.values:
+            return x, self.values[x]
+        if x < 0:
+            return None
+        if x >= self.tree.u:
+            return self.last()
+        key = self.tree.predecessor(x)
+        return None if key is None else (key, self.values[key])
+
+    def ceiling(self, x):
+        '''Return the (key, value) pair with the smallest key >= x, or None if
+        there isn't one.
+        '''
+        if x in self.values:
+            return x, self.values[x]
+        if x >= self.tree.u:
+            return None
+        key = self.tree.successor(max(x, -1))
+        return None if key is None else (key, self.values[key])
+
+    def first(self):
+        '''Return the (key, value) pair with the smallest key, or None if the
+        map is empty.
+        '''
+        key = self.tree.minimum()
+        return None if key is None else (key, self.values[key])
+
+    def last(self):
+        '''Return the (key, value) pair with the largest key, or None if the
+        map is empty.
+        '''
+        key = self.tree.maximum()
+        return None if key is None else (key, self.values[key])
+
+    def keys(self, lo = 0, hi = None):
+        '''Generate the keys lo <= key < hi (by default all of them) in
+        ascending order.
+        '''
+        return self.tree.iter_range(lo, self.tree.u if hi is None else hi)
+
+    def items(self, lo = 0, hi = None):
+        '''Generate the (key, value) pairs with lo <= key < hi (by default all
+        of them) in ascending order of key.
+        '''
+        values = self.values
+        for key in self.keys(lo, hi):
+            yield key, values[key]
+
+    def rank(self, x):
+        '''Return the number of keys less than x.
+        '''
+        return self.tree.rank(x)
+
+    def count(self, key):
+        '''Return the count of key, when used as a multiset (0 if it isn't in
+        the map).
+        '''
+        return self.values.get(key, 0)
+
+    def add(self, key, count = 1):
+        '''Add count to the count of key, when used as a multiset.
+        '''
+        self.set(key, self.values.get(key, 0) + count)
+
+    def discard(self, key, count = 1):
+        '''Take up to count away from the count of key, when used as a
+        multiset, removing it from the map if that leaves nothing. Returns
+        how many were taken away.
+        '''
+        have = self.values.get(key, 0)
+        if have <= count:
+            if have:
+                del self[key]
+            return have
+        self.values[key] = have - count
+        return count
+
+if __name__ == '__main__':
+    '''Some basic usage examples:
+    '''
+    index = VEBMap(1024)
+    for key, value in [(500, 'e'), (3, 'a'), (77, 'c'), (12, 'b'), (120, 'd')]:
+        index[key] = value
+    print(index.floor(100), index.ceiling(100), index.floor(2), index.ceiling(900))
+    print(list(index.items(10, 200)), index.pop(77), index.rank(200))
+    print(list(VEBMap.from_items([Item(5, 'x'), (1, 'y')], 16).items()))
+
+    counts = VEBMap(64, sparse = True)
+    for x in [5, 9, 5, 40, 5, 9]:
+        counts.add(x)
+    counts.discard(9)
+    print(list(counts.items()), counts.count(5), counts.discard(5, 10), len(counts))
@@ -7,35 +7,286 @@
 	They work on the principle of being a 'recursive datastructure', where a vEB
 	tree with a total of u leaves will have sqrt(u) children of the root and
 	each of those children will have sqrt(sqrt(u)) children and so on until the
-	nodes have a universe size of 2.
+	nodes have a universe size of at most LEAF_SIZE. Those bottom nodes don't
+	recurse any further, they just keep their keys as the set bits of a single
+	integer (a machine word for LEAF_SIZE = 64) and answer queries with bit
+	tricks, which saves several levels of recursion and a lot of objects.
+
+	Any power of 2 can be used as the universe size. When u isn't a perfect
+	square the 'sqrt(u)'s are really CLRS's upper and lower square roots, i.e.
+	there are 2^ceil(lg(u)/2) clusters each holding 2^floor(lg(u)/2) keys.
+
+	Both kinds of tree can optionally be made 'sparse'. A sparse tree does not
+	build its summary and clusters up front, instead they are only created the
+	first time a key lands in them and the clusters are kept in a dict keyed by
+	the high bits. This brings the memory needed down from O(u) to
+	O(nlglgu), so very large universes (e.g. u = 2^32) become usable when only
+	a few keys will be stored.
 	
 	More details can be found in 'Introduction to Algorithms', Cormen et. al.
 	and that text has been a guide for me in writing this implementation.
 	
 '''
-import math;
+from array import array
+from bisect import bisect_left, bisect_right
+import io
+import mmap
+import struct
+import sys
+
+try:
+	import numpy
+except ImportError:
+	# Only needed for the batch queries (member_many etc.).
+	numpy = None
+
+# Stands in for None in the arrays returned by the batch queries.
+NONE = -1
+
+# Batches smaller than this are answered key by key, as for only a few keys
+# the NumPy overheads cost more than walking down the tree for each.
+SMALL_BATCH = 64
+
+# The start of a file written by VEBTree.save: the magic bytes, the format
+# version, whether the tree was sparse, lg(u), the shift giving the high bits
+# which the keys are grouped by, and n. Everything is little-endian.
+SNAPSHOT_HEADER = struct.Struct("<4sHHIIQ")
+SNAPSHOT_MAGIC = b"VEBT"
+SNAPSHOT_VERSION = 1
+
+def low_bits(u):
+	'''Returns the number of "low bits" of a key in universe size u, where u is
+	a power of 2. When lg(u) is odd the high bits get the extra bit, so there
+	are upper_sqrt(u) = 2^ceil(lg(u)/2) clusters, each of size lower_sqrt(u) =
+	2^floor(lg(u)/2), as in CLRS.
+	'''
+	return (u.bit_length() - 1) // 2
 
 def high(x, u):
 	'''Returns the value of the "high bits" of the value x, in universe size u.
 	'''
-	ru = math.floor(math.sqrt(u))
-	return math.floor(x / ru)
+	return x >> low_bits(u)
 
 def low(x, u):
 	'''Returns the value of the "low bits" of the value x, in universe size u.
 	'''
-	ru = math.floor(math.sqrt(u))
-	return x % ru
+	return x & ((1 << low_bits(u)) - 1)
 
 def index(x, y, u):
 	'''Returns the original index of an element from its high and low bits, in 
 	universe size u.
 	'''
-	ru = math.floor(math.sqrt(u))
-	return (x * ru) + y
+	return (x << low_bits(u)) | y
 
 # Note the identity x = index(high(x, u), low(x, u), u).
 
+# Nodes don't call these, they keep the shift and mask for their own u so that
+# splitting a key is just x >> self.shift and x & self.mask.
+
+# Nodes with a universe of this size or smaller are bitmap leaves.
+LEAF_SIZE = 64
+
+def lowest_bit(bits):
+	'''Returns the position of the lowest set bit of bits, which must not be 0.
+	'''
+	return (bits & -bits).bit_length() - 1
+
+def highest_bit(bits):
+	'''Returns the position of the highest set bit of bits, which must not be 0.
+	'''
+	return bits.bit_length() - 1
+
+def bits_above(bits, x):
+	'''Returns bits with all the bits at positions x and below cleared.
+	'''
+	return (bits >> (x + 1)) << (x + 1)
+
+def bits_below(bits, x):
+	'''Returns bits with all the bits at positions x and above cleared.
+	'''
+	return bits & ((1 << x) - 1)
+
+def popcount(bits):
+	'''Returns the number of set bits in bits.
+	'''
+	return bin(bits).count("1")
+
+def write_DOT(tree, fp, max_nodes = None, max_depth = None, skip_empty = False,
+		wrap = True, summary = False, glabel = None):
+	'''Write DOT describing tree, a VEBTree or ProtoVEBTree, to the file
+	object fp. The nodes are written one at a time as the tree is walked
+	(with a stack), so the whole thing is never held in memory.
+
+	At most max_nodes nodes are written, and nodes more than max_depth levels
+	below tree are left out. If skip_empty is True so are any summaries and
+	clusters with no keys in them. The edge to each node is written along
+	with it, so nothing points at a node which was left out.
+
+	If wrap is True the nodes are wrapped in a digraph, labelled with glabel
+	if given. If summary is True tree is drawn as a summary.
+	'''
+	if wrap:
+		fp.write("digraph g {\nnode [shape = record]\n")
+		if glabel:
+			fp.write("[labelloc = t, label = \"" + glabel + "\"]\n")
+	written = 0
+	# Each entry is (node, whether it's a summary, edge to it, depth).
+	stack = [(tree, summary, None, 0)]
+	while stack:
+		if max_nodes is not None and written >= max_nodes:
+			fp.write("// Stopped after " + str(written) + " nodes.\n")
+			break
+		node, is_summary, edge, depth = stack.pop()
+		if node.u > LEAF_SIZE:
+			clusters = node.clusters()
+			if skip_empty:
+				clusters = [(i, c) for i, c in clusters if c.minimum() is not None]
+		else:
+			clusters = list()
+		fp.write(node._DOT_record(is_summary, clusters))
+		if edge is not None:
+			fp.write(edge)
+		written += 1
+		if node.u > LEAF_SIZE and (max_depth is None or depth < max_depth):
+			name = "\"node" + str(node) + "\""
+			# Push the clusters first so the summary comes off first.
+			for i, c in reversed(clusters):
+				stack.append((c, False,
+						name + ":c" + str(i) + " -> \"node" + str(c) + "\";\n",
+						depth + 1))
+			below = node.summary
+			if below is not None and not (skip_empty and below.minimum() is None):
+				stack.append((below, True,
+						name + ":summary -> \"node" + str(below) + "\";\n",
+						depth + 1))
+	if wrap:
+		fp.write("}")
+
+def snapshot_header(data):
+	'''Returns (sparse, u, n, shift) from the header at the start of data, the
+	contents of a file written by VEBTree.save.
+
+	NB:	A ValueError is raised if it isn't one.
+	'''
+	if len(data) < SNAPSHOT_HEADER.size:
+		raise ValueError("not a vEB tree snapshot")
+	magic, version, sparse, lg_u, shift, n = SNAPSHOT_HEADER.unpack_from(data)
+	if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+		raise ValueError("not a vEB tree snapshot (or a different version)")
+	return bool(sparse), 1 << lg_u, n, shift
+
+def query_array(keys):
+	'''Returns keys as a 1-d int64 NumPy array for the batch queries.
+	'''
+	if numpy is None:
+		raise ImportError("NumPy is needed for the batch queries")
+	return numpy.asarray(keys, dtype = numpy.int64).reshape(-1)
+
+# The batch queries go down the tree a level at a time for the whole batch.
+# All the nodes at one level have the same u, and `nodes` is a list of the
+# ones reached while nid gives, for each key, its node's place in the list.
+
+def level_bounds(nodes):
+	'''Returns int64 arrays of the mins and maxes of nodes, NONE if empty.
+	'''
+	mins = [NONE if n.min is None else n.min for n in nodes]
+	maxs = [NONE if n.max is None else n.max for n in nodes]
+	return (numpy.array(mins, dtype = numpy.int64),
+			numpy.array(maxs, dtype = numpy.int64))
+
+def descend(nodes, nid, x):
+	'''Find the clusters which the keys x in nodes[nid] fall in. Returns
+	(clusters, cid, h): the list of the clusters (None where one doesn't
+	exist), each looked up once however many keys land in it, the place of
+	each key's cluster in that list, and the high bits of the keys.
+	'''
+	node = nodes[0]
+	h = x >> node.shift
+	pairs, cid = numpy.unique(nid * node.upper_ru + h, return_inverse = True)
+	clusters = [nodes[p // node.upper_ru].get_cluster(p % node.upper_ru)
+			for p in pairs.tolist()]
+	return clusters, cid.reshape(-1), h
+
+def keep(clusters, cid):
+	'''Returns the list of just the clusters which keys go on down into,
+	given the places cid of their clusters in clusters, and the keys' places
+	in the new list.
+	'''
+	used, nid = numpy.unique(cid, return_inverse = True)
+	return [clusters[i] for i in used.tolist()], nid.reshape(-1)
+
+def next_cluster_mins(nodes, nid, h):
+	'''For each node nodes[nid], return the min of its first cluster after h
+	with anything in it (which there must be), as a key of that node.
+
+	With only one node (e.g. the root) that's a batch successor query on its
+	summary, otherwise it's done cluster by cluster.
+	'''
+	if len(nodes) == 1 and len(h) >= SMALL_BATCH:
+		node = nodes[0]
+		succ = node.summary._successor_many(h)
+		mins = [node.cluster[c].min for c in succ.tolist()]
+		return (succ << node.shift) | numpy.array(mins, dtype = numpy.int64)
+	return numpy.array([nodes[i]._next_cluster_min(j)
+			for i, j in zip(nid.tolist(), h.tolist())], dtype = numpy.int64)
+
+def prev_cluster_maxes(nodes, nid, h):
+	'''For each node nodes[nid], return the max of its last cluster before h
+	with anything in it, as a key of that node, or else its min. See
+	next_cluster_mins.
+	'''
+	if len(nodes) == 1 and len(h) >= SMALL_BATCH and nodes[0].summary is not None:
+		node = nodes[0]
+		pred = node.summary._predecessor_many(h)
+		maxs = [node.min if c == NONE else node.cluster[c].max for c in pred.tolist()]
+		result = numpy.array(maxs, dtype = numpy.int64)
+		some = pred != NONE
+		result[some] |= pred[some] << node.shift
+		return result
+	return numpy.array([nodes[i]._prev_cluster_max(j)
+			for i, j in zip(nid.tolist(), h.tolist())], dtype = numpy.int64)
+
+def leaf_bits(nodes):
+	'''Returns the bits of each of the leaves nodes as a uint64 array.
+	'''
+	return numpy.array([n.bits for n in nodes], dtype = numpy.uint64)
+
+# The bit tricks above for uint64 arrays of leaf bits and int64 arrays of
+# positions within the leaves, to answer a whole level of leaves at once.
+
+def bit_set_many(bits, x):
+	'''Returns a bool array, True where bit x of bits is set.
+	'''
+	return ((bits >> x.astype(numpy.uint64)) & numpy.uint64(1)).astype(bool)
+
+def bits_above_many(bits, x):
+	'''Vectorized bits_above, for 0 <= x < LEAF_SIZE - 1.
+	'''
+	s = (x + 1).astype(numpy.uint64)
+	return (bits >> s) << s
+
+def bits_below_many(bits, x):
+	'''Vectorized bits_below, for 0 <= x < LEAF_SIZE.
+	'''
+	one = numpy.uint64(1)
+	return bits & ((one << x.astype(numpy.uint64)) - one)
+
+def highest_bit_many(bits):
+	'''Vectorized highest_bit, giving NONE where bits is 0.
+
+	The 32 bit halves are converted to floats separately, as those are exact,
+	and the exponent of a float is where its highest bit is.
+	'''
+	hi = (bits >> numpy.uint64(32)).astype(numpy.float64)
+	lo = (bits & numpy.uint64(0xFFFFFFFF)).astype(numpy.float64)
+	return numpy.where(hi > 0, numpy.frexp(hi)[1] + 31,
+			numpy.frexp(lo)[1] - 1).astype(numpy.int64)
+
+def lowest_bit_many(bits):
+	'''Vectorized lowest_bit, giving NONE where bits is 0.
+	'''
+	return highest_bit_many(bits & (~bits + numpy.uint64(1)))
+
 class ProtoVEBTree(object):
 	'''A proto vEB tree (node) which may be part of the cluster of another node.
 	
@@ -44,57 +295,95 @@ class ProtoVEBTree(object):
 	datastructure, but needs further optimisation. It's main purpose is to aid
 	in understanding vEB trees and the motivation for their features.
 	'''
-	def __init__(self, u):
+	def __init__(self, u, sparse = False):
 		'''Create an empty proto vEB tree with universe of size u and this being
 		the root node.
+
+		If sparse is True the summary and clusters are only created when a key
+		is first inserted into them (see the module docstring).
 		
-		NB:	Currently only values of u which are allowed are 2^(2^k) where k is
-		a positive integer. Use of any other value will result in undefined 
-		behaviour.
+		NB:	u must be a power of 2, a ValueError is raised otherwise.
 		'''
-		if u == 2:
-			# Base case.
-			self.u = 2
-			self.A = [False, False]
+		if u < 2 or u & (u - 1):
+			raise ValueError("u must be a power of 2, not " + repr(u))
+		self.sparse = sparse
+		if u <= LEAF_SIZE:
+			# Base case, bit i of A is set when i is present.
+			self.u = u
+			self.A = 0
 		else:
 			# General case.
 			self.u = u
-			self.ru = math.floor(math.sqrt(u))
-			self.summary = ProtoVEBTree(self.ru)
-			self.cluster = list()
-			for _ in range(self.ru):
-				self.cluster.append(ProtoVEBTree(self.ru))
+			# Split keys into high and low bits, see low_bits().
+			self.shift = low_bits(u)
+			self.mask = (1 << self.shift) - 1
+			self.upper_ru = u >> self.shift
+			self.lower_ru = 1 << self.shift
+			if sparse:
+				# Nothing is built until it is needed.
+				self.summary = None
+				self.cluster = dict()
+			else:
+				self.summary = ProtoVEBTree(self.upper_ru)
+				self.cluster = list()
+				for _ in range(self.upper_ru):
+					self.cluster.append(ProtoVEBTree(self.lower_ru))
 	
 	def __str__(self):
 		'''Return a unique string to identify this node.
 		'''
 		# Return the memory address.
-		return str(self)[33:-1]
+		return '{:x}'.format(id(self))
+
+	def get_cluster(self, i):
+		'''Return cluster i of this node, or None if it has not been created
+		yet (which can only happen when the tree is sparse).
+		'''
+		if self.sparse:
+			return self.cluster.get(i)
+		else:
+			return self.cluster[i]
 	
 	def insert(self, x):
 		'''Inserts an item x into the proto vEB tree.
 		'''
-		if self.u == 2:
-			self.A[x] = True
+		if self.u <= LEAF_SIZE:
+			self.A |= 1 << x
 		else:
-			self.cluster[high(x, self.u)].insert(low(x, self.u))
-			self.summary.insert(high(x, self.u))
+			h = x >> self.shift
+			if self.sparse:
+				# Create the cluster and summary the first time they are used.
+				if h not in self.cluster:
+					self.cluster[h] = ProtoVEBTree(self.lower_ru, True)
+				if self.summary is None:
+					self.summary = ProtoVEBTree(self.upper_ru, True)
+			self.cluster[h].insert(x & self.mask)
+			self.summary.insert(h)
 	
 	def delete(self, x):
 		'''Removes an element x from a proto vEB tree if it is present.
 		
 		True is returned if any parent of this node needs to update its summary.
 		'''
-		if self.u == 2:
-			self.A[x] = False
-			return not (self.A[0] or self.A[1])
-			# So return True in the case where now both items in this leaf
-			# are False.
-		elif self.cluster[high(x, self.u)].delete(low(x, self.u)):
+		if self.u <= LEAF_SIZE:
+			self.A &= ~(1 << x)
+			return self.A == 0
+			# So return True in the case where now all the bits in this leaf
+			# are clear.
+
+		h = x >> self.shift
+		c = self.get_cluster(h)
+		if c is None:
+			# Sparse and never populated, so x can't be here.
+			return False
+		elif c.delete(x & self.mask):
+			if self.sparse:
+				# The cluster is empty again so give the memory back.
+				del self.cluster[h]
 			# If a deletion from a child is saying this node's summary must be
 			# updated then forward the result to continue the "bubbling-up" of
 			# this change if necessary.
-			return self.summary.delete(high(x, self.u))
+			return self.summary.delete(h)
 		else:
 			return False
 	
@@ -102,70 +391,76 @@ class ProtoVEBTree(object):
 		'''Returns True if x is present in this proto vEB tree, or False
 		otherwise.
 		'''
-		if self.u == 2:
-			return self.A[x]
+		if self.u <= LEAF_SIZE:
+			return (self.A >> x) & 1 == 1
 		else:
-			return self.cluster[high(x, self.u)].member(low(x, self.u))
+			c = self.get_cluster(x >> self.shift)
+			return c is not None and c.member(x & self.mask)
 			
 	def minimum(self):
 		'''Return the value of the minimum item in this proto vEB tree, or None
 		if it is empty.
 		'''
-		if self.u == 2:
-			if self.A[0] == 1:
-				return 0
-			elif self.A[1] == 1:
-				return 1
-			else
+		if self.u <= LEAF_SIZE:
+			if self.A:
+				return lowest_bit(self.A)
+			else:
 				return None
+		elif self.summary is None:
+			return None
 		else:
 			min_cluster = self.summary.minimum()
 			if min_cluster != None:
 				offset = self.cluster[min_cluster].minimum()
-				return index(min_cluster, offset, self.u)
-			else
+				return (min_cluster << self.shift) | offset
+			else:
 				return None
 	
 	def maximum(self):
 		'''Return the value of the maximum item in this proto vEB tree, or None
 		if it is empty.
 		'''
-		if self.u == 2:
-			if self.A[1] == 1:
-				return 1
-			elif self.A[0] == 1:
-				return 0
-			else
+		if self.u <= LEAF_SIZE:
+			if self.A:
+				return highest_bit(self.A)
+			else:
 				return None
+		elif self.summary is None:
+			return None
 		else:
 			max_cluster = self.summary.maximum()
 			if max_cluster != None:
 				offset = self.cluster[max_cluster].maximum()
-				return index(max_cluster, offset, self.u)
-			else
+				return (max_cluster << self.shift) | offset
+			else:
 				return None
 		
 	def predecessor(self, x):
 		'''Returns the maximum value less than x in this proto vEB tree, or None
 		of no such value exists.
-		
-		TODO
 		'''
-		if u == 2:
-			if (x == 1) and (self.A[0] == 1):
-				return 0
+		if self.u <= LEAF_SIZE:
+			below = bits_below(self.A, x)
+			if below:
+				return highest_bit(below)
 			else:
 				return None
+		elif self.summary is None:
+			return None
 		else:
-			pred_in_cluster = self.cluster[high(x, self.u)].predecessor(low(x, self.u))
+			c = self.get_cluster(x >> self.shift)
+			if c is not None:
+				pred_in_cluster = c.predecessor(x & self.mask)
+			else:
+				pred_in_cluster = None
 			if pred_in_cluster != None:
-				return index(high(x, self.u), pred_in_cluster, self.u)
+				return (x & ~self.mask) | pred_in_cluster
 			else:
 				# In a different cluster
-				pred_cluster = self.summary.predecessor(high(x, self.u))
+				pred_cluster = self.summary.predecessor(x >> self.shift)
 				if pred_cluster != None:
 					offset = self.cluster[pred_cluster].maximum()
-					return index(pred_cluster, offset, self.u)
+					return (pred_cluster << self.shift) | offset
 				else:
 					return None
 		
@@ -173,11 +468,54 @@ class ProtoVEBTree(object):
 		'''Returns the minimum value greater than x in this proto vEB tree, or
 		None of no such value exists.
 		'''
-		pass
+		if self.u <= LEAF_SIZE:
+			above = bits_above(self.A, x)
+			if above:
+				return lowest_bit(above)
+			else:
+				return None
+		elif self.summary is None:
+			return None
+		else:
+			c = self.get_cluster(x >> self.shift)
+			if c is not None:
+				succ_in_cluster = c.successor(x & self.mask)
+			else:
+				succ_in_cluster = None
+			if succ_in_cluster != None:
+				return (x & ~self.mask) | succ_in_cluster
+			else:
+				# In a different cluster
+				succ_cluster = self.summary.successor(x >> self.shift)
+				if succ_cluster != None:
+					offset = self.cluster[succ_cluster].minimum()
+					return (succ_cluster << self.shift) | offset
+				else:
+					return None
 	
 	def to_DOT(self, wrap = False, summary = False, glabel = None):
 		'''Output a string in the DOT language which describes this proto vEB 
 		tree.
+
+		For sparse trees only the clusters which have been created are shown.
+
+		This is write_DOT into a string, with nothing left out.
+		'''
+		result = io.StringIO()
+		self.write_DOT(result, wrap = wrap, summary = summary, glabel = glabel)
+		return result.getvalue()
+
+	def write_DOT(self, fp, max_nodes = None, max_depth = None,
+			skip_empty = False, wrap = True, summary = False, glabel = None):
+		'''Write DOT describing this tree to the file object fp, a node at a
+		time. See the module function write_DOT.
+		'''
+		write_DOT(self, fp, max_nodes, max_depth, skip_empty, wrap, summary,
+				glabel)
+
+	def _DOT_record(self, summary, clusters):
+		'''Output the DOT record for just this node, with a port for each of
+		the (i, cluster) pairs in clusters.
 		'''
 		node = "node" + str(self)
 		# Write string for node record.		
@@ -185,86 +523,220 @@ class ProtoVEBTree(object):
 		if summary:
 			node_options += ", fillcolor = gray, style = filled"
 		
-		if self.u == 2:
+		if self.u <= LEAF_SIZE:
+			# Show the bits lowest first, so they read in key order.
 			label = "{ <u>" + str(self.u) + " " +\
-					"| <A0>" + str(int(self.A[0])) + " " +\
-					"| <A1>" + str(int(self.A[1])) + " }"
+					"| <A>" + format(self.A, "0" + str(self.u) + "b")[::-1] + " }"
 		else:
-			label = "<u>" + str(self.u) + " | <summary>summary | { cluster | { <c0>"
-			for i in range(1, len(self.cluster)):
-				label += " | <c" + str(i) + ">"
+			label = "<u>" + str(self.u) + " | <summary>summary | { cluster | { "
+			label += " | ".join("<c" + str(i) + ">" for i, _ in clusters)
 			label += " } }"
 		
-		record = node + "[" + node_options + ", label = \"" + label + "\"]\n"
-		
-		# Write string for any edges.
-		if self.u > 2:
-			edges = "\"" + node + "\":summary -> " +\
-					"\"node" + str(self.summary) + "\";\n"
-			for i in range(self.ru):
-				c = self.cluster[i];
-				edges += "\"" + node + "\":c" + str(i) + " -> " +\
-						 "\"node" + str(c) + "\";\n"
-			
-		# Final result.
-		if self.u == 2:
-			result = record
+		return node + "[" + node_options + ", label = \"" + label + "\"]\n"
+
+	def clusters(self):
+		'''Return a list of (i, cluster) pairs for the clusters of this node
+		which exist, in order of i.
+		'''
+		if self.sparse:
+			return sorted(self.cluster.items())
 		else:
-			result = record + edges
-			# Recurse into summary and cluster nodes.
-			result += self.summary.to_DOT(False, True);
-			for c in self.cluster:
-				result += c.to_DOT();
-		
-		# Perhaps wrap with the outer curly braces.
-		if wrap:
-			if glabel:
-				result = "[labelloc = t, label = \"" + glabel + "\"]\n" + result
-			result = "digraph g {\nnode [shape = record]\n" + result + "}"
-		
-		return result
+			return list(enumerate(self.cluster))
 
 class VEBTree(object):
 	'''A vEB tree (node) which may be part of the cluster of another node.
 	
 	A node stores u, the universe size of the node. summary, a pointer to 
 	another vEB tree which summarizes the contents of this node's cluster.
-	cluster, which is an array of sqrt(u) items which are pointers to child 
-	VEBTree's each with a universe size of sqrt(u). min, the value of the
+	cluster, which is an array of upper_ru items which are pointers to child 
+	VEBTree's each with a universe size of lower_ru. min, the value of the
 	smallest key in the tree (this does not also appear in clusters). max, the
-	value of the maximum item in the tree (also appears in clusters).
+	value of the maximum item in the tree (also appears in clusters). shift
+	and mask, which split a key x into the cluster number x >> shift and the
+	position within that cluster x & mask. n, the number of keys in the tree.
+	counts, a Fenwick tree (binary indexed tree) over the n's of the clusters,
+	which lets rank, select and count_range skip over whole runs of clusters
+	in O(lg(upper_ru)) rather than adding up the clusters one at a time.
+
+	When the tree is sparse, cluster is instead a dict from the high bits to
+	child VEBTree's, and both it and summary are filled in lazily. counts is
+	then a dict too, holding only its entries which aren't 0.
+
+	Leaf nodes (u <= LEAF_SIZE) have no summary or cluster, instead bits has
+	bit i set for every key i in the leaf. Unlike in other nodes, the min is
+	also included there.
+
+	stats is None unless the tree has been given a stats.OpStats with
+	set_stats(), to count how deep the member, successor and predecessor
+	queries go.
 	'''
-	def __init__(self, u):
+	stats = None
+
+	def __init__(self, u, sparse = False):
 		'''Create an empty vEB tree with universe of size u and this being the
 		root node.
+
+		If sparse is True the summary and clusters are only created when a key
+		is first inserted into them (see the module docstring).
 		
-		NB:	Currently only values of u which are allowed are 2^(2^k) where k is
-		a positive integer. Use of any other value will result in undefined 
-		behaviour.
+		NB:	u must be a power of 2, a ValueError is raised otherwise.
 		'''
+		if u < 2 or u & (u - 1):
+			raise ValueError("u must be a power of 2, not " + repr(u))
 		self.min = self.max = None
-		if(u == 2):
+		self.n = 0
+		self.sparse = sparse
+		if(u <= LEAF_SIZE):
 			# Base case.
-			self.u = 2
+			self.u = u
+			self.bits = 0
 		else:
 			self.u = u
-			self.ru = math.floor(math.sqrt(u))
-			self.summary = VEBTree(self.ru)
-			self.cluster = list()
-			for i in range(self.ru):
-				self.cluster.append(VEBTree(self.ru));
+			# Split keys into high and low bits, see low_bits().
+			self.shift = low_bits(u)
+			self.mask = (1 << self.shift) - 1
+			self.upper_ru = u >> self.shift
+			self.lower_ru = 1 << self.shift
+			if sparse:
+				# Nothing is built until it is needed.
+				self.summary = None
+				self.cluster = dict()
+				self.counts = dict()
+			else:
+				self.counts = [0] * (self.upper_ru + 1)
+				self.summary = VEBTree(self.upper_ru)
+				self.cluster = list()
+				for i in range(self.upper_ru):
+					self.cluster.append(VEBTree(self.lower_ru));
+
+	@classmethod
+	def from_sorted(cls, keys, u, sparse = False):
+		'''Build a vEB tree with universe of size u holding keys, which must be
+		in ascending order (duplicates are ignored).
+
+		This is much quicker than inserting the keys one at a time, as each
+		node is filled in directly in one pass over its slice of the keys. keys
+		can be any sequence, or an iterable which will be read into a list,
+		and anything supporting the buffer protocol (e.g. a NumPy array or an
+		array.array of integers) is read through a memoryview rather than
+		being copied.
+		'''
+		try:
+			keys = memoryview(keys)
+		except TypeError:
+			if not hasattr(keys, "__getitem__"):
+				keys = list(keys)
+		tree = cls(u, sparse)
+		if len(keys):
+			tree._fill(keys, 0, len(keys), 0)
+		return tree
+
+	def _fill(self, keys, lo, hi, base):
+		'''Fill this empty node with keys[lo:hi], which are all in the range
+		base to base + u - 1 and are stored relative to base.
+		'''
+		if self.u <= LEAF_SIZE:
+			# Base case.
+			bits = 0
+			for k in keys[lo:hi]:
+				bits |= 1 << (k - base)
+			self.bits = bits
+			self.n = popcount(bits)
+			self._refresh_leaf()
+			return
+
+		# The first key is the min and isn't stored in the clusters.
+		first = keys[lo]
+		self.min = first - base
+		self.max = keys[hi - 1] - base
+		i = lo + 1
+		while i < hi and keys[i] == first:
+			i += 1
+
+		# Fill the clusters one run of keys at a time.
+		self.n = 1
+		highs = list()
+		while i < hi:
+			h = (keys[i] - base) >> self.shift
+			cluster_base = base + (h << self.shift)
+			j = bisect_left(keys, cluster_base + self.lower_ru, i, hi)
+			c = self.get_cluster(h)
+			if c is None:
+				c = self.cluster[h] = self._new_node(self.lower_ru)
+			c._fill(keys, i, j, cluster_base)
+			self.n += c.n
+			self._add_count(h, c.n)
+			highs.append(h)
+			i = j
+
+		# ..then the summary, from the clusters which got something.
+		if highs:
+			if self.summary is None:
+				self.summary = self._new_node(self.upper_ru)
+			self.summary._fill(highs, 0, len(highs), 0)
 	
 	def __str__(self):
 		'''Return a unique string to identify this node.
 		'''
 		# Return the memory address.
-		return str(self)[32:-1]
+		return '{:x}'.format(id(self))
+
+	def _new_node(self, u):
+		'''Return a new, empty, sparse node with universe u to go under this
+		one, sharing its stats.
+		'''
+		node = VEBTree(u, True)
+		if self.stats is not None:
+			node.stats = self.stats
+		return node
+
+	def set_stats(self, stats):
+		'''Count the work done by queries on this tree in stats, an
+		stats.OpStats, or stop counting if stats is None.
+
+		Every node in the tree is given stats, as are the nodes of a sparse
+		tree made later on.
+		'''
+		stack = [self]
+		while stack:
+			node = stack.pop()
+			node.stats = stats
+			if node.u > LEAF_SIZE:
+				if node.summary is not None:
+					stack.append(node.summary)
+				stack.extend(c for i, c in node.clusters())
+
+	def get_cluster(self, i):
+		'''Return cluster i of this node, or None if it has not been created
+		yet (which can only happen when the tree is sparse).
+		'''
+		if self.sparse:
+			return self.cluster.get(i)
+		else:
+			return self.cluster[i]
 	
 	def insert(self, x):
 		'''Inserts key x into the vEB tree.
+
+		True is returned if x was added, or False if it was already there.
 		'''
-		if self.min == None:
+		if self.u <= LEAF_SIZE:
+			# Base case, just set the bit and keep min and max up to date.
+			if (self.bits >> x) & 1:
+				return False
+			self.bits |= 1 << x
+			self.n += 1
+			if self.min == None or x < self.min:
+				self.min = x
+			if self.max == None or x > self.max:
+				self.max = x
+			return True
+		elif self.min == None:
 			self.min = self.max = x
+			self.n = 1
+			return True
+		elif (x == self.min) or (x == self.max):
+			return False
 		else:
 			if x < self.min:
 				# Swap x and the current min.
@@ -272,33 +744,232 @@ class VEBTree(object):
 				self.min = x
 				x = t
 				del t
-			if self.u > 2:
-				if self.cluster[high(x, self.u)].minimum() is None:
-					# If the cluster for x has no minimum it is empty and so we 
-					# need to update the summary to say there is some thing in 
-					# it.
-					self.summary.insert(high(x, self.u))
-				# Insert the x into its cluster.
-				self.cluster[high(x, self.u)].insert(low(x, self.u))
+			h = x >> self.shift
+			c = self.get_cluster(h)
+			if c is None:
+				# Sparse tree, so make the cluster (and perhaps the
+				# summary) now that something is going in it.
+				c = self.cluster[h] = self._new_node(self.lower_ru)
+				if self.summary is None:
+					self.summary = self._new_node(self.upper_ru)
+			if c.minimum() is None:
+				# If the cluster for x has no minimum it is empty and so we 
+				# need to update the summary to say there is some thing in 
+				# it.
+				self.summary.insert(h)
+			# Insert the x into its cluster.
+			if not c.insert(x & self.mask):
+				return False
+			self.n += 1
+			self._add_count(h, 1)
 			if x > self.max:
-				# Case where node has u = 2 and only one value stored
-				# (min = max).
 				self.max = x
+			return True
 					
 	def delete(self, x):
-		'''TODO
+		'''Removes key x from the vEB tree if it is present.
+
+		True is returned if x was removed, or False if it wasn't in the tree.
 		'''
-		pass
+		if self.u <= LEAF_SIZE:
+			# Base case.
+			if not (self.bits >> x) & 1:
+				return False
+			self.bits &= ~(1 << x)
+			self.n -= 1
+			self._refresh_leaf()
+			return True
+		elif self.min == None:
+			return False
+		elif self.min == self.max:
+			# Only one key, which isn't stored in any cluster.
+			if x != self.min:
+				return False
+			self.min = self.max = None
+			self.n = 0
+			return True
+
+		if x == self.min:
+			# The min isn't stored in the clusters, so the smallest key that
+			# is stored there becomes the new min and it's that key which has
+			# to be deleted from its cluster instead.
+			first = self.summary.minimum()
+			x = self.min = (first << self.shift) | self.cluster[first].minimum()
+		h = x >> self.shift
+		c = self.get_cluster(h)
+		if c is None or not c.delete(x & self.mask):
+			return False
+		self.n -= 1
+		self._add_count(h, -1)
+		if c.minimum() is None:
+			self._cluster_emptied(h)
+		if x == self.max:
+			self._refresh_max()
+		return True
+
+	def delete_many(self, keys):
+		'''Removes every key in the iterable keys which is present in the vEB
+		tree, returning how many were removed.
+
+		Keys can come in any order, but sorted keys are the fast case. A run of
+		consecutive keys which land in the same cluster is passed down to that
+		cluster in one go, so the cluster (and the summary and max fix-ups
+		after it) are dealt with once per run rather than once per key.
+		'''
+		if self.u <= LEAF_SIZE:
+			# Base case, clear all the bits at once.
+			doomed = 0
+			for x in keys:
+				doomed |= 1 << x
+			doomed &= self.bits
+			if doomed:
+				self.bits ^= doomed
+				self.n = popcount(self.bits)
+				self._refresh_leaf()
+			return popcount(doomed)
+
+		removed = 0
+		run_h = None
+		run = []
+		for x in keys:
+			h = x >> self.shift
+			if (h != run_h) or (x == self.min):
+				# This key can't join the current run, so finish that first.
+				if run:
+					removed += self._delete_run(run_h, run)
+					run = []
+				run_h = h
+				if x == self.min:
+					# Deleting the min pulls a key up out of the clusters, so
+					# it's done by itself.
+					removed += self.delete(x)
+					continue
+			run.append(x & self.mask)
+		if run:
+			removed += self._delete_run(run_h, run)
+		return removed
+
+	def _delete_run(self, h, lows):
+		'''Deletes the keys with high bits h and low bits in lows, none of which
+		is the min, returning how many were removed.
+		'''
+		c = self.get_cluster(h)
+		if c is None:
+			return 0
+		removed = c.delete_many(lows)
+		if removed:
+			self.n -= removed
+			self._add_count(h, -removed)
+			if c.minimum() is None:
+				self._cluster_emptied(h)
+			if (self.max >> self.shift) == h:
+				# The max could have been one of the keys that went.
+				self._refresh_max()
+		return removed
+
+	def _add_count(self, h, delta):
+		'''Add delta to the count of cluster h in counts.
+
+		As usual for a Fenwick tree counts is 1-based, and counts[j] is the
+		total count of clusters j - (j & -j) up to j - 1, so an update or a
+		prefix sum touches O(lg(upper_ru)) entries.
+		'''
+		counts = self.counts
+		size = self.upper_ru
+		j = h + 1
+		if self.sparse:
+			while j <= size:
+				c = counts.get(j, 0) + delta
+				if c:
+					counts[j] = c
+				else:
+					del counts[j]
+				j += j & -j
+		else:
+			while j <= size:
+				counts[j] += delta
+				j += j & -j
+
+	def _count_below(self, h):
+		'''Return the number of keys in clusters 0 up to h - 1.
+		'''
+		counts = self.counts
+		j = min(h, self.upper_ru)
+		total = 0
+		if self.sparse:
+			while j:
+				total += counts.get(j, 0)
+				j &= j - 1
+		else:
+			while j:
+				total += counts[j]
+				j &= j - 1
+		return total
+
+	def _find_cluster(self, i):
+		'''Return a pair (h, j) where the i'th smallest key in the clusters
+		(counting from 0) is the j'th smallest in cluster h.
+
+		This goes down the Fenwick tree from the top, taking each step whose
+		clusters all come before the key.
+		'''
+		counts = self.counts
+		sparse = self.sparse
+		h = 0
+		step = self.upper_ru
+		while step:
+			if h + step <= self.upper_ru:
+				c = counts.get(h + step, 0) if sparse else counts[h + step]
+				if c <= i:
+					h += step
+					i -= c
+			step >>= 1
+		return h, i
+
+	def _cluster_emptied(self, h):
+		'''Update the summary after the last key has been deleted from cluster
+		h, and for sparse trees free the cluster (and perhaps the summary).
+		'''
+		self.summary.delete(h)
+		if self.sparse:
+			del self.cluster[h]
+			if self.summary.minimum() is None:
+				self.summary = None
+
+	def _refresh_max(self):
+		'''Recalculate max from the summary and clusters after a delete.
+		'''
+		if self.summary is None or self.summary.maximum() is None:
+			# Nothing left in the clusters, just the min.
+			self.max = self.min
+		else:
+			last = self.summary.maximum()
+			self.max = (last << self.shift) | self.cluster[last].maximum()
+
+	def _refresh_leaf(self):
+		'''Recalculate min and max from the bits of a leaf after a delete.
+		'''
+		if self.bits:
+			self.min = lowest_bit(self.bits)
+			self.max = highest_bit(self.bits)
+		else:
+			self.min = self.max = None
 	
 	def member(self, x):
 		'''Returns True is x is a key in this vEB tree or false otherwise.
 		'''
-		if (x is self.min) or (x is self.max):
+		stats = self.stats
+		if stats is not None:
+			if not stats.active:
+				return stats.query(self.member, x)
+			stats.levels += 1
+		if (x == self.min) or (x == self.max):
 			return True
-		elif self.u is 2:
-			return False
+		elif self.u <= LEAF_SIZE:
+			return (self.bits >> x) & 1 == 1
 		else:
-			return self.cluster[high(x, self.u)].member(low(x, self.u))
+			c = self.get_cluster(x >> self.shift)
+			return c is not None and c.member(x & self.mask)
 	
 	def minimum(self):
 		'''Return the minimum element of the tree.
@@ -314,25 +985,35 @@ class VEBTree(object):
 		'''Returns the next lowest key stored in the vEB tree below x, or None
 		if no such key exists.
 		'''
-		if self.u == 2:
+		stats = self.stats
+		if stats is not None:
+			if not stats.active:
+				return stats.query(self.predecessor, x)
+			stats.levels += 1
+		if self.u <= LEAF_SIZE:
 			# Base case.
-			if (self.min == 0) and (x == 1):
-				return 0
+			below = bits_below(self.bits, x)
+			if below:
+				return highest_bit(below)
 			else:
 				return None
 		elif (self.max != None) and (x > self.max):
 			return self.max
 		else:
 			# General case.
-			min_in_cluster = self.cluster[high(x, self.u)].minimum()
-			if (min_in_cluster != None) and (low(x, self.u) > min_in_cluster):
+			c = self.get_cluster(x >> self.shift)
+			min_in_cluster = c.minimum() if c is not None else None
+			if (min_in_cluster != None) and ((x & self.mask) > min_in_cluster):
 				# There must be some predecessor in this cluster, if only the
 				# min itself.
-				offset = self.cluster[high(x, self.u)].predecessor(low(x, self.u))
-				return self.index(high(x, self.u), offset)
+				offset = c.predecessor(x & self.mask)
+				return (x & ~self.mask) | offset
 			else:
 				# Otherwise find the non-empty cluster predecessor
-				pred_cluster = self.summary.predecessor(high(x, self.u))
+				if self.summary is None:
+					pred_cluster = None
+				else:
+					pred_cluster = self.summary.predecessor(x >> self.shift)
 				# ..and look for the maximum in there.
 				if pred_cluster == None:
 					# Extra case, predecessor might be the min of self because
@@ -343,40 +1024,389 @@ class VEBTree(object):
 						return None
 				else:
 					offset = self.cluster[pred_cluster].maximum()
-					return self.index(pred_cluster, offset)
+					return (pred_cluster << self.shift) | offset
 	
 	def successor(self, x):
 		'''Returns the next highest key stored in the vEB tree above x, or None
 		if no such key exists.
 		'''
-		if self.u == 2:
+		stats = self.stats
+		if stats is not None:
+			if not stats.active:
+				return stats.query(self.successor, x)
+			stats.levels += 1
+		if self.u <= LEAF_SIZE:
 			# Base case.
-			if x == 0 and self.max == 1:
-				return 1
+			above = bits_above(self.bits, x)
+			if above:
+				return lowest_bit(above)
 			else:
 				return None
 		elif (self.min != None) and (x < self.min):
 			return self.min
 		else:
 			# General case.
-			max_in_cluster = self.cluster[high(x, self.u)].maximum()
-			if (max_in_cluster != None) and (low(x, self.u) < max_in_cluster):
+			c = self.get_cluster(x >> self.shift)
+			max_in_cluster = c.maximum() if c is not None else None
+			if (max_in_cluster != None) and ((x & self.mask) < max_in_cluster):
 				# There must be some successor (at least the max) in the same 
 				# cluster as k, so go and find it in there!
-				offset = self.cluster[high(x, self.u)].successor(low(x, self.u))
-				return self.index(high(x, self.u), offset)
+				offset = c.successor(x & self.mask)
+				return (x & ~self.mask) | offset
 			else:
 				# Otherwise, find the next cluster with something in it.
-				succ_cluster = self.summary.successor(high(x, self.u))
+				if self.summary is None:
+					succ_cluster = None
+				else:
+					succ_cluster = self.summary.successor(x >> self.shift)
 				# ...and look for the minimum in there.
 				if succ_cluster == None:
 					return None
 				else:
 					offset = self.cluster[succ_cluster].minimum()
-					return self.index(succ_cluster, offset)
+					return (succ_cluster << self.shift) | offset
+
+	def __len__(self):
+		'''Return the number of keys in the tree.
+		'''
+		return self.n
+
+	def __iter__(self):
+		'''Iterate over all the keys in the tree in ascending order.
+		'''
+		return self.iter_range(0, self.u)
+
+	def iter_range(self, lo, hi):
+		'''Generate the keys x in the tree with lo <= x < hi, in ascending
+		order.
+
+		Rather than calling successor over and over, which goes back to the
+		root every time, this walks forward along the populated clusters (found
+		by iterating over the summary) and iterates over each of them in turn,
+		so every node on the way is only reached once.
+		'''
+		lo = max(lo, 0)
+		if self.min == None or lo >= hi:
+			return
+		if self.u <= LEAF_SIZE:
+			# Base case, pick off the bits in the range one at a time.
+			bits = bits_below(bits_above(self.bits, lo - 1), hi)
+			while bits:
+				b = lowest_bit(bits)
+				yield b
+				bits &= bits - 1
+			return
+
+		if lo <= self.min < hi:
+			yield self.min
+		if self.summary is None:
+			return
+		hi = min(hi, self.max + 1)
+		lo_cluster = lo >> self.shift
+		hi_cluster = (hi - 1) >> self.shift
+		for h in self.summary.iter_range(lo_cluster, hi_cluster + 1):
+			base = h << self.shift
+			# Only the first and last clusters can be partly out of range.
+			sub_lo = lo - base if h == lo_cluster else 0
+			sub_hi = hi - base if h == hi_cluster else self.lower_ru
+			for y in self.cluster[h].iter_range(sub_lo, sub_hi):
+				yield base | y
+
+	def rank(self, x):
+		'''Return the number of keys in the tree which are less than x.
+		'''
+		if self.u <= LEAF_SIZE:
+			return popcount(bits_below(self.bits, max(x, 0)))
+		elif self.min == None or x <= self.min:
+			return 0
+		elif x > self.max:
+			return self.n
+
+		h = x >> self.shift
+		# Count the min, plus everything in the clusters before h.
+		r = 1 + self._count_below(h)
+		c = self.get_cluster(h)
+		if c is not None:
+			r += c.rank(x & self.mask)
+		return r
+
+	def count_range(self, lo, hi):
+		'''Return the number of keys x in the tree with lo <= x < hi.
+		'''
+		if lo >= hi:
+			return 0
+		return self.rank(hi) - self.rank(lo)
+
+	def select(self, i):
+		'''Return the i'th smallest key in the tree, counting from 0.
+
+		An IndexError is raised unless 0 <= i < n.
+		'''
+		if not 0 <= i < self.n:
+			raise IndexError("select index out of range")
+		if self.u <= LEAF_SIZE:
+			# Base case, knock off the lowest i bits.
+			bits = self.bits
+			for _ in range(i):
+				bits &= bits - 1
+			return lowest_bit(bits)
+		elif i == 0:
+			return self.min
+
+		# Skip whole runs of clusters using counts to find the one the key is
+		# in (the min, key 0, isn't in any cluster).
+		h, i = self._find_cluster(i - 1)
+		return (h << self.shift) | self.cluster[h].select(i)
+
+	def member_many(self, keys):
+		'''Batch version of member. keys is a NumPy integer array (or anything
+		numpy.asarray accepts) and a bool array of the answers is returned.
+
+		Rather than walking down from the root once per key, the whole batch
+		goes down the tree a level at a time. At each level the keys are split
+		into their high and low bits in one go and each cluster they land in
+		is looked up once, and at the bottom the leaves' bits are tested with
+		NumPy shifts and masks. So the Python work is per node visited rather
+		than per key.
+		'''
+		return self._member_many(query_array(keys))
+
+	def successor_many(self, keys):
+		'''Batch version of successor, see member_many. An int64 array is
+		returned with NONE (-1) wherever successor would return None.
+		'''
+		return self._successor_many(query_array(keys))
+
+	def predecessor_many(self, keys):
+		'''Batch version of predecessor, see member_many. An int64 array is
+		returned with NONE (-1) wherever predecessor would return None.
+		'''
+		return self._predecessor_many(query_array(keys))
+
+	def _member_many(self, x):
+		if len(x) < SMALL_BATCH:
+			return self._one_by_one(self.member, x, False, bool, False, False)
+		found = numpy.zeros(len(x), dtype = bool)
+		pos = numpy.flatnonzero((x >= 0) & (x < self.u))
+		x = x[pos]
+		nodes, nid = [self], numpy.zeros(len(pos), dtype = numpy.int64)
+		while len(pos):
+			node = nodes[0]
+			if node.u <= LEAF_SIZE:
+				found[pos] = bit_set_many(leaf_bits(nodes)[nid], x)
+				break
+			mins, maxs = level_bounds(nodes)
+			hit = (x == mins[nid]) | (x == maxs[nid])
+			found[pos[hit]] = True
+			# The rest can only be in their cluster, if it exists.
+			go = numpy.flatnonzero(~hit & (maxs[nid] != NONE))
+			clusters, cid, _ = descend(nodes, nid[go], x[go])
+			there = numpy.array([c is not None for c in clusters], dtype = bool)[cid]
+			go = go[there]
+			pos, x = pos[go], x[go] & node.mask
+			nodes, nid = keep(clusters, cid[there])
+		return found
+
+	def _successor_many(self, x):
+		if len(x) < SMALL_BATCH:
+			return self._one_by_one(self.successor, x, NONE, numpy.int64, below = self.min)
+		result = numpy.full(len(x), NONE, dtype = numpy.int64)
+		if self.min == None:
+			return result
+		result[x < self.min] = self.min
+		# Only the keys in [min, max) have any other successor. Every key
+		# still going below is less than its node's max, so its successor is
+		# somewhere in that node.
+		pos = numpy.flatnonzero((x >= self.min) & (x < self.max))
+		x = x[pos]
+		base = numpy.zeros(len(pos), dtype = numpy.int64)
+		nodes, nid = [self], numpy.zeros(len(pos), dtype = numpy.int64)
+		while len(pos):
+			node = nodes[0]
+			if node.u <= LEAF_SIZE:
+				bits = leaf_bits(nodes)[nid]
+				result[pos] = base + lowest_bit_many(bits_above_many(bits, x))
+				break
+			mins = level_bounds(nodes)[0][nid]
+			below = x < mins
+			result[pos[below]] = base[below] + mins[below]
+			go = numpy.flatnonzero(~below)
+			pos, x, nid, base = pos[go], x[go], nid[go], base[go]
+			clusters, cid, h = descend(nodes, nid, x)
+			lows = x & node.mask
+			cmax = numpy.array([NONE if c is None or c.max is None else c.max
+					for c in clusters], dtype = numpy.int64)
+			# As in successor, anything below its cluster's max has its
+			# successor in the cluster..
+			down = lows < cmax[cid]
+			# ..and the rest of the keys in a cluster share the same answer,
+			# the min of the next cluster with something in it.
+			side = numpy.flatnonzero(~down)
+			if len(side):
+				first = side[numpy.unique(cid[side], return_index = True)[1]]
+				nexts = numpy.full(len(clusters), NONE, dtype = numpy.int64)
+				nexts[cid[first]] = next_cluster_mins(nodes, nid[first], h[first])
+				result[pos[side]] = base[side] + nexts[cid[side]]
+			go = numpy.flatnonzero(down)
+			pos, x = pos[go], lows[go]
+			base = base[go] + (h[go] << node.shift)
+			nodes, nid = keep(clusters, cid[go])
+		return result
+
+	def _predecessor_many(self, x):
+		if len(x) < SMALL_BATCH:
+			return self._one_by_one(self.predecessor, x, NONE, numpy.int64, above = self.max)
+		result = numpy.full(len(x), NONE, dtype = numpy.int64)
+		if self.min == None:
+			return result
+		result[x > self.max] = self.max
+		# Only the keys in (min, max] have any other predecessor. Every key
+		# still going below is greater than its node's min, so its
+		# predecessor is somewhere in that node.
+		pos = numpy.flatnonzero((x > self.min) & (x <= self.max))
+		x = x[pos]
+		base = numpy.zeros(len(pos), dtype = numpy.int64)
+		nodes, nid = [self], numpy.zeros(len(pos), dtype = numpy.int64)
+		while len(pos):
+			node = nodes[0]
+			if node.u <= LEAF_SIZE:
+				bits = leaf_bits(nodes)[nid]
+				result[pos] = base + highest_bit_many(bits_below_many(bits, x))
+				break
+			maxs = level_bounds(nodes)[1][nid]
+			above = x > maxs
+			result[pos[above]] = base[above] + maxs[above]
+			go = numpy.flatnonzero(~above)
+			pos, x, nid, base = pos[go], x[go], nid[go], base[go]
+			clusters, cid, h = descend(nodes, nid, x)
+			lows = x & node.mask
+			cmin = numpy.array([NONE if c is None or c.min is None else c.min
+					for c in clusters], dtype = numpy.int64)[cid]
+			# As in predecessor, anything above its cluster's min has its
+			# predecessor in the cluster..
+			down = (cmin != NONE) & (lows > cmin)
+			# ..and the rest of the keys in a cluster share the same answer,
+			# the max of the previous cluster with something in it, or else
+			# the min.
+			side = numpy.flatnonzero(~down)
+			if len(side):
+				first = side[numpy.unique(cid[side], return_index = True)[1]]
+				prevs = numpy.full(len(clusters), NONE, dtype = numpy.int64)
+				prevs[cid[first]] = prev_cluster_maxes(nodes, nid[first], h[first])
+				result[pos[side]] = base[side] + prevs[cid[side]]
+			go = numpy.flatnonzero(down)
+			pos, x = pos[go], lows[go]
+			base = base[go] + (h[go] << node.shift)
+			nodes, nid = keep(clusters, cid[go])
+		return result
+
+	def _next_cluster_min(self, h):
+		'''Return the min of the first cluster after h with anything in it,
+		as a key of this node. There must be one.
+		'''
+		succ_cluster = self.summary.successor(h)
+		return (succ_cluster << self.shift) | self.cluster[succ_cluster].minimum()
+
+	def _prev_cluster_max(self, h):
+		'''Return the max of the last cluster before h with anything in it, as
+		a key of this node, or the min if there isn't one.
+		'''
+		pred_cluster = None
+		if self.summary is not None:
+			pred_cluster = self.summary.predecessor(h)
+		if pred_cluster == None:
+			return self.min
+		return (pred_cluster << self.shift) | self.cluster[pred_cluster].maximum()
+
+	def _one_by_one(self, query, x, none, dtype, below = None, above = None):
+		'''Answer a small batch query by calling query for each key, with none
+		standing in for None. The scalar queries only take keys in the
+		universe, so below and above are the answers for keys under and over
+		it.
+		'''
+		answers = list()
+		u = self.u
+		for q in x.tolist():
+			if q < 0:
+				a = below
+			elif q >= u:
+				a = above
+			else:
+				a = query(q)
+			answers.append(none if a is None else a)
+		return numpy.array(answers, dtype = dtype)
 	
+	def save(self, path):
+		'''Write the tree to the file at path, in a flat format which load can
+		map straight into memory (see MappedVEBTree).
+
+		After the header (see SNAPSHOT_HEADER) come two arrays of unsigned 64
+		bit integers. offsets, which for each h gives where the keys whose
+		high bits, x >> shift, are h start and ends with n. Then all the keys
+		in ascending order. shift is chosen so there are about as many
+		groups of keys as keys.
+		'''
+		keys = array("Q", self)
+		n = len(keys)
+		lg_u = self.u.bit_length() - 1
+		shift = lg_u - min(lg_u, n.bit_length())
+		offsets = array("Q", [0]) * ((self.u >> shift) + 1)
+		for x in keys:
+			offsets[(x >> shift) + 1] += 1
+		for h in range(len(offsets) - 1):
+			offsets[h + 1] += offsets[h]
+		if sys.byteorder != "little":
+			keys.byteswap()
+			offsets.byteswap()
+		with open(path, "wb") as f:
+			f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+					int(self.sparse), lg_u, shift, n))
+			offsets.tofile(f)
+			keys.tofile(f)
+
+	@classmethod
+	def load(cls, path, mmap = True):
+		'''Read a tree written by save from the file at path.
+
+		With mmap True the file is mapped read-only and a MappedVEBTree is
+		returned, which answers queries straight from the mapping. That is
+		almost instant whatever the size, and processes loading the same file
+		share the one copy in memory. Otherwise a normal VEBTree is built
+		from the keys with from_sorted.
+		'''
+		if mmap:
+			return MappedVEBTree(path)
+		with open(path, "rb") as f:
+			sparse, u, n, shift = snapshot_header(f.read(SNAPSHOT_HEADER.size))
+			f.seek(8 * ((u >> shift) + 1), 1)
+			keys = array("Q")
+			keys.fromfile(f, n)
+		if sys.byteorder != "little":
+			keys.byteswap()
+		return cls.from_sorted(keys, u, sparse)
+
 	def to_DOT(self, wrap = False, summary = False, glabel = None):
 		'''Output a string in the DOT language which describes this vEB tree.
+
+		For sparse trees only the clusters which have been created are shown.
+
+		This is write_DOT into a string, with nothing left out.
+		'''
+		result = io.StringIO()
+		self.write_DOT(result, wrap = wrap, summary = summary, glabel = glabel)
+		return result.getvalue()
+
+	def write_DOT(self, fp, max_nodes = None, max_depth = None,
+			skip_empty = False, wrap = True, summary = False, glabel = None):
+		'''Write DOT describing this tree to the file object fp, a node at a
+		time. See the module function write_DOT.
+		'''
+		write_DOT(self, fp, max_nodes, max_depth, skip_empty, wrap, summary,
+				glabel)
+
+	def _DOT_record(self, summary, clusters):
+		'''Output the DOT record for just this node, with a port for each of
+		the (i, cluster) pairs in clusters.
 		'''
 		node = "node" + str(self)
 		# Write string for node record.		
@@ -384,47 +1414,172 @@ class VEBTree(object):
 		if summary:
 			node_options += ", fillcolor = gray, style = filled"
 		
-		if self.u == 2:
+		if self.u <= LEAF_SIZE:
+			# Show the bits lowest first, so they read in key order.
 			label = "{ <u>" + str(self.u) + " " +\
 					"| <min>" + str(self.min) + " " +\
-					"| <max>" + str(self.max) + " }"
+					"| <max>" + str(self.max) + " " +\
+					"| <bits>" + format(self.bits, "0" + str(self.u) + "b")[::-1] + " }"
 		else:
 			label = "<u>" + str(self.u) + " | " +\
 					"<min>" + str(self.min) + " | " +\
-					"<max>" + str(self.max) + " | "
-					"<summary>summary | { cluster | { <c0>"
-			for i in range(1, len(self.cluster)):
-				label += " | <c" + str(i) + ">"
+					"<max>" + str(self.max) + " | " +\
+					"<summary>summary | { cluster | { "
+			label += " | ".join("<c" + str(i) + ">" for i, _ in clusters)
 			label += " } }"
 		
-		record = node + "[" + node_options + ", label = \"" + label + "\"]\n"
-		
-		# Write string for any edges.
-		if self.u > 2:
-			edges = "\"" + node + "\":summary -> " +\
-					"\"node" + str(self.summary) + "\";\n"
-			for i in range(self.ru):
-				c = self.cluster[i];
-				edges += "\"" + node + "\":c" + str(i) + " -> " +\
-						 "\"node" + str(c) + "\";\n"
-			
-		# Final result.
-		if self.u == 2:
-			result = record
+		return node + "[" + node_options + ", label = \"" + label + "\"]\n"
+
+	def clusters(self):
+		'''Return a list of (i, cluster) pairs for the clusters of this node
+		which exist, in order of i.
+		'''
+		if self.sparse:
+			return sorted(self.cluster.items())
 		else:
-			result = record + edges
-			# Recurse into summary and cluster nodes.
-			result += self.summary.to_DOT(False, True);
-			for c in self.cluster:
-				result += c.to_DOT();
-		
-		# Perhaps wrap with the outer curly braces.
-		if wrap:
-			if glabel:
-				result = "[labelloc = t, label = \"" + glabel + "\"]\n" + result
-			result = "digraph g {\nnode [shape = record]\n" + result + "}"
-		
-		return result
+			return list(enumerate(self.cluster))
+
+class MappedVEBTree(object):
+	'''A read-only vEB tree, mapped into memory from a file written by
+	VEBTree.save (usually made with VEBTree.load).
+
+	Nothing is built when the file is opened, the queries work directly on
+	the two arrays in the file (see VEBTree.save). A query looks up the range
+	of keys with the same high bits as it in offsets, and binary searches
+	just those, so it is O(1) to find them and then O(lg) of however many
+	there are, which is only a few on average.
+
+	It has the same queries as a VEBTree (member, successor, rank,
+	member_many etc.) but no insert or delete. Call close, or use it in a
+	with statement, to unmap the file.
+	'''
+	def __init__(self, path):
+		if sys.byteorder != "little":
+			raise ValueError("only little-endian machines can map snapshots, "
+					"use VEBTree.load(path, mmap = False)")
+		with open(path, "rb") as f:
+			self.map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+		try:
+			self.sparse, self.u, self.n, self.shift = snapshot_header(self.map)
+		except ValueError:
+			self.map.close()
+			raise
+		start = SNAPSHOT_HEADER.size
+		self.keys_start = start + 8 * ((self.u >> self.shift) + 1)
+		view = memoryview(self.map)
+		self.offsets = view[start:self.keys_start].cast("Q")
+		self.keys = view[self.keys_start:self.keys_start + 8 * self.n].cast("Q")
+		view.release()
+		if self.n:
+			self.min = self.keys[0]
+			self.max = self.keys[self.n - 1]
+		else:
+			self.min = self.max = None
+
+	def close(self):
+		'''Unmap the file. The tree can't be used after this.
+		'''
+		self.offsets.release()
+		self.keys.release()
+		self.map.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def _lower(self, x):
+		'''Returns the index of the first key >= x.
+		'''
+		if x <= 0:
+			return 0
+		elif x >= self.u:
+			return self.n
+		h = x >> self.shift
+		return bisect_left(self.keys, x, self.offsets[h], self.offsets[h + 1])
+
+	def _upper(self, x):
+		'''Returns the index of the first key > x.
+		'''
+		if x < 0:
+			return 0
+		elif x >= self.u - 1:
+			return self.n
+		h = x >> self.shift
+		return bisect_right(self.keys, x, self.offsets[h], self.offsets[h + 1])
+
+	def __len__(self):
+		return self.n
+
+	def __iter__(self):
+		return iter(self.keys)
+
+	def member(self, x):
+		i = self._lower(x)
+		return i < self.n and self.keys[i] == x
+
+	def minimum(self):
+		return self.min
+
+	def maximum(self):
+		return self.max
+
+	def predecessor(self, x):
+		i = self._lower(x)
+		return self.keys[i - 1] if i > 0 else None
+
+	def successor(self, x):
+		i = self._upper(x)
+		return self.keys[i] if i < self.n else None
+
+	def iter_range(self, lo, hi):
+		for i in range(self._lower(lo), self._lower(hi)):
+			yield self.keys[i]
+
+	def rank(self, x):
+		return self._lower(x)
+
+	def count_range(self, lo, hi):
+		if lo >= hi:
+			return 0
+		return self._lower(hi) - self._lower(lo)
+
+	def select(self, i):
+		if not 0 <= i < self.n:
+			raise IndexError("select index out of range")
+		return self.keys[i]
+
+	def _key_array(self):
+		'''Returns the keys as a NumPy array over the mapping, for the batch
+		queries.
+		'''
+		return numpy.frombuffer(self.map, dtype = "<i8", count = self.n,
+				offset = self.keys_start)
+
+	def member_many(self, keys):
+		x = query_array(keys)
+		k = self._key_array()
+		if self.n == 0:
+			return numpy.zeros(len(x), dtype = bool)
+		i = numpy.minimum(numpy.searchsorted(k, x, "left"), self.n - 1)
+		return k[i] == x
+
+	def successor_many(self, keys):
+		x = query_array(keys)
+		k = self._key_array()
+		i = numpy.searchsorted(k, x, "right")
+		if self.n == 0:
+			return numpy.full(len(x), NONE, dtype = numpy.int64)
+		return numpy.where(i < self.n, k[numpy.minimum(i, self.n - 1)], NONE)
+
+	def predecessor_many(self, keys):
+		x = query_array(keys)
+		k = self._key_array()
+		i = numpy.searchsorted(k, x, "left")
+		if self.n == 0:
+			return numpy.full(len(x), NONE, dtype = numpy.int64)
+		return numpy.where(i > 0, k[numpy.maximum(i - 1, 0)], NONE)
 
 if __name__ == "__main__":
 	test_data = {2, 3, 4, 5, 7, 10}
@@ -437,3 +1592,18 @@ if __name__ == "__main__":
 	for d in test_data:
 		test_tree.delete(d)
 		print(test_tree.to_DOT(True, False, "Removed " + str(d)))
+
+	# A sparse tree only builds the parts of the tree that keys land in, so a
+	# huge universe is fine.
+	sparse_tree = VEBTree(2 ** 32, True)
+	for d in test_data:
+		sparse_tree.insert(d * 100003)
+	print(sparse_tree.to_DOT(True, False, "Sparse, u = 2^32"))
+
+	# Save it, and map it back in.
+	import os, tempfile
+	path = os.path.join(tempfile.mkdtemp(), "sparse.veb")
+	sparse_tree.save(path)
+	with VEBTree.load(path) as mapped:
+		print(list(mapped), mapped.successor(500000), mapped.rank(500000))
+	os.remove(path)